@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+BitGenius Hot-Path Micro-Benchmarks
+-----------------------------------
+Times per-request pure-Python transforms with realistic payload sizes and
+tracks their allocations with tracemalloc: Clarity value parsing, status
+normalization, CSV log export, Pydantic validation/serialization of the
+response models, and the memory held by logs and agents as dicts versus
+compact records (compare retained_bytes of the hold.* cases). Results carry the commit hash so runs can be compared
+across commits (--baseline exits 1 on regression).
+Usage: python benchmarks/bench_hot_paths.py [--filter csv] [--output results.json]
+       [--baseline baseline.json] [--tolerance 0.2]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import pydantic  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from models.agent import Agent  # noqa: E402
+from models.log import LogEntry, Notification  # noqa: E402
+from models.records import AgentRecord, LogRecord  # noqa: E402
+from utils.helpers import STATUS_MAPPING, logs_to_csv, normalize_status, parse_clarity_value  # noqa: E402
+from utils.responses import FastJSONResponse  # noqa: E402
+
+def git_commit() -> str:
+    """Short HEAD hash, suffixed -dirty when tracked files have uncommitted changes"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+        dirty = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no", "."],
+                                        cwd=BACKEND_DIR, text=True).strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def clarity_agent(rng: random.Random, agent_id: int) -> Dict:
+    """A get-agent-by-id result as the Stacks API encodes it: (some (tuple ...))"""
+    return {"type": "optional", "value": {"type": "tuple", "value": {
+        "owner": {"type": "principal", "value": "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM"},
+        "name": {"type": "string-ascii", "value": f"Agent {agent_id}"},
+        "agent-type": {"type": "string-ascii", "value": "auto_dca"},
+        "strategy": {"type": "string-ascii", "value": "Buy 0.001 BTC every day at 09:00 UTC"},
+        "status": {"type": "string-ascii", "value": rng.choice(("online", "idle", "stopped"))},
+        "trigger-condition": {"type": "string-ascii", "value": "price_below:60000"},
+        "privacy-enabled": {"type": "bool", "value": rng.choice(("true", "false"))},
+        "allocation": {"type": "uint", "value": str(rng.randrange(1000, 10 ** 8))},
+        "created-at": {"type": "uint", "value": str(100000 + agent_id)},
+        "last-active": {"type": "uint", "value": str(200000 + agent_id)}
+    }}}
+
+def agent_dict(rng: random.Random, agent_id: int) -> Dict:
+    return {
+        "agent_id": agent_id,
+        "owner": "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM",
+        "name": f"Agent {agent_id}",
+        "agent_type": "auto_dca",
+        "strategy": "Buy 0.001 BTC every day at 09:00 UTC",
+        "status": rng.choice(("online", "idle", "stopped")),
+        "trigger_condition": "price_below:60000",
+        "privacy_enabled": rng.random() < 0.5,
+        "allocation": rng.randrange(1000, 10 ** 8),
+        "created_at": 100000 + agent_id,
+        "last_active": 200000 + agent_id
+    }
+
+def agent_response(agent: Dict) -> Dict:
+    """The same agent keyed as get-agent-by-id returns it through Maestro, which is what records hold"""
+    return {key.replace("_", "-"): value for key, value in agent.items() if key != "agent_id"}
+
+def log_dict(rng: random.Random, i: int) -> Dict:
+    return {
+        "agent_id": rng.randrange(1, 500),
+        "timestamp": 1700000000 + i * 60,
+        "action": rng.choice(("buy", "sell", "rebalance", "mix")),
+        "status": "success" if rng.random() < 0.9 else "failed",
+        "transaction_id": f"{i:064x}" if rng.random() < 0.5 else None,
+        "amount": rng.randrange(1000, 10 ** 7),
+        "fee": rng.randrange(100, 5000),
+        "details": "Executed scheduled DCA purchase, order filled at market"
+    }
+
+def notification_dict(rng: random.Random, i: int) -> Dict:
+    return {
+        "id": f"{i:020x}",
+        "user": "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM",
+        "timestamp": 1700000000 + i,
+        "title": "Agent status changed",
+        "message": f"Agent {i} is now idle",
+        "type": "status",
+        "read": rng.random() < 0.5,
+        "agent_id": i
+    }
+
+def build_cases() -> Dict[str, Callable[[], object]]:
+    """Name -> zero-argument callable; payload sizes match what the routes see"""
+    rng = random.Random(42)
+    clarity_one = clarity_agent(rng, 1)
+    clarity_list = {"type": "list", "value": [clarity_agent(rng, i) for i in range(1, 101)]}
+    statuses = [rng.choice(list(STATUS_MAPPING) + ["online", "idle", "stopped", "ONLINE", "bogus", ""])
+                for _ in range(1000)]
+    logs = [log_dict(rng, i) for i in range(1000)]
+    agents = [agent_dict(rng, i) for i in range(1, 1001)]
+    notifications = [notification_dict(rng, i) for i in range(50)]
+
+    agent_list = TypeAdapter(List[Agent])
+    log_list = TypeAdapter(List[LogEntry])
+    notification_list = TypeAdapter(List[Notification])
+    validated_agents = agent_list.validate_python(agents)
+    validated_logs = log_list.validate_python(logs)
+    # As stored: decoding gives every document its own strings, as loading from a snapshot or SQLite does
+    stored_logs = [json.dumps({**log_dict(rng, i), "id": f"{i:020x}"}) for i in range(10000)]
+    stored_agents = [json.dumps(agent_response(agent)) for agent in agents]
+    agent_records = [AgentRecord.from_dict(agent_response(agent)) for agent in agents]
+
+    return {
+        "parse_clarity_value.agent": lambda: parse_clarity_value(clarity_one),
+        "parse_clarity_value.list_100_agents": lambda: parse_clarity_value(clarity_list),
+        "normalize_status.x1000": lambda: [normalize_status(status) for status in statuses],
+        "logs_to_csv.1000_logs": lambda: logs_to_csv(logs),
+        "validate.agent": lambda: Agent.model_validate(agents[0]),
+        "validate.agents_1000": lambda: agent_list.validate_python(agents),
+        "validate.log_entries_1000": lambda: log_list.validate_python(logs),
+        "validate.notifications_50": lambda: notification_list.validate_python(notifications),
+        "dump_json.agents_1000": lambda: agent_list.dump_json(validated_agents),
+        "dump_json.log_entries_1000": lambda: log_list.dump_json(validated_logs),
+        # What a List[Dict] route costs by default vs. returning FastJSONResponse directly
+        "render.default_agents_1000": lambda: JSONResponse(jsonable_encoder(agents)).body,
+        "render.fast_agents_1000": lambda: FastJSONResponse(agents).body,
+        "render.default_logs_1000": lambda: JSONResponse(jsonable_encoder({"logs": logs})).body,
+        "render.fast_logs_1000": lambda: FastJSONResponse({"logs": logs}).body,
+        "render.fast_agent_records_1000": lambda: FastJSONResponse(agent_records).body,
+        "hold.log_dicts_10000": lambda: [json.loads(log) for log in stored_logs],
+        "hold.log_records_10000": lambda: [LogRecord.from_dict(json.loads(log)) for log in stored_logs],
+        "hold.agent_dicts_1000": lambda: [json.loads(agent) for agent in stored_agents],
+        "hold.agent_records_1000": lambda: [AgentRecord.from_dict(json.loads(agent)) for agent in stored_agents]
+    }
+
+def time_case(fn: Callable[[], object], repeats: int, min_time: float) -> Dict:
+    """Calibrate a loop count that runs for about `min_time`, then time `repeats` loops"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        runs = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            runs.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        "loops": number,
+        "min_us": round(min(runs) * 1e6, 3),
+        "median_us": round(statistics.median(runs) * 1e6, 3),
+        "stdev_us": round(statistics.stdev(runs) * 1e6, 3) if len(runs) > 1 else 0.0,
+        "ops_per_sec": round(1 / statistics.median(runs), 1)
+    }
+
+def allocations(fn: Callable[[], object]) -> Dict:
+    """Peak traced memory during one call and the blocks/bytes its result keeps alive"""
+    fn()  # warm caches so one-time allocations aren't counted
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    del result
+    return {
+        "peak_bytes": peak - baseline,
+        "retained_bytes": current - baseline,
+        "retained_blocks": sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+    }
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Cases whose median time or peak memory grew by more than `tolerance`"""
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before:
+            continue
+        if current["median_us"] > before["median_us"] * (1 + tolerance):
+            regressions.append(f"{name}: median {before['median_us']} -> {current['median_us']} us")
+        if current["peak_bytes"] > before["peak_bytes"] * (1 + tolerance):
+            regressions.append(f"{name}: peak {before['peak_bytes']} -> {current['peak_bytes']} bytes")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark BitGenius hot paths")
+    parser.add_argument("--filter", help="Only run cases whose name contains this")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per timed repeat")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Compare against this results JSON; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown or memory growth")
+    args = parser.parse_args()
+
+    benchmarks = {}
+    for name, fn in build_cases().items():
+        if args.filter and args.filter not in name:
+            continue
+        benchmarks[name] = {**time_case(fn, args.repeats, args.min_time), **allocations(fn)}
+        print(f"{name:40} {benchmarks[name]['median_us']:>12} us  {benchmarks[name]['peak_bytes']:>10} B peak  "
+              f"{benchmarks[name]['retained_blocks']:>7} blocks", file=sys.stderr)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "pydantic": pydantic.VERSION,
+            "platform": platform.platform()
+        },
+        "benchmarks": benchmarks
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
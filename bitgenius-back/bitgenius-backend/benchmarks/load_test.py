@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+BitGenius Load Test
+-------------------
+Starts the upstream stubs, seeds a SQLite store with synthetic logs, boots
+the app under uvicorn and drives concurrent load at each router. Reports
+throughput and p50/p95/p99 latency per scenario as JSON, and compares
+against a saved baseline to catch regressions (exit code 1).
+Usage: python benchmarks/load_test.py [--concurrency 16] [--requests 300]
+       [--output results.json] [--baseline baseline.json] [--tolerance 0.25]
+       [--latency-ms maestro=40] [--error-rate 0.01] [--scenarios logs_,agents_]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from stubs import SyntheticDataset, add_stub_arguments, injections_from_args, start_stubs, stub_env  # noqa: E402
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def seed_storage(path: str, dataset: SyntheticDataset) -> None:
+    """Write the dataset's logs straight into a SQLite store the app will read"""
+    from services.sqlite_store import SQLiteBackend
+    backend = SQLiteBackend(path)
+    for log in dataset.logs:
+        backend.store_agent_log(str(log["agent_id"]), dict(log))
+
+def build_scenarios(dataset: SyntheticDataset) -> Dict[str, Dict]:
+    """One or more scenarios per router; paths rotate through the synthetic ids"""
+    owner = dataset.owners[0]
+    agent_ids = [agent["agent_id"] for agent in dataset.agents]
+    addresses = dataset.addresses
+    now = int(time.time())
+    return {
+        "dashboard_summary": {"method": "GET", "paths": ["/dashboard/summary"]},
+        "dashboard_market": {"method": "GET", "paths": ["/dashboard/market"]},
+        "dashboard_overview": {"method": "GET", "paths": [f"/dashboard/overview/{o}" for o in dataset.owners]},
+        "dashboard_wallet": {"method": "GET", "paths": [f"/dashboard/wallet/{a}" for a in addresses]},
+        "dashboard_wallets": {"method": "POST", "paths": ["/dashboard/wallets"], "json": {"addresses": addresses[:20]}},
+        "agents_list": {"method": "GET", "paths": ["/agents/"]},
+        "agents_by_owner": {"method": "GET", "paths": [f"/agents/?principal={owner}"]},
+        "agents_get": {"method": "GET", "paths": [f"/agents/{i}" for i in agent_ids]},
+        "agents_templates": {"method": "GET", "paths": ["/agents/templates"]},
+        "agents_bulk_status": {"method": "POST", "paths": ["/agents/bulk-status"],
+                               "json": {"agent_ids": agent_ids[:50], "status": "idle"}},
+        "logs_agent": {"method": "GET", "paths": [f"/logs/agent/{i}" for i in agent_ids]},
+        "logs_range": {"method": "GET", "paths": [f"/logs/range?agent_id={i}&start={now - 7 * 86400}&end={now}"
+                                                  for i in agent_ids]},
+        "logs_txs": {"method": "GET", "paths": [f"/logs/txs/{i}" for i in agent_ids]},
+        "logs_export_csv": {"method": "GET", "paths": [f"/logs/export/{i}?format=csv" for i in agent_ids]},
+        "ai_suggest_name": {"method": "GET", "paths": ["/ai/suggest-name?goal=accumulate%20btc"]},
+        "ai_help": {"method": "GET", "paths": ["/ai/help?context=dashboard"]}
+    }
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Dict, requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    paths = scenario["paths"]
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await client.request(scenario["method"], paths[i % len(paths)], json=scenario.get("json"))
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": requests,
+        "errors": errors,
+        "statuses": statuses,
+        "throughput_rps": round(requests / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3)
+    }
+
+async def run_load(base_url: str, scenarios: Dict[str, Dict], requests: int, concurrency: int, warmup: int) -> Dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        results = {}
+        for name, scenario in scenarios.items():
+            if warmup:
+                await run_scenario(client, scenario, warmup, min(concurrency, warmup))
+            results[name] = await run_scenario(client, scenario, requests, concurrency)
+            print(f"{name:22} {results[name]['throughput_rps']:>9} rps  p50 {results[name]['p50_ms']:>8} ms  "
+                  f"p95 {results[name]['p95_ms']:>8} ms  p99 {results[name]['p99_ms']:>8} ms  "
+                  f"errors {results[name]['errors']}", file=sys.stderr)
+        return results
+
+def wait_until_ready(url: str, process: subprocess.Popen, deadline: float = 30.0) -> None:
+    started = time.perf_counter()
+    while time.perf_counter() - started < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.05)
+    raise RuntimeError("Server did not start in time")
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Scenarios whose p95 rose or throughput fell by more than `tolerance`"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+        if current["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {current['throughput_rps']} rps")
+        if current["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {current['errors']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test BitGenius against local upstream stubs")
+    add_stub_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=300, help="Requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", help="Comma-separated name prefixes to run (default: all)")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Compare against this results JSON; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative p95/throughput change")
+    args = parser.parse_args()
+
+    dataset = SyntheticDataset(args.agents, args.logs, args.owners, seed=args.seed)
+    scenarios = build_scenarios(dataset)
+    if args.scenarios:
+        prefixes = tuple(args.scenarios.split(","))
+        scenarios = {name: scenario for name, scenario in scenarios.items() if name.startswith(prefixes)}
+
+    stubs = start_stubs(dataset, injections_from_args(args))
+    workdir = tempfile.mkdtemp(prefix="bitgenius-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    seed_storage(db_path, dataset)
+
+    port = free_port()
+    env = {
+        **os.environ,
+        **stub_env(stubs),
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": db_path,
+        "ROLLUP_SNAPSHOT_PATH": os.path.join(workdir, "rollup_snapshot.json"),
+        "TRACE_EXPORTER": "none"
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_ready(f"{base_url}/", process)
+        scenario_results = asyncio.run(run_load(base_url, scenarios, args.requests, args.concurrency, args.warmup))
+    finally:
+        process.terminate()
+        process.wait()
+        for stub in stubs.values():
+            stub.stop()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "workers": args.workers,
+            "dataset": {"agents": args.agents, "logs": args.logs, "owners": args.owners, "seed": args.seed},
+            "latency_ms": args.latency_ms or [],
+            "jitter_ms": args.jitter_ms or [],
+            "error_rate": args.error_rate or [],
+            "upstream_requests": {name: stub.requests for name, stub in stubs.items()}
+        },
+        "scenarios": scenario_results
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
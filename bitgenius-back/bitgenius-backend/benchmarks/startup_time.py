@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+BitGenius Startup Benchmark
+---------------------------
+Measures cold import time of the app and the time from process spawn to the
+first successful request, with service clients built lazily on first use.
+Usage: python benchmarks/startup_time.py [--runs 5] [--json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_import(env) -> float:
+    output = subprocess.check_output([sys.executable, "-W", "ignore", "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env)
+    return float(output.decode().strip().splitlines()[-1])
+
+def get(url: str, timeout: float = 5.0) -> int:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+def measure_first_request(env, route: str, deadline: float = 30.0) -> dict:
+    """Spawn uvicorn and time until `/` answers, then time the first hit on `route`"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            if time.perf_counter() - started > deadline:
+                raise RuntimeError("Server did not start in time")
+            try:
+                get(f"http://127.0.0.1:{port}/", timeout=1.0)
+                break
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.01)
+        ready = time.perf_counter() - started
+
+        route_started = time.perf_counter()
+        try:
+            get(f"http://127.0.0.1:{port}{route}")
+        except urllib.error.HTTPError:
+            pass  # Any answer counts: we only time how long the lazy route takes to respond
+        first_route = time.perf_counter() - route_started
+
+        return {"time_to_first_request": ready, "first_lazy_route": first_route}
+    finally:
+        process.terminate()
+        process.wait()
+
+def summarize(samples):
+    return {
+        "min_ms": round(min(samples) * 1000, 1),
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--route", default="/dashboard/notifications/ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM",
+                        help="Route whose first request builds a service client")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    # Startup must not depend on AI keys being present
+    env = dict(os.environ)
+    env.pop("GEMINI_API_KEY", None)
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    requests = [measure_first_request(env, args.route) for _ in range(args.runs)]
+
+    results = {
+        "runs": args.runs,
+        "import_main": summarize(imports),
+        "time_to_first_request": summarize([r["time_to_first_request"] for r in requests]),
+        "first_lazy_route": summarize([r["first_lazy_route"] for r in requests])
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, stats in results.items():
+            if name == "runs":
+                continue
+            print(f"{name:<24} min {stats['min_ms']:>8} ms   median {stats['median_ms']:>8} ms   max {stats['max_ms']:>8} ms")
+
+if __name__ == "__main__":
+    main()
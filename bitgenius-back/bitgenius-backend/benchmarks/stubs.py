@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+BitGenius Upstream Stubs
+------------------------
+Local stand-ins for Maestro, Blockstream, CoinGecko and Gemini, serving a
+synthetic dataset with configurable latency and error injection, so load
+tests are reproducible and never touch real APIs.
+Each stub listens on its own loopback address (127.0.0.1-4) because the app
+keys circuit breakers and retry stats by upstream hostname.
+Usage: python benchmarks/stubs.py [--agents 200] [--latency-ms maestro=40] [--error-rate 0.01]
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+UPSTREAMS = ("maestro", "blockstream", "coingecko", "gemini")
+STATUSES = ("active", "idle", "stopped", "online")
+AGENT_TYPES = ("auto_dca", "privacy_mixer", "arbitrage_hunter", "treasury_tracker")
+ACTIONS = ("buy", "sell", "rebalance", "mix", "alert")
+
+class SyntheticDataset:
+    """Deterministic agents, owners, BTC addresses and logs for a given seed"""
+
+    def __init__(self, agents: int = 200, logs: int = 5000, owners: int = 20, addresses: int = 50, seed: int = 42):
+        rng = random.Random(seed)
+        self.owners = [f"ST{i:038d}" for i in range(owners)]
+        self.agents = []
+        for agent_id in range(1, agents + 1):
+            self.agents.append({
+                "agent_id": agent_id,
+                "owner": rng.choice(self.owners),
+                "name": f"Agent {agent_id}",
+                "agent_type": rng.choice(AGENT_TYPES),
+                "strategy": "hodl",
+                "status": rng.choice(STATUSES),
+                "trigger_condition": "price_threshold",
+                "privacy_enabled": rng.random() < 0.3,
+                "allocation": rng.randrange(1000, 100000),
+                "created_at": 100000 + agent_id,
+                "last_active": 200000 + agent_id
+            })
+        self.addresses = [f"tb1qbench{i:032d}" for i in range(addresses)]
+        self.balances = {address: rng.randrange(0, 10 ** 8) for address in self.addresses}
+        now = int(time.time())
+        self.logs = []
+        for i in range(logs):
+            self.logs.append({
+                "agent_id": rng.randrange(1, agents + 1),
+                "timestamp": now - rng.randrange(0, 30 * 86400),
+                "action": rng.choice(ACTIONS),
+                "status": "success" if rng.random() < 0.9 else "failed",
+                "transaction_id": f"{i:064x}" if rng.random() < 0.5 else None,
+                "amount": rng.randrange(1000, 1000000),
+                "fee": rng.randrange(100, 5000),
+                "details": "synthetic log entry"
+            })
+        self.templates = {
+            template_id: {"description": f"{template_id} template", "default_strategy": "hodl"}
+            for template_id in AGENT_TYPES
+        }
+
+class Injection:
+    """Latency (fixed plus exponential jitter) and error rate for one stub"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def apply(self) -> bool:
+        """Sleep the injected latency; True if this request should fail"""
+        with self._lock:
+            delay = self.latency + (self._rng.expovariate(1 / self.jitter) if self.jitter else 0)
+            fail = self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return fail
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stub: "Stub" = None
+
+    def _reply(self, status: int, payload) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        self.stub.requests += 1
+        if self.stub.injection.apply():
+            self._reply(503, {"error": "injected failure"})
+            return
+        status, payload = self.stub.route(method, urlparse(self.path).path, body)
+        self._reply(status, payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, *args):
+        pass
+
+class Stub:
+    """One upstream's HTTP server; subclasses map (method, path, body) to a response"""
+
+    name = ""
+
+    def __init__(self, dataset: SyntheticDataset, injection: Injection, host: str):
+        self.dataset = dataset
+        self.injection = injection
+        self.requests = 0
+        handler = type(f"{type(self).__name__}Handler", (_StubHandler,), {"stub": self})
+        self.server = ThreadingHTTPServer((host, 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name=f"stub-{self.name}", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "Stub":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def route(self, method: str, path: str, body: Optional[Dict]):
+        raise NotImplementedError
+
+class MaestroStub(Stub):
+    name = "maestro"
+
+    def route(self, method, path, body):
+        if path.endswith("/stacks/v1/transactions/build"):
+            return 200, {"transaction": "0x" + "00" * 64, "function_name": body.get("function_name")}
+        if not path.endswith("/stacks/v1/read-only-call"):
+            return 404, {"error": "not found"}
+
+        function_name = body.get("function_name")
+        args = [arg.get("value") for arg in body.get("function_args", [])]
+        agents = self.dataset.agents
+        if function_name == "get-agent-count":
+            return 200, {"value": {"value": str(len(agents))}}
+        if function_name == "get-agent-by-id":
+            index = int(args[0]) - 1
+            return 200, agents[index] if 0 <= index < len(agents) else {}
+        if function_name == "get-agent-status":
+            index = int(args[0]) - 1
+            return 200, {"value": {"value": agents[index]["status"] if 0 <= index < len(agents) else "unknown"}}
+        if function_name == "get-all-templates":
+            return 200, {"value": {"value": list(self.dataset.templates)}}
+        if function_name == "get-agent-template":
+            return 200, {"value": {"value": self.dataset.templates.get(args[0], {})}}
+        if function_name == "get-agent-performance":
+            return 200, {"value": {"value": {"actions-count": 10, "success-count": 9, "total-fees": 1200}}}
+        return 200, {"value": {"value": None}}
+
+class BlockstreamStub(Stub):
+    name = "blockstream"
+    ADDRESS = re.compile(r"/address/([^/]+)(/txs.*)?$")
+
+    def route(self, method, path, body):
+        match = self.ADDRESS.search(path)
+        if match and match.group(2):
+            return 200, [{"txid": f"{i:064x}", "status": {"confirmed": True}} for i in range(10)]
+        if match:
+            balance = self.dataset.balances.get(match.group(1), 0)
+            return 200, {
+                "address": match.group(1),
+                "chain_stats": {"funded_txo_sum": balance, "spent_txo_sum": 0, "tx_count": 3},
+                "mempool_stats": {"funded_txo_sum": 0, "spent_txo_sum": 0, "tx_count": 0}
+            }
+        if "/tx/" in path:
+            return 200, {"txid": path.rsplit("/", 1)[-1], "status": {"confirmed": True}}
+        return 404, {"error": "not found"}
+
+class CoinGeckoStub(Stub):
+    name = "coingecko"
+
+    def route(self, method, path, body):
+        if path.endswith("/simple/price"):
+            return 200, {"bitcoin": {"usd": 65000.0}}
+        return 404, {"error": "not found"}
+
+class GeminiStub(Stub):
+    name = "gemini"
+
+    def route(self, method, path, body):
+        if ":generateContent" not in path:
+            return 404, {"error": "not found"}
+        config = (body or {}).get("generationConfig") or (body or {}).get("generation_config") or {}
+        # Structured requests get an empty JSON object; the app falls back to its defaults
+        text = "{}" if config.get("responseMimeType") == "application/json" or "responseSchema" in config else \
+            "Stub response from the benchmark Gemini server."
+        return 200, {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": 10, "candidatesTokenCount": 10, "totalTokenCount": 20}
+        }
+
+STUB_CLASSES = {stub.name: stub for stub in (MaestroStub, BlockstreamStub, CoinGeckoStub, GeminiStub)}
+
+def start_stubs(dataset: SyntheticDataset, injections: Dict[str, Injection]) -> Dict[str, Stub]:
+    """Start all four stubs, each on its own loopback address"""
+    return {
+        name: STUB_CLASSES[name](dataset, injections.get(name) or Injection(), f"127.0.0.{index + 1}").start()
+        for index, name in enumerate(UPSTREAMS)
+    }
+
+def stub_env(stubs: Dict[str, Stub]) -> Dict[str, str]:
+    """Environment that points the app at the stubs"""
+    return {
+        "MAESTRO_API_KEY": "bench",
+        "MAESTRO_URL": f"{stubs['maestro'].url}/v0",
+        "MAESTRO_MOCK_FALLBACK": "false",
+        "CONTRACT_ADDRESS": "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM",
+        "BLOCKSTREAM_URL": f"{stubs['blockstream'].url}/api",
+        "COINGECKO_URL": f"{stubs['coingecko'].url}/api/v3",
+        "GEMINI_API_KEY": "bench",
+        "GEMINI_API_ENDPOINT": stubs["gemini"].url
+    }
+
+def parse_per_upstream(values: List[str], default: float) -> Dict[str, float]:
+    """Parse repeated `name=value` options; a bare value applies to every upstream"""
+    result = {name: default for name in UPSTREAMS}
+    for value in values or []:
+        name, _, number = value.rpartition("=")
+        for target in ([name] if name else UPSTREAMS):
+            if target not in result:
+                raise argparse.ArgumentTypeError(f"Unknown upstream: {target}")
+            result[target] = float(number)
+    return result
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--agents", type=int, default=200, help="Synthetic agents served by the Maestro stub")
+    parser.add_argument("--logs", type=int, default=5000, help="Synthetic logs seeded into storage")
+    parser.add_argument("--owners", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-ms", action="append", help="[upstream=]milliseconds, repeatable")
+    parser.add_argument("--jitter-ms", action="append", help="[upstream=]mean exponential jitter, repeatable")
+    parser.add_argument("--error-rate", action="append", help="[upstream=]fraction answered with 503, repeatable")
+
+def injections_from_args(args) -> Dict[str, Injection]:
+    latency = parse_per_upstream(args.latency_ms, 0)
+    jitter = parse_per_upstream(args.jitter_ms, 0)
+    errors = parse_per_upstream(args.error_rate, 0)
+    return {
+        name: Injection(latency[name], jitter[name], errors[name], seed=args.seed + index)
+        for index, name in enumerate(UPSTREAMS)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local upstream stubs for BitGenius")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    stubs = start_stubs(SyntheticDataset(args.agents, args.logs, args.owners, seed=args.seed), injections_from_args(args))
+    for key, value in stub_env(stubs).items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for stub in stubs.values():
+            stub.stop()
+
+if __name__ == "__main__":
+    main()
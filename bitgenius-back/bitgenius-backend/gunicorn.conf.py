@@ -0,0 +1,16 @@
+# Multi-worker deployment: gunicorn -c gunicorn.conf.py main:app
+# (requires `pip install gunicorn`; `WEB_CONCURRENCY=4 python main.py` works without it)
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+def on_starting(server):
+    # Without CACHE_URL, share a local stand-in server between the workers
+    if not os.environ.get("CACHE_URL"):
+        from services.cache_server import start_in_background
+        cache_server = start_in_background()
+        os.environ["CACHE_URL"] = cache_server.url
+        server.log.info(f"Started local cache server at {cache_server.url}")
@@ -7,20 +7,35 @@ if not os.environ.get("MAESTRO_API_KEY"):
     os.environ["MAESTRO_API_KEY"] = "test_9uXypd7GsdjAYXXskswIhMUf"  
     os.environ["MAESTRO_URL"] = "https://xbt-testnet.gomaestro-api.org/v0"
     os.environ["CONTRACT_ADDRESS"] = "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM"
+    os.environ.setdefault("MAESTRO_MOCK_FALLBACK", "true")
 
-import uvicorn
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from routers import dashboard, agents, logs, ai
-from services.firebase import initialize_firebase
+from routers import dashboard, agents, logs, ai, admin
+from services.rollup import get_metrics_rollup
+from services.chain_indexer import CHAIN_INDEXER_ENABLED, get_chain_indexer
+from services.upstream import upstream_stats
+from services.ratelimit import RATE_LIMIT_ENABLED
+from services.metrics import REGISTRY, start_event_loop_monitor
+from middleware.compression import CompressionMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.ratelimit import RateLimitMiddleware
+from middleware.tracing import TracingMiddleware
+from utils.responses import FastJSONResponse
 
 app = FastAPI(
     title="BitGenius API",
     description="Backend API for BitGenius Bitcoin Agent Platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
+# Innermost, so 429s still get CORS headers and preflights are never counted
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -29,22 +44,61 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 @app.on_event("startup")
 async def startup_event():
-    initialize_firebase()
+    start_event_loop_monitor()
+    get_metrics_rollup().start()
+    if CHAIN_INDEXER_ENABLED:
+        get_chain_indexer().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    get_metrics_rollup().stop()
+    if CHAIN_INDEXER_ENABLED:
+        get_chain_indexer().stop()
 
 app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
 app.include_router(agents.router, prefix="/agents", tags=["Agents"])
 app.include_router(logs.router, prefix="/logs", tags=["Logs"])
 app.include_router(ai.router, prefix="/ai", tags=["AI"])
+if admin.ADMIN_TOKEN:
+    app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 @app.get("/", tags=["Root"])
 async def root():
     return {"message": "Welcome to BitGenius API", "status": "online"}
 
+@app.get("/upstreams", tags=["Root"])
+async def get_upstreams():
+    """Circuit breaker state and retry/hedge counters per upstream host"""
+    return upstream_stats()
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
+    import uvicorn
+    
     port = int(os.getenv("PORT", 8000))
     host = os.getenv("HOST", "0.0.0.0")
     debug = os.getenv("DEBUG", "False").lower() == "true"
-    uvicorn.run("main:app", host=host, port=port, reload=debug)
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    
+    if workers > 1:
+        # Workers are separate processes, so caches, locks and pub/sub need a shared server
+        if not os.environ.get("CACHE_URL"):
+            from services.cache_server import start_in_background
+            cache_server = start_in_background()
+            os.environ["CACHE_URL"] = cache_server.url
+            print(f"Started local cache server at {cache_server.url}")
+        elif os.environ["CACHE_URL"].startswith("memory://"):
+            print("Warning: CACHE_URL=memory:// gives every worker its own cache")
+        uvicorn.run("main:app", host=host, port=port, workers=workers)
+    else:
+        uvicorn.run("main:app", host=host, port=port, reload=debug)
@@ -0,0 +1,254 @@
+import asyncio
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from middleware.metrics import route_template
+from services.metrics import HTTP_COMPRESSION_BYTES
+from services.tracing import current_span
+
+try:
+    import brotli
+except ImportError:  # optional: br is offered only when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is offered only when installed
+    zstandard = None
+
+# Server preference order; encodings whose module isn't installed are dropped
+COMPRESSION_ENCODINGS = [
+    name.strip() for name in os.environ.get("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if name.strip()
+]
+# Bodies smaller than this are sent as-is: they fit in a packet or two and gain nothing
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+# Per-route overrides of COMPRESSION_MIN_SIZE, keyed by route template
+ROUTE_MIN_SIZE: Dict[str, int] = {
+    "/logs/export/{agent_id}": 256,
+    "/agents/": 512,
+    "/metrics": 512
+}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+# Chunks larger than this are compressed in a worker thread to keep the event loop free
+OFFLOAD_BYTES = 256 * 1024
+
+# Server-sent events must reach the client chunk by chunk, so they are never compressed
+COMPRESSIBLE_TYPES = ("text/html", "text/plain", "text/csv", "text/xml", "application/json",
+                      "application/javascript", "application/xml")
+
+class _GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class _ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+ENCODERS: Dict[str, Callable] = {"gzip": _GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = _BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = _ZstdEncoder
+
+def negotiate(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    """Pick the client's highest-q encoding among `available`; ties go to server order"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        name = name.strip()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for name in available:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type in COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+class CompressionMiddleware:
+    """Negotiated gzip/br/zstd response compression
+
+    Plain ASGI like the other middleware: bodies are compressed as they are
+    sent, so StreamingResponse exports stay streamed. A body is buffered only
+    until it reaches the route's minimum size; responses that end below it
+    go out uncompressed with their original Content-Length. Compressible
+    responses always carry Vary: Accept-Encoding, compressed or not.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 route_minimum_size: Optional[Dict[str, int]] = None,
+                 encodings: Sequence[str] = COMPRESSION_ENCODINGS):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.route_minimum_size = ROUTE_MIN_SIZE if route_minimum_size is None else route_minimum_size
+        self.encodings = [name for name in encodings if name in ENCODERS]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        encoding = negotiate(accept_encoding, self.encodings) if accept_encoding else None
+        await _CompressionResponder(self, scope, send, encoding).run(receive)
+
+class _CompressionResponder:
+    """Per-response state: held start message, size buffer and the encoder once committed"""
+
+    def __init__(self, middleware: CompressionMiddleware, scope, send, encoding: Optional[str]):
+        self.middleware = middleware
+        self.scope = scope
+        self.send = send
+        self.encoding = encoding
+        self.start_message = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.minimum_size = 0
+        self.passthrough = True
+        self.encoder = None
+        self.original_bytes = 0
+        self.compressed_bytes = 0
+
+    async def run(self, receive) -> None:
+        await self.middleware.app(self.scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message) -> None:
+        if message["type"] == "http.response.start":
+            await self.on_start(message)
+        elif message["type"] == "http.response.body" and not self.passthrough:
+            await self.on_body(message)
+        else:
+            await self.send(message)
+
+    async def on_start(self, message) -> None:
+        headers = MutableHeaders(scope=message)
+        status = message["status"]
+        compressible = is_compressible(headers.get("content-type", ""))
+        if compressible or status == 304:
+            # A 304 must repeat the Vary its 200 would have carried
+            headers.add_vary_header("Accept-Encoding")
+
+        if (not compressible or self.encoding is None or "content-encoding" in headers
+                or status < 200 or status in (204, 304)):
+            await self.send(message)
+            return
+
+        route_path = route_template(self.scope)
+        self.minimum_size = self.middleware.route_minimum_size.get(route_path, self.middleware.minimum_size)
+        content_length = headers.get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) < self.minimum_size:
+            await self.send(message)
+            return
+
+        self.start_message = message
+        self.passthrough = False
+
+    async def on_body(self, message) -> None:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if self.buffered < self.minimum_size or not self.buffered:
+                if more_body:
+                    return
+                # Ended below the threshold: release what was held, unchanged
+                self.passthrough = True
+                headers = MutableHeaders(scope=self.start_message)
+                if "content-length" not in headers:
+                    headers["Content-Length"] = str(self.buffered)
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": b"".join(self.buffer)})
+                return
+            body = b"".join(self.buffer)
+            self.buffer = []
+            await self.begin(body, more_body)
+            return
+
+        await self.send_compressed(body, more_body)
+
+    async def begin(self, body: bytes, more_body: bool) -> None:
+        self.encoder = ENCODERS[self.encoding]()
+        compressed = await self.compress(body, more_body)
+
+        headers = MutableHeaders(scope=self.start_message)
+        headers["Content-Encoding"] = self.encoding
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The compressed bytes differ from the identity representation
+            headers["ETag"] = f"W/{etag}"
+        if more_body:
+            del headers["content-length"]
+        else:
+            headers["Content-Length"] = str(len(compressed))
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+        if not more_body:
+            self.record()
+
+    async def send_compressed(self, body: bytes, more_body: bool) -> None:
+        compressed = await self.compress(body, more_body)
+        if compressed or not more_body:
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+        if not more_body:
+            self.record()
+
+    async def compress(self, body: bytes, more_body: bool) -> bytes:
+        def work() -> bytes:
+            data = self.encoder.compress(body)
+            return data if more_body else data + self.encoder.finish()
+
+        self.original_bytes += len(body)
+        data = await asyncio.to_thread(work) if len(body) > OFFLOAD_BYTES else work()
+        self.compressed_bytes += len(data)
+        return data
+
+    def record(self) -> None:
+        route_path = route_template(self.scope)
+        HTTP_COMPRESSION_BYTES.inc(route_path, self.encoding, "original", amount=self.original_bytes)
+        HTTP_COMPRESSION_BYTES.inc(route_path, self.encoding, "compressed", amount=self.compressed_bytes)
+        span = current_span()
+        span.set_attribute("http.response.encoding", self.encoding)
+        span.set_attribute("http.response.compressed_bytes", self.compressed_bytes)
@@ -0,0 +1,45 @@
+import time
+
+from services.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS
+
+def route_template(scope) -> str:
+    """The matched route's path template, e.g. /agents/{agent_id}, once routing has run"""
+    # Routes of included routers only know their prefixed path through FastAPI's route context
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    template = getattr(context, "path_format", None) or getattr(scope.get("route"), "path_format", None)
+    return template or "unmatched"
+
+class MetricsMiddleware:
+    """Per-route request counts, latency histograms and the in-flight gauge
+
+    Plain ASGI rather than BaseHTTPMiddleware, so streaming responses pass
+    through untouched and the overhead stays at a few microseconds. Routes
+    are labelled by their template (/agents/{agent_id}), never the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route_path = route_template(scope)
+            HTTP_REQUESTS.inc(route_path, scope["method"], str(status_code))
+            HTTP_LATENCY.observe(elapsed, route_path, scope["method"])
@@ -0,0 +1,67 @@
+import math
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+from services.metrics import RATE_LIMITED
+from services.ratelimit import (
+    RATE_LIMITS, RateLimitStore, UsageTracker, bind_usage, client_address, client_key, get_rate_limit_store, parse_limits,
+    route_class, unbind_usage, usage as default_usage
+)
+from utils.responses import FastJSONResponse
+
+class RateLimitMiddleware:
+    """Token-bucket limits per client and route class
+
+    Buckets are per client address (see client_address); usage is reported
+    per address and the X-API-Key or principal it claims (see client_key).
+    /ai/* and /agents* get their own, tighter buckets. Over-limit requests
+    get a 429 with Retry-After before any handler runs. Allowed requests
+    carry X-RateLimit-Limit/-Remaining, and the upstream attempts they make
+    are counted against the client.
+    """
+
+    def __init__(self, app, store: Optional[RateLimitStore] = None,
+                 limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 usage: Optional[UsageTracker] = None):
+        self.app = app
+        self.store = store or get_rate_limit_store()
+        self.limits = parse_limits(RATE_LIMITS) if limits is None else limits
+        self.usage = usage or default_usage
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        limit_class = route_class(scope["path"])
+        limit = (self.limits.get(limit_class) or self.limits.get("default")) if limit_class else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        rate, burst = limit
+        client = client_key(scope)
+        allowed, remaining, retry_after = self.store.take(f"{limit_class}:{client_address(scope)}", rate, burst)
+        counters = self.usage.record(client, limit_class, allowed)
+        limit_headers = {"X-RateLimit-Limit": f"{burst:g}", "X-RateLimit-Remaining": str(int(remaining))}
+        if not allowed:
+            RATE_LIMITED.inc(limit_class)
+            response = FastJSONResponse(
+                {"detail": "Rate limit exceeded"}, status_code=429,
+                headers={**limit_headers, "Retry-After": str(math.ceil(retry_after))}
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in limit_headers.items():
+                    headers[name] = value
+            await send(message)
+
+        token = bind_usage(counters)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            unbind_usage(token)
@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from middleware.metrics import route_template
+from services.profiler import slow_requests
+from services.tracing import Span, start_trace
+
+class TracingMiddleware:
+    """Opens the root trace span of each request
+
+    Upstream and storage calls made while serving the request become its
+    children. A W3C `traceparent` request header continues the caller's
+    trace; sampled requests get one back pointing at the root span.
+
+    With SLOW_REQUEST_MS set, every request is recorded and the ones over the
+    threshold are kept in the slow-request log with their span breakdown.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        record = slow_requests.enabled
+        handle = slow_requests.watch() if record else None
+        first_byte_at = None
+        start = time.perf_counter()
+
+        span = None
+        try:
+            with start_trace(f"{scope['method']} request", traceparent, record,
+                             **{"http.method": scope["method"]}) as span:
+                async def send_wrapper(message):
+                    nonlocal first_byte_at
+                    if message["type"] == "http.response.start":
+                        first_byte_at = time.perf_counter()
+                        span.set_attribute("http.status_code", message["status"])
+                        if message["status"] >= 500:
+                            span.set_status("error")
+                        if span.sampled:
+                            message["headers"] = list(message.get("headers", [])) + [
+                                (b"traceparent", span.traceparent.encode("latin-1"))
+                            ]
+                    await send(message)
+
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    route_path = route_template(scope)
+                    span.update_name(f"{scope['method']} {route_path}")
+                    span.set_attribute("http.route", route_path)
+        finally:
+            # Failed requests must leave the watch list too, or the watchdog keeps sampling them
+            if record:
+                elapsed = time.perf_counter() - start
+                slow = span is not None and elapsed >= slow_requests.threshold
+                slow_requests.finish(handle, _slow_entry(scope, span, elapsed, start, first_byte_at) if slow else None)
+
+def _slow_entry(scope, root: Span, elapsed: float, start: float, first_byte_at) -> Dict:
+    children = [span for span in root.recorded if span is not root]
+    spent: Dict[str, float] = {}
+    for span in children:
+        kind = span.name.split(" ", 1)[0]
+        spent[f"{kind}_ms"] = spent.get(f"{kind}_ms", 0) + (span.end_ns - span.start_ns) / 1e6
+    phases = {name: round(value, 3) for name, value in spent.items()}
+    if first_byte_at is not None:
+        # Handler, validation and serialization happen before the first byte; streaming after it
+        phases["time_to_first_byte_ms"] = round((first_byte_at - start) * 1000, 3)
+        phases["send_ms"] = round((start + elapsed - first_byte_at) * 1000, 3)
+
+    return {
+        "trace_id": root.trace_id,
+        "method": scope["method"],
+        "route": root.attributes.get("http.route"),
+        "path": scope["path"],
+        "status": root.attributes.get("http.status_code"),
+        "started_at": datetime.fromtimestamp(root.start_ns / 1e9, timezone.utc).isoformat(),
+        "duration_ms": round(elapsed * 1000, 3),
+        "phases": phases,
+        "spans": _span_summaries(root, children)
+    }
+
+def _span_summaries(root: Span, children: List[Span]) -> List[Dict]:
+    return [{
+        "name": span.name,
+        "offset_ms": round((span.start_ns - root.start_ns) / 1e6, 3),
+        "duration_ms": round((span.end_ns - span.start_ns) / 1e6, 3),
+        "status": span.status,
+        "attributes": span.attributes
+    } for span in sorted(children, key=lambda span: span.start_ns)]
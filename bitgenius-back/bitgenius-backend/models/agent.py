@@ -45,9 +45,15 @@ class AgentStatus(BaseModel):
     status: str
     last_active: int
 
+class BulkStatusUpdate(BaseModel):
+    agent_ids: List[int] = Field(..., min_length=1, max_length=500)
+    status: str
+    sender: Optional[str] = "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM"
+
 class AgentOverview(BaseModel):
     agent_count: int
     active_agents: int
     idle_agents: int
     stopped_agents: int
+    total_allocation: int = 0
     wallet_balance: float
@@ -0,0 +1,45 @@
+from pydantic import BaseModel, field_validator
+from typing import List
+
+def _as_list(value):
+    # Models sometimes answer a single string where an array was requested
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return value
+
+class TriggerValidation(BaseModel):
+    valid: bool
+    errors: List[str] = []
+    suggestions: List[str] = []
+
+    @field_validator("errors", "suggestions", mode="before")
+    @classmethod
+    def _coerce_lists(cls, value):
+        return _as_list(value)
+
+class LogSummary(BaseModel):
+    summary: str
+    insights: List[str] = []
+    tags: List[str] = []
+
+    @field_validator("insights", "tags", mode="before")
+    @classmethod
+    def _coerce_lists(cls, value):
+        return _as_list(value)
+
+class AIHelp(BaseModel):
+    title: str
+    tips: List[str] = []
+    example: str = ""
+
+    @field_validator("tips", mode="before")
+    @classmethod
+    def _coerce_lists(cls, value):
+        return _as_list(value)
+
+    @field_validator("example", mode="before")
+    @classmethod
+    def _coerce_example(cls, value):
+        return "" if value is None else value
@@ -0,0 +1,134 @@
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Iterator, Optional, Tuple
+
+_intern = sys.intern
+
+def slot_names(fields: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Attribute names for record keys: wire keys such as "agent-type" become agent_type"""
+    return tuple(key.replace("-", "_") for key in fields)
+
+class Record(Mapping):
+    """Compact internal stand-in for a dict with a known set of keys
+
+    Known fields live in __slots__, and a slot left unset is an absent key.
+    FIELDS are the keys as the data source spells them; hyphenated contract
+    keys map to the matching snake_case slot and come back out hyphenated.
+    Any other keys go to `_extra`, so from_dict/to_dict round-trip exactly.
+    Records read like the dicts they replace (record["status"],
+    record.get("fee"), dict(record)), so code written against dicts keeps
+    working. Low-cardinality string fields are interned, so every record
+    holding "success" shares one string.
+
+    Keep records inside caches and pipelines and turn them back into dicts
+    or JSON at the response boundary. They are not Pydantic models and
+    are not validated.
+    """
+
+    __slots__ = ("_extra",)
+    FIELDS: Tuple[str, ...] = ()
+    INTERNED: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Record":
+        record = cls.__new__(cls)
+        extra = None
+        slot_of, interned = cls._slot_of, cls.INTERNED
+        for key, value in data.items():
+            slot = slot_of.get(key)
+            if slot is not None:
+                setattr(record, slot, _intern(value) if key in interned and type(value) is str else value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        record._extra = extra
+        return record
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._slot_of = dict(zip(cls.FIELDS, slot_names(cls.FIELDS)))
+        cls._pairs = tuple(cls._slot_of.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for key, slot in self._pairs:
+            try:
+                data[key] = getattr(self, slot)
+            except AttributeError:
+                pass
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def __getitem__(self, key: str) -> Any:
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            return getattr(self, slot, default)
+        return self._extra.get(key, default) if self._extra is not None else default
+
+    def __contains__(self, key: object) -> bool:
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            return hasattr(self, slot)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        for key, slot in self._pairs:
+            if hasattr(self, slot):
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _, slot in self._pairs if hasattr(self, slot)) + len(self._extra or ())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class AgentRecord(Record):
+    """An agent as get-agent-by-id returns it, hyphenated keys and all (see models.agent.Agent for the API shape)"""
+
+    FIELDS = ("agent_id", "owner", "name", "agent-type", "strategy", "status", "trigger-condition",
+              "privacy-enabled", "allocation", "created-at", "last-active")
+    INTERNED = frozenset({"owner", "agent-type", "status", "trigger-condition"})
+    __slots__ = slot_names(FIELDS)
+
+class LogRecord(Record):
+    """An agent log entry plus its storage id (see models.log.LogEntry)"""
+
+    FIELDS = ("id", "agent_id", "timestamp", "action", "status", "transaction_id", "amount", "fee", "details")
+    INTERNED = frozenset({"action", "status"})
+    __slots__ = FIELDS
+
+class TransactionRecord(Record):
+    """A transaction derived from a log entry (see models.log.Transaction)"""
+
+    FIELDS = ("tx_id", "timestamp", "amount", "fee", "status", "details")
+    INTERNED = frozenset({"status"})
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_log(cls, log: Mapping) -> Optional["TransactionRecord"]:
+        """The log's transaction, or None if it has no transaction id"""
+        if not log.get("transaction_id"):
+            return None
+        return cls.from_dict({
+            "tx_id": log.get("transaction_id"),
+            "timestamp": log.get("timestamp"),
+            "amount": log.get("amount", 0),
+            "fee": log.get("fee", 0),
+            "status": log.get("status"),
+            "details": log.get("details", "")
+        })
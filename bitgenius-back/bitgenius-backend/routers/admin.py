@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi.responses import PlainTextResponse
+from typing import Dict, Optional
+import asyncio
+import hmac
+import os
+
+from services.profiler import PROFILE_MAX_SECONDS, profiler, render_collapsed, slow_requests
+from services.ratelimit import RATE_LIMIT_ENABLED, RATE_LIMIT_STORE, usage
+
+# Admin routes are only mounted when this is set; callers send it as a bearer token
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    """Reject requests that don't carry the admin bearer token"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Admin token required")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    seconds: float = Query(5, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000)
+):
+    """Sample all threads' stacks for `seconds` and return collapsed stacks for a flamegraph"""
+    result = await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000)
+    if result is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    header = f"# {result['samples']} samples over {result['seconds']}s every {interval_ms}ms\n"
+    return PlainTextResponse(header + render_collapsed(result["stacks"]))
+
+@router.get("/slow-requests", response_model=Dict)
+async def get_slow_requests(limit: int = Query(20, ge=1, le=1000)):
+    """Most recent requests over SLOW_REQUEST_MS, newest first, with spans and loop stacks"""
+    return {
+        "enabled": slow_requests.enabled,
+        "threshold_ms": slow_requests.threshold * 1000,
+        "requests": slow_requests.recent(limit)
+    }
+
+@router.get("/usage", response_model=Dict)
+async def get_usage(limit: int = Query(50, ge=1, le=1000)):
+    """Per-client request, 429 and upstream attempt counts of this worker, costliest first"""
+    return {
+        "enabled": RATE_LIMIT_ENABLED,
+        "store": RATE_LIMIT_STORE,
+        "clients": usage.top(limit)
+    }
@@ -1,47 +1,61 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, Body
+from fastapi import APIRouter, HTTPException, Depends, Query, Body, Request
+from pydantic import TypeAdapter
 from typing import List, Dict, Optional
+import asyncio
 import logging
 
-from services.maestro import maestro_client
-from services.firebase import firestore_client
-from services.gemini import gemini_client
-from models.agent import AgentTemplate, AgentCreate, Agent
+from services.maestro import MaestroClient, get_maestro_client
+from services.firebase import FirestoreClient, get_firestore_client
+from services.gemini import GeminiClient, get_gemini_client
+from services.overview import OverviewStore, get_overview_store
+from services.chain_indexer import CHAIN_INDEXER_ENABLED, get_chain_indexer
+from models.agent import AgentTemplate, AgentCreate, Agent, BulkStatusUpdate
+from models.ai import TriggerValidation, AIHelp
+from utils.clarity import ClarityArgError
+from utils.helpers import normalize_status
+from utils.responses import FastJSONResponse
+from utils.http_cache import conditional_response, content_etag, make_etag
+
+INVALID_STATUS_MESSAGE = "Invalid status. Must be one of: online/active, idle/paused, stopped/inactive"
+# Cache-Control max-age (seconds) for polled reads; ETags keep revalidation cheap past it
+TEMPLATES_MAX_AGE = 300
+AGENT_MAX_AGE = 10
+
+_templates_adapter = TypeAdapter(List[AgentTemplate])
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Dict])
-async def get_agents(principal: Optional[str] = None):
+async def get_agents(principal: Optional[str] = None, maestro_client: MaestroClient = Depends(get_maestro_client)):
     """Get all agents or filter by owner"""
     try:
         if principal:
             agents = maestro_client.get_agents_by_owner(principal)
         else:
-            # Get total number of agents
-            agent_count = maestro_client.get_agent_count()
-            agents = []
-            # Fetch each agent
-            for i in range(1, agent_count + 1):
-                agent = maestro_client.get_agent_by_id(i)
-                if agent:
-                    agents.append(agent)
-        
-        return agents
+            agents = maestro_client.get_all_agents()
+        
+        # Contract reads are plain JSON already; skip re-validating thousands of items
+        return FastJSONResponse(agents)
     except Exception as e:
         logging.error(f"Error fetching agents: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching agents: {str(e)}")
 
 @router.get("/templates", response_model=List[AgentTemplate])
-async def get_agent_templates():
+async def get_agent_templates(request: Request, maestro_client: MaestroClient = Depends(get_maestro_client)):
     """Get all available agent templates"""
     try:
         templates = maestro_client.get_agent_templates()
-        return templates
+        return conditional_response(
+            request, content_etag(templates),
+            lambda: _templates_adapter.dump_python(_templates_adapter.validate_python(templates)),
+            TEMPLATES_MAX_AGE
+        )
     except Exception as e:
         logging.error(f"Error fetching agent templates: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching agent templates: {str(e)}")
 
 @router.post("/", response_model=Dict)
-async def create_agent(agent: AgentCreate):
+async def create_agent(agent: AgentCreate, maestro_client: MaestroClient = Depends(get_maestro_client)):
     """Create a new agent"""
     try:
         # If sender is not provided, use a default value
@@ -62,46 +76,33 @@ async def create_agent(agent: AgentCreate):
             "transaction_payload": tx_payload,
             "message": "Transaction payload prepared successfully. Sign and broadcast this transaction using Stacks.js."
         }
+    except ClarityArgError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error creating agent: {e}")
         raise HTTPException(status_code=500, detail=f"Error creating agent: {str(e)}")
 
 @router.put("/{agent_id}/status")
-async def update_agent_status(agent_id: int, status_data: Dict = Body(...)):
+async def update_agent_status(agent_id: int, status_data: Dict = Body(...), maestro_client: MaestroClient = Depends(get_maestro_client), firestore_client: FirestoreClient = Depends(get_firestore_client), overview_store: OverviewStore = Depends(get_overview_store)):
     """Update agent status"""
     try:
         status = status_data.get("status")
         sender = status_data.get("sender", "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM")
         
-        # Map 'active' to 'online' for compatibility with test suite
-        if status and status.lower() == "active":
-            status = "online"
-        
-        # Map other common status values
-        status_mapping = {
-            "active": "online",
-            "running": "online",
-            "paused": "idle",
-            "suspended": "idle",
-            "inactive": "stopped",
-            "disabled": "stopped"
-        }
-        
-        if status and status.lower() in status_mapping:
-            status = status_mapping[status.lower()]
-        
-        # Validate status
-        if not status or status.lower() not in ["online", "idle", "stopped"]:
+        # Map aliases such as 'active' or 'paused' to contract statuses
+        status = normalize_status(status)
+        if not status:
             return {
                 "status": "error",
-                "message": "Invalid status. Must be one of: online/active, idle/paused, stopped/inactive"
+                "message": INVALID_STATUS_MESSAGE
             }
         
         # Prepare transaction payload
-        tx_payload = maestro_client.prepare_update_agent_status_tx(agent_id, status.lower(), sender)
+        tx_payload = maestro_client.prepare_update_agent_status_tx(agent_id, status, sender)
         
         # Also update status in Firebase for immediate UI feedback
-        firestore_client.update_agent_status(agent_id, status.lower())
+        firestore_client.update_agent_status(agent_id, status)
+        await asyncio.to_thread(overview_store.apply_status_change, agent_id, status)
         
         return {
             "transaction_payload": tx_payload,
@@ -116,7 +117,7 @@ async def update_agent_status(agent_id: int, status_data: Dict = Body(...)):
         }
 
 @router.get("/suggest-name")
-async def suggest_agent_name(goal: str):
+async def suggest_agent_name(goal: str, gemini_client: GeminiClient = Depends(get_gemini_client)):
     """Get AI-generated agent name suggestions"""
     try:
         names = await gemini_client.generate_agent_names(goal)
@@ -125,8 +126,8 @@ async def suggest_agent_name(goal: str):
         logging.error(f"Error generating name suggestions: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating name suggestions: {str(e)}")
 
-@router.post("/validate-trigger")
-async def validate_trigger(trigger: str):
+@router.post("/validate-trigger", response_model=TriggerValidation)
+async def validate_trigger(trigger: str, gemini_client: GeminiClient = Depends(get_gemini_client)):
     """Validate a trigger condition"""
     try:
         validation = await gemini_client.validate_trigger(trigger)
@@ -136,7 +137,7 @@ async def validate_trigger(trigger: str):
         raise HTTPException(status_code=500, detail=f"Error validating trigger: {str(e)}")
 
 @router.post("/create")
-async def create_agent(agent: AgentCreate):
+async def create_agent(agent: AgentCreate, maestro_client: MaestroClient = Depends(get_maestro_client)):
     """Create a new agent"""
     try:
         # Prepare transaction payload for registering the agent
@@ -154,43 +155,30 @@ async def create_agent(agent: AgentCreate):
             "transaction_payload": tx_payload,
             "message": "Transaction payload prepared successfully. Sign and broadcast this transaction using Stacks.js."
         }
+    except ClarityArgError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error creating agent: {e}")
         raise HTTPException(status_code=500, detail=f"Error creating agent: {str(e)}")
 
 @router.post("/update-status/{agent_id}")
-async def update_agent_status_post(agent_id: int, status: str, sender: str = "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM"):
+async def update_agent_status_post(agent_id: int, status: str, sender: str = "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM", maestro_client: MaestroClient = Depends(get_maestro_client), firestore_client: FirestoreClient = Depends(get_firestore_client), overview_store: OverviewStore = Depends(get_overview_store)):
     """Update agent status (POST method)"""
     try:
-        # Map 'active' to 'online' for compatibility with test suite
-        if status.lower() == "active":
-            status = "online"
-            
-        # Map other common status values
-        status_mapping = {
-            "active": "online",
-            "running": "online",
-            "paused": "idle",
-            "suspended": "idle",
-            "inactive": "stopped",
-            "disabled": "stopped"
-        }
-        
-        if status.lower() in status_mapping:
-            status = status_mapping[status.lower()]
-            
-        # Validate status
-        if status.lower() not in ["online", "idle", "stopped"]:
+        # Map aliases such as 'active' or 'paused' to contract statuses
+        status = normalize_status(status)
+        if not status:
             return {
                 "status": "error",
-                "message": "Invalid status. Must be one of: online/active, idle/paused, stopped/inactive"
+                "message": INVALID_STATUS_MESSAGE
             }
         
         # Prepare transaction payload
-        tx_payload = maestro_client.prepare_update_agent_status_tx(agent_id, status.lower(), sender)
+        tx_payload = maestro_client.prepare_update_agent_status_tx(agent_id, status, sender)
         
         # Also update status in Firebase for immediate UI feedback
-        firestore_client.update_agent_status(agent_id, status.lower())
+        firestore_client.update_agent_status(agent_id, status)
+        await asyncio.to_thread(overview_store.apply_status_change, agent_id, status)
         
         return {
             "transaction_payload": tx_payload,
@@ -204,8 +192,50 @@ async def update_agent_status_post(agent_id: int, status: str, sender: str = "ST
             "message": f"Error updating status: {str(e)}"
         }
 
-@router.get("/ai-help")
-async def get_ai_help(context: str):
+@router.post("/bulk-status")
+async def update_agent_statuses(update: BulkStatusUpdate, maestro_client: MaestroClient = Depends(get_maestro_client), firestore_client: FirestoreClient = Depends(get_firestore_client), overview_store: OverviewStore = Depends(get_overview_store)):
+    """Update the status of many agents at once"""
+    status = normalize_status(update.status)
+    if not status:
+        return {
+            "status": "error",
+            "message": INVALID_STATUS_MESSAGE
+        }
+    
+    try:
+        agent_ids = list(dict.fromkeys(update.agent_ids))
+        payloads = await asyncio.to_thread(
+            maestro_client.prepare_update_agent_status_txs, agent_ids, status, update.sender
+        )
+        
+        # Only agents whose transaction could be prepared change status
+        prepared = {
+            agent_id: status
+            for agent_id, payload in zip(agent_ids, payloads)
+            if "error" not in payload
+        }
+        stored = bool(prepared) and firestore_client.update_agent_statuses(prepared)
+        if stored:
+            await asyncio.to_thread(overview_store.apply_status_changes, prepared)
+        
+        results = []
+        for agent_id, payload in zip(agent_ids, payloads):
+            if "error" in payload:
+                results.append({"agent_id": agent_id, "status": "error", "message": payload["error"]})
+            else:
+                results.append({"agent_id": agent_id, "status": status, "transaction_payload": payload, "stored": stored})
+        
+        return {
+            "status": status,
+            "updated": len(prepared) if stored else 0,
+            "results": results
+        }
+    except Exception as e:
+        logging.error(f"Error updating agent statuses: {e}")
+        raise HTTPException(status_code=500, detail=f"Error updating agent statuses: {str(e)}")
+
+@router.get("/ai-help", response_model=AIHelp)
+async def get_ai_help(context: str, gemini_client: GeminiClient = Depends(get_gemini_client)):
     """Get AI help based on context"""
     try:
         help_data = await gemini_client.get_ai_help(context)
@@ -215,13 +245,33 @@ async def get_ai_help(context: str):
         raise HTTPException(status_code=500, detail=f"Error getting AI help: {str(e)}")
 
 @router.get("/{agent_id}", response_model=Agent)
-async def get_agent(agent_id: int):
+async def get_agent(
+    agent_id: int,
+    request: Request,
+    maestro_client: MaestroClient = Depends(get_maestro_client)
+):
     """Get agent details by ID"""
     try:
-        agent = maestro_client.get_agent_by_id(agent_id)
-        if not agent:
-            raise HTTPException(status_code=404, detail=f"Agent with ID {agent_id} not found")
-        return agent
+        checkpoint = get_chain_indexer().checkpoint() if CHAIN_INDEXER_ENABLED else None
+        if checkpoint:
+            # Agents only change in blocks: the indexed tip versions them without asking Maestro
+            etag = make_etag("agent", agent_id, checkpoint["height"], checkpoint["hash"])
+            agent = None
+        else:
+            agent = maestro_client.get_agent_by_id(agent_id)
+            if not agent:
+                raise HTTPException(status_code=404, detail=f"Agent with ID {agent_id} not found")
+            etag = content_etag(agent)
+        
+        def build() -> Dict:
+            data = agent if agent is not None else maestro_client.get_agent_by_id(agent_id)
+            if not data:
+                raise HTTPException(status_code=404, detail=f"Agent with ID {agent_id} not found")
+            return Agent.model_validate(data).model_dump()
+        
+        return conditional_response(request, etag, build, AGENT_MAX_AGE)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error fetching agent: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching agent: {str(e)}")
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Dict, Optional
 
-from services.gemini import gemini_client
+from services.gemini import GeminiClient, get_gemini_client
+from models.ai import TriggerValidation, LogSummary, AIHelp
 
 router = APIRouter()
 
 @router.post("/strategy", response_model=Dict)
-async def get_strategy_recommendations(request_data: Dict):
+async def get_strategy_recommendations(request_data: Dict, gemini_client: GeminiClient = Depends(get_gemini_client)):
     """Get strategy recommendations based on market conditions and risk preference"""
     try:
         market_condition = request_data.get("market_condition", "neutral")
@@ -23,7 +24,7 @@ async def get_strategy_recommendations(request_data: Dict):
         Format your response as structured data only, no introductions or conclusions.
         """
         
-        response = await gemini_client.model.generate_content_async(prompt)
+        response = await gemini_client.generate(prompt)
         
         return {
             "market_condition": market_condition,
@@ -34,7 +35,7 @@ async def get_strategy_recommendations(request_data: Dict):
         raise HTTPException(status_code=500, detail=f"Error generating strategy recommendations: {str(e)}")
 
 @router.post("/analyze", response_model=Dict)
-async def analyze_market(request_data: Dict):
+async def analyze_market(request_data: Dict, gemini_client: GeminiClient = Depends(get_gemini_client)):
     """Analyze market based on specified indicators"""
     try:
         timeframe = request_data.get("timeframe", "daily")
@@ -48,7 +49,7 @@ async def analyze_market(request_data: Dict):
         Format your response as structured data only, no introductions or conclusions.
         """
         
-        response = await gemini_client.model.generate_content_async(prompt)
+        response = await gemini_client.generate(prompt)
         
         return {
             "timeframe": timeframe,
@@ -59,7 +60,7 @@ async def analyze_market(request_data: Dict):
         raise HTTPException(status_code=500, detail=f"Error generating market analysis: {str(e)}")
 
 @router.get("/suggest-name")
-async def suggest_agent_name(goal: str):
+async def suggest_agent_name(goal: str, gemini_client: GeminiClient = Depends(get_gemini_client)):
     """Get AI-generated agent name suggestions"""
     try:
         names = await gemini_client.generate_agent_names(goal)
@@ -67,8 +68,8 @@ async def suggest_agent_name(goal: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating name suggestions: {str(e)}")
 
-@router.post("/validate-trigger")
-async def validate_trigger(trigger: str):
+@router.post("/validate-trigger", response_model=TriggerValidation)
+async def validate_trigger(trigger: str, gemini_client: GeminiClient = Depends(get_gemini_client)):
     """Validate a trigger condition"""
     try:
         validation = await gemini_client.validate_trigger(trigger)
@@ -76,8 +77,8 @@ async def validate_trigger(trigger: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error validating trigger: {str(e)}")
 
-@router.post("/summarize-logs")
-async def summarize_logs(logs: List[Dict]):
+@router.post("/summarize-logs", response_model=LogSummary)
+async def summarize_logs(logs: List[Dict], gemini_client: GeminiClient = Depends(get_gemini_client)):
     """Summarize a set of agent logs"""
     try:
         summary = await gemini_client.summarize_logs(logs)
@@ -85,8 +86,8 @@ async def summarize_logs(logs: List[Dict]):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error summarizing logs: {str(e)}")
 
-@router.get("/help")
-async def get_ai_help(context: str):
+@router.get("/help", response_model=AIHelp)
+async def get_ai_help(context: str, gemini_client: GeminiClient = Depends(get_gemini_client)):
     """Get AI help based on context"""
     try:
         help_data = await gemini_client.get_ai_help(context)
@@ -95,11 +96,11 @@ async def get_ai_help(context: str):
         raise HTTPException(status_code=500, detail=f"Error getting AI help: {str(e)}")
 
 @router.post("/explain-strategy")
-async def explain_strategy(strategy: str):
+async def explain_strategy(strategy: str, gemini_client: GeminiClient = Depends(get_gemini_client)):
     """Get AI explanation of a strategy"""
     try:
         prompt = f"Explain this Bitcoin trading strategy in simple terms: {strategy}"
-        explanation = await gemini_client.model.generate_content_async(prompt)
+        explanation = await gemini_client.generate(prompt)
         return {"explanation": explanation.text}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error explaining strategy: {str(e)}")
@@ -1,20 +1,58 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Dict, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Optional, Sequence
+from pydantic import TypeAdapter
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import os
 
-from services.maestro import maestro_client
-from services.firebase import firestore_client
-from services.btc import btc_client
+from services.maestro import MaestroClient, get_maestro_client, raise_for_failed_lookups
+from services.firebase import FirestoreClient, get_firestore_client
+from services.btc import BTCClient, get_btc_client
+from services.cache import CacheBackend, get_cache_backend
+from services.address_index import AddressIndexer, get_address_indexer
+from services.overview import OverviewStore, get_overview_store
+from services.rollup import MetricsRollup, get_metrics_rollup
 from models.agent import AgentOverview
 from models.log import Notification
+from models.wallet import WalletBatchRequest
+from utils.helpers import sats_to_btc
+from utils.http_cache import conditional_response, content_etag, make_etag
 
 router = APIRouter()
 
+# Cache-Control max-age (seconds) for polled reads; ETags keep revalidation cheap past it
+MARKET_MAX_AGE = 15
+NOTIFICATIONS_MAX_AGE = 5
+
+_notifications_adapter = TypeAdapter(List[Notification])
+
+# Each open live console holds a thread waiting on its subscription. They get their
+# own pool so open consoles can't starve the default executor other routes rely on
+LIVE_CONSOLE_MAX_STREAMS = int(os.environ.get("LIVE_CONSOLE_MAX_STREAMS", "256"))
+_console_executor = ThreadPoolExecutor(max_workers=LIVE_CONSOLE_MAX_STREAMS, thread_name_prefix="live-console")
+_open_consoles = 0
+
 @router.get("/summary", response_model=Dict)
-async def get_dashboard_summary():
+async def get_dashboard_summary(
+    maestro_client: MaestroClient = Depends(get_maestro_client),
+    btc_client: BTCClient = Depends(get_btc_client),
+    rollup: MetricsRollup = Depends(get_metrics_rollup)
+):
     """Get summary data for the dashboard"""
     try:
-        # Get the number of agents
-        agent_count = maestro_client.get_agent_count()
+        agent_count = await asyncio.to_thread(maestro_client.get_agent_count)
+        if rollup.needs_reseed:
+            # First start without a snapshot, or ROLLUP_RESEED_SECONDS since the last full read
+            await asyncio.to_thread(_seed_rollup, rollup, maestro_client, range(1, agent_count + 1), True)
+        else:
+            # No event announces registrations: read just the agents added since the last seed
+            new_agents = rollup.unknown_agents(agent_count)
+            if new_agents:
+                await asyncio.to_thread(_seed_rollup, rollup, maestro_client, new_agents, False)
+        
+        metrics = rollup.summary()
         
         # Get BTC price
         btc_price = btc_client.get_btc_price()
@@ -22,20 +60,32 @@ async def get_dashboard_summary():
         return {
             "agent_count": agent_count,
             "btc_price": btc_price,
-            "active_agents": agent_count // 2,  # Placeholder logic
-            "latest_performance": 5.2  # Placeholder value
+            "active_agents": metrics["agents_by_status"].get("online", 0),
+            "latest_performance": round(metrics["success_rate"], 2),
+            "metrics": metrics
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching dashboard summary: {str(e)}")
 
+def _seed_rollup(rollup: MetricsRollup, maestro_client: MaestroClient, agent_ids: Sequence[int], replace: bool) -> None:
+    agents = maestro_client.get_agents_by_ids(agent_ids)
+    # A partial seed would stick, so fail and let the next request seed again
+    raise_for_failed_lookups(agent_ids, agents)
+    statuses = {
+        str(agent_id): agent.get("status", "")
+        for agent_id, agent in zip(agent_ids, agents)
+        if agent
+    }
+    rollup.seed_agent_statuses(statuses, replace)
+
 @router.get("/market", response_model=Dict)
-async def get_market_data():
+async def get_market_data(request: Request, btc_client: BTCClient = Depends(get_btc_client)):
     """Get market data for the dashboard"""
     try:
         btc_price = btc_client.get_btc_price()
         
         # Placeholder market data
-        return {
+        return conditional_response(request, make_etag("market", btc_price), lambda: {
             "btc_price": btc_price,
             "price_change_24h": 1.2,
             "volume_24h": 28765430000,
@@ -47,45 +97,37 @@ async def get_market_data():
                 {"timestamp": 1656054000, "price": 20300},
                 {"timestamp": 1656057600, "price": 20250}
             ]
-        }
+        }, MARKET_MAX_AGE)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching market data: {str(e)}")
 
 @router.get("/overview/{principal}", response_model=AgentOverview)
-async def get_dashboard_overview(principal: str):
+async def get_dashboard_overview(
+    principal: str,
+    btc_address: Optional[str] = None,
+    overview_store: OverviewStore = Depends(get_overview_store),
+    indexer: AddressIndexer = Depends(get_address_indexer)
+):
     """Get overview data for the dashboard"""
     try:
-        agents = maestro_client.get_agents_by_owner(principal)
-        
-        active_count = 0
-        idle_count = 0
-        stopped_count = 0
-        
-        for agent in agents:
-            status = agent.get("status", "").lower()
-            if status == "online":
-                active_count += 1
-            elif status == "idle":
-                idle_count += 1
-            elif status == "stopped":
-                stopped_count += 1
-        
-        total_count = len(agents)
+        if not overview_store.seeded:
+            # Seeding scans the contract and may wait on another worker's seed: keep it off the loop
+            await asyncio.to_thread(overview_store.ensure_seeded)
+        overview = overview_store.get_overview(principal)
         
         wallet_balance = 0.0
+        if btc_address:
+            wallet_balance = await asyncio.to_thread(
+                overview_store.get_wallet_balance,
+                btc_address, lambda: sats_to_btc(indexer.refresh(btc_address).balance())
+            )
         
-        return {
-            "agent_count": total_count,
-            "active_agents": active_count,
-            "idle_agents": idle_count,
-            "stopped_agents": stopped_count,
-            "wallet_balance": wallet_balance
-        }
+        return {**overview, "wallet_balance": wallet_balance}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching dashboard overview: {str(e)}")
 
 @router.get("/live-console/{agent_id}")
-async def get_live_console(agent_id: int, limit: int = Query(10, ge=1, le=100)):
+async def get_live_console(agent_id: int, limit: int = Query(10, ge=1, le=100), maestro_client: MaestroClient = Depends(get_maestro_client), firestore_client: FirestoreClient = Depends(get_firestore_client)):
     """Get the latest logs for the live console"""
     try:
         logs = firestore_client.get_agent_logs(agent_id, limit)
@@ -99,8 +141,34 @@ async def get_live_console(agent_id: int, limit: int = Query(10, ge=1, le=100)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching live console data: {str(e)}")
 
+@router.get("/live-console/{agent_id}/stream")
+async def stream_live_console(agent_id: int, cache: CacheBackend = Depends(get_cache_backend)):
+    """Stream new logs for the live console as server-sent events"""
+    if _open_consoles >= LIVE_CONSOLE_MAX_STREAMS:
+        raise HTTPException(status_code=503, detail="Too many open live consoles", headers={"Retry-After": "15"})
+    
+    async def events():
+        # Subscribed and counted only once streaming starts, and counted only if
+        # subscribing worked, so the finally below always undoes the count
+        global _open_consoles
+        subscription = cache.subscribe(f"agent-logs:{agent_id}")
+        _open_consoles += 1
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                message = await loop.run_in_executor(_console_executor, subscription.get_message, 15.0)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"data: {json.dumps(message)}\n\n"
+        finally:
+            _open_consoles -= 1
+            subscription.close()
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @router.get("/performance/{agent_id}")
-async def get_performance_metrics(agent_id: int, period: Optional[str] = "day"):
+async def get_performance_metrics(agent_id: int, period: Optional[str] = "day", maestro_client: MaestroClient = Depends(get_maestro_client)):
     """Get performance metrics for an agent"""
     try:
         period_value = 1  
@@ -116,36 +184,74 @@ async def get_performance_metrics(agent_id: int, period: Optional[str] = "day"):
         raise HTTPException(status_code=500, detail=f"Error fetching performance metrics: {str(e)}")
 
 @router.get("/wallet/{btc_address}")
-async def get_wallet_info(btc_address: str):
+async def get_wallet_info(
+    btc_address: str,
+    limit: int = Query(10, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    btc_client: BTCClient = Depends(get_btc_client),
+    indexer: AddressIndexer = Depends(get_address_indexer)
+):
     """Get wallet balance and transaction history"""
     try:
-        address_info = btc_client.get_address_info(btc_address)
-        
-        transactions = btc_client.get_address_transactions(btc_address, 10)
-        
-        btc_price = btc_client.get_btc_price()
+        index, btc_price = await asyncio.gather(
+            asyncio.to_thread(indexer.refresh, btc_address),
+            asyncio.to_thread(btc_client.get_btc_price)
+        )
         
         return {
             "address": btc_address,
-            "balance_sats": address_info.get("chain_stats", {}).get("funded_txo_sum", 0) - 
-                           address_info.get("chain_stats", {}).get("spent_txo_sum", 0),
-            "transactions": transactions,
+            "balance_sats": index.balance(),
+            "pending_sats": index.pending(),
+            "tx_count": index.tx_count,
+            "transactions": index.transactions(offset, limit),
+            "utxos": index.utxos(include_mempool=True),
             "btc_price_usd": btc_price
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching wallet information: {str(e)}")
 
+@router.post("/wallets")
+async def get_wallet_balances(request: WalletBatchRequest, btc_client: BTCClient = Depends(get_btc_client)):
+    """Get balances for many wallets at once, with one shared price lookup"""
+    try:
+        # Preserve order, drop duplicates
+        addresses = list(dict.fromkeys(request.addresses))
+        
+        wallets, btc_price = await asyncio.gather(
+            btc_client.get_balances(addresses),
+            asyncio.to_thread(btc_client.get_btc_price)
+        )
+        
+        total_sats = sum(wallet.get("balance_sats", 0) for wallet in wallets)
+        pending_sats = sum(wallet.get("pending_sats", 0) for wallet in wallets)
+        
+        return {
+            "total_balance_sats": total_sats,
+            "total_pending_sats": pending_sats,
+            "total_balance_usd": sats_to_btc(total_sats) * btc_price,
+            "btc_price_usd": btc_price,
+            "failed": sum(1 for wallet in wallets if "error" in wallet),
+            "wallets": wallets
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching wallet balances: {str(e)}")
+
 @router.get("/notifications/{principal}", response_model=List[Notification])
-async def get_notifications(principal: str, limit: int = Query(10, ge=1, le=50)):
+async def get_notifications(request: Request, principal: str, limit: int = Query(10, ge=1, le=50), firestore_client: FirestoreClient = Depends(get_firestore_client)):
     """Get notifications for a user"""
     try:
+        # Hash the page itself: notifications may be written by other processes, so no local version can be trusted
         notifications = firestore_client.get_notifications(principal, limit)
-        return notifications
+        return conditional_response(
+            request, content_etag(notifications),
+            lambda: _notifications_adapter.dump_python(_notifications_adapter.validate_python(notifications)),
+            NOTIFICATIONS_MAX_AGE, private=True
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching notifications: {str(e)}")
 
 @router.post("/notifications/{principal}/{notification_id}/read")
-async def mark_notification_read(principal: str, notification_id: str):
+async def mark_notification_read(principal: str, notification_id: str, firestore_client: FirestoreClient = Depends(get_firestore_client)):
     """Mark a notification as read"""
     try:
         firestore_client.mark_notification_as_read(principal, notification_id)
@@ -1,27 +1,30 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.responses import StreamingResponse
 from typing import List, Dict, Optional
-import csv
-import io
 import json
 
-from services.maestro import maestro_client
-from services.firebase import firestore_client
+from services.maestro import MaestroClient, get_maestro_client
+from services.firebase import FirestoreClient, get_firestore_client
+from services.chain_indexer import ChainIndexer, get_chain_indexer
 from models.log import LogEntry, PerformanceMetrics, Transaction
+from models.records import TransactionRecord
+from utils.clarity import ClarityArgError
+from utils.helpers import logs_to_csv
+from utils.responses import FastJSONResponse
 
 router = APIRouter()
 
 @router.get("/", response_model=Dict)
-async def get_all_logs(limit: int = Query(50, ge=1, le=200)):
+async def get_all_logs(limit: int = Query(50, ge=1, le=200), firestore_client: FirestoreClient = Depends(get_firestore_client)):
     """Get all logs across all agents"""
     try:
         logs = firestore_client.get_all_logs(limit)
-        return {"logs": logs}
+        return FastJSONResponse({"logs": logs})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching all logs: {str(e)}")
 
 @router.post("/", response_model=Dict)
-async def create_log_entry(log_data: Dict):
+async def create_log_entry(log_data: Dict, maestro_client: MaestroClient = Depends(get_maestro_client), firestore_client: FirestoreClient = Depends(get_firestore_client)):
     """Create a new log entry"""
     try:
         # Extract data from request
@@ -39,11 +42,14 @@ async def create_log_entry(log_data: Dict):
         if not all([agent_id, action, status, details]):
             raise HTTPException(status_code=400, detail="Missing required fields")
         
+        # Reject logs that can't go on-chain before they are stored and published
+        sender = log_data.get("sender", "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM")
+        maestro_client.validate_log_agent_action(log_data, sender)
+        
         # Save to Firebase for immediate access
         log_id = firestore_client.add_log(log_data)
         
         # Prepare on-chain transaction (if needed)
-        sender = log_data.get("sender", "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM")
         tx_payload = maestro_client.prepare_log_agent_action_tx(log_data, sender)
         
         return {
@@ -51,20 +57,31 @@ async def create_log_entry(log_data: Dict):
             "transaction_payload": tx_payload,
             "message": "Log entry created successfully"
         }
+    except ClarityArgError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating log entry: {str(e)}")
 
 @router.get("/agent/{agent_id}", response_model=Dict)
-async def get_logs_by_agent(agent_id: int, limit: int = Query(20, ge=1, le=100)):
+async def get_logs_by_agent(agent_id: int, limit: int = Query(20, ge=1, le=100), firestore_client: FirestoreClient = Depends(get_firestore_client)):
     """Get logs for a specific agent"""
     try:
         logs = firestore_client.get_agent_logs(agent_id, limit)
-        return {"logs": logs}
+        return FastJSONResponse({"logs": logs})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching logs for agent {agent_id}: {str(e)}")
 
+@router.get("/chain/{agent_id}", response_model=Dict)
+async def get_chain_logs(agent_id: int, limit: int = Query(20, ge=1, le=100), chain_indexer: ChainIndexer = Depends(get_chain_indexer)):
+    """Get on-chain log history for an agent from the chain index"""
+    try:
+        logs = chain_indexer.get_logs(agent_id, limit)
+        return {"logs": logs, "checkpoint": chain_indexer.checkpoint()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching on-chain logs for agent {agent_id}: {str(e)}")
+
 @router.get("/live/{agent_id}")
-async def get_live_logs(agent_id: int, limit: int = Query(10, ge=1, le=100)):
+async def get_live_logs(agent_id: int, limit: int = Query(10, ge=1, le=100), firestore_client: FirestoreClient = Depends(get_firestore_client)):
     """Get the latest logs for an agent"""
     try:
         # Get logs from Firebase
@@ -78,40 +95,29 @@ async def get_live_logs(agent_id: int, limit: int = Query(10, ge=1, le=100)):
 async def get_logs_by_range(
     agent_id: int, 
     start: int = Query(..., description="Start timestamp"),
-    end: int = Query(..., description="End timestamp")
+    end: int = Query(..., description="End timestamp"),
+    firestore_client: FirestoreClient = Depends(get_firestore_client)
 ):
     """Get logs within a specific time range"""
     try:
         logs = firestore_client.get_agent_logs_by_range(agent_id, start, end)
-        return {"logs": logs}
+        return FastJSONResponse({"logs": logs})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching logs by range: {str(e)}")
 
 @router.get("/txs/{agent_id}")
-async def get_transactions(agent_id: int, limit: int = Query(20, ge=1, le=100)):
+async def get_transactions(agent_id: int, limit: int = Query(20, ge=1, le=100), firestore_client: FirestoreClient = Depends(get_firestore_client)):
     """Extract transaction data from logs"""
     try:
         logs = firestore_client.get_agent_logs(agent_id, limit=100) 
-        tx_logs = [log for log in logs if log.get("transaction_id")]
-        tx_logs = tx_logs[:limit]
+        transactions = [tx for tx in map(TransactionRecord.from_log, logs) if tx is not None][:limit]
         
-        transactions = []
-        for log in tx_logs:
-            transactions.append({
-                "tx_id": log.get("transaction_id"),
-                "timestamp": log.get("timestamp"),
-                "amount": log.get("amount", 0),
-                "fee": log.get("fee", 0),
-                "status": log.get("status"),
-                "details": log.get("details", "")
-            })
-        
-        return {"transactions": transactions}
+        return FastJSONResponse({"transactions": transactions})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching transactions: {str(e)}")
 
 @router.get("/performance/{agent_id}")
-async def get_performance(agent_id: int, period: str = Query("day", enum=["day", "week", "month"])):
+async def get_performance(agent_id: int, period: str = Query("day", enum=["day", "week", "month"]), maestro_client: MaestroClient = Depends(get_maestro_client)):
     """Get performance metrics for an agent"""
     try:
         period_value = 1 
@@ -131,7 +137,8 @@ async def export_logs(
     agent_id: int, 
     format: str = Query("json", enum=["json", "csv"]),
     start: Optional[int] = None,
-    end: Optional[int] = None
+    end: Optional[int] = None,
+    firestore_client: FirestoreClient = Depends(get_firestore_client)
 ):
     """Export logs in JSON or CSV format"""
     try:
@@ -141,28 +148,10 @@ async def export_logs(
             logs = firestore_client.get_agent_logs(agent_id, limit=1000)
         
         if format == "json":
-            return {"logs": logs}
+            return FastJSONResponse({"logs": logs})
         else:
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            writer.writerow(["timestamp", "action", "status", "transaction_id", "amount", "fee", "details"])
-
-            for log in logs:
-                writer.writerow([
-                    log.get("timestamp", ""),
-                    log.get("action", ""),
-                    log.get("status", ""),
-                    log.get("transaction_id", ""),
-                    log.get("amount", ""),
-                    log.get("fee", ""),
-                    log.get("details", "")
-                ])
-            
-            output.seek(0)
-            
             return StreamingResponse(
-                iter([output.getvalue()]),
+                iter([logs_to_csv(logs)]),
                 media_type="text/csv",
                 headers={"Content-Disposition": f"attachment; filename=agent_{agent_id}_logs.csv"}
             )
@@ -0,0 +1,148 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from services.btc import BTCClient, get_btc_client
+
+# Esplora returns confirmed history in pages of 25
+ESPLORA_PAGE_SIZE = 25
+REFRESH_INTERVAL = float(os.environ.get("ADDRESS_INDEX_REFRESH_SECONDS", "30"))
+MAX_ADDRESSES = int(os.environ.get("ADDRESS_INDEX_MAX_ADDRESSES", "1000"))
+
+def _summarize_tx(address: str, tx: Dict) -> Dict:
+    """Keep only what wallet views need from an Esplora transaction"""
+    status = tx.get("status", {})
+    received = [
+        (n, out.get("value", 0))
+        for n, out in enumerate(tx.get("vout", []))
+        if out.get("scriptpubkey_address") == address
+    ]
+    # Coinbase inputs spend nothing and come with "prevout": null
+    prevouts = [
+        (vin, vin.get("prevout") or {})
+        for vin in tx.get("vin", [])
+        if not vin.get("is_coinbase")
+    ]
+    spent = [
+        (vin["txid"], vin["vout"], prevout.get("value", 0))
+        for vin, prevout in prevouts
+        if prevout.get("scriptpubkey_address") == address
+    ]
+    return {
+        "txid": tx["txid"],
+        "confirmed": status.get("confirmed", False),
+        "block_height": status.get("block_height"),
+        "block_time": status.get("block_time"),
+        "fee": tx.get("fee", 0),
+        "received": received,
+        "spent": spent,
+        "value": sum(value for _, value in received) - sum(value for _, _, value in spent)
+    }
+
+class AddressIndex:
+    """Full transaction history and UTXO set of one address"""
+
+    def __init__(self, address: str):
+        self.address = address
+        self.confirmed: List[Dict] = []  # newest first
+        self.mempool: List[Dict] = []
+        self.tip_txid: Optional[str] = None
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+
+    def transactions(self, offset: int = 0, limit: int = 10) -> List[Dict]:
+        history = self.mempool + self.confirmed
+        return [
+            {key: tx[key] for key in ("txid", "confirmed", "block_height", "block_time", "fee", "value")}
+            for tx in history[offset:offset + limit]
+        ]
+
+    def utxos(self, include_mempool: bool = False) -> List[Dict]:
+        txs = self.confirmed + (self.mempool if include_mempool else [])
+        spent = {(txid, vout) for tx in txs for txid, vout, _ in tx["spent"]}
+        return [
+            {"txid": tx["txid"], "vout": vout, "value": value, "confirmed": tx["confirmed"]}
+            for tx in txs
+            for vout, value in tx["received"]
+            if (tx["txid"], vout) not in spent
+        ]
+
+    def balance(self) -> int:
+        return sum(utxo["value"] for utxo in self.utxos())
+
+    def pending(self) -> int:
+        return sum(tx["value"] for tx in self.mempool)
+
+    @property
+    def tx_count(self) -> int:
+        return len(self.confirmed) + len(self.mempool)
+
+class AddressIndexer:
+    """Local per-address index of transactions and UTXOs, refreshed incrementally
+
+    The first refresh pages through the whole history with
+    /txs/chain/{last_seen_txid}. Later refreshes read the first page and
+    stop at the last-seen tip, so an unchanged address costs one request.
+    """
+
+    def __init__(self, btc_client: BTCClient):
+        self.btc_client = btc_client
+        self._indexes: "OrderedDict[str, AddressIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index(self, address: str) -> AddressIndex:
+        with self._lock:
+            index = self._indexes.get(address)
+            if index is None:
+                index = self._indexes[address] = AddressIndex(address)
+                if len(self._indexes) > MAX_ADDRESSES:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(address)
+            return index
+
+    def refresh(self, address: str, force: bool = False) -> AddressIndex:
+        """Bring the index for `address` up to date and return it"""
+        index = self._index(address)
+        with index.lock:
+            if not force and time.monotonic() - index.refreshed_at < REFRESH_INTERVAL:
+                return index
+
+            first_page = self.btc_client.get_address_txs_page(address)
+            mempool = [_summarize_tx(address, tx) for tx in first_page if not tx.get("status", {}).get("confirmed")]
+            confirmed_page = [tx for tx in first_page if tx.get("status", {}).get("confirmed")]
+
+            new_confirmed, found_tip = self._collect_new(address, confirmed_page, index.tip_txid)
+            if found_tip:
+                index.confirmed = new_confirmed + index.confirmed
+            else:
+                # First refresh, or the last-seen tip was reorged out: we paged the whole history
+                index.confirmed = new_confirmed
+            index.mempool = mempool
+            if index.confirmed:
+                index.tip_txid = index.confirmed[0]["txid"]
+            index.refreshed_at = time.monotonic()
+            return index
+
+    def _collect_new(self, address: str, page: List[Dict], tip_txid: Optional[str]) -> Tuple[List[Dict], bool]:
+        """Page back from the newest confirmed tx until `tip_txid` or the end of history"""
+        collected = []
+        while True:
+            for tx in page:
+                if tx["txid"] == tip_txid:
+                    return collected, True
+                collected.append(_summarize_tx(address, tx))
+            if len(page) < ESPLORA_PAGE_SIZE:
+                return collected, False
+            page = self.btc_client.get_address_txs_page(address, last_seen_txid=page[-1]["txid"])
+
+_address_indexer: Optional[AddressIndexer] = None
+
+def get_address_indexer() -> AddressIndexer:
+    """Dependency provider: build the shared AddressIndexer on first use"""
+    global _address_indexer
+    if _address_indexer is None:
+        _address_indexer = AddressIndexer(get_btc_client())
+    return _address_indexer
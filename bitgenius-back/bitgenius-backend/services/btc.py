@@ -1,14 +1,41 @@
 import os
+import asyncio
 import requests
+import httpx
 from typing import Dict, List, Optional
 
+from services.cache import get_cache_backend
+from services.tracing import current_span
+from services.upstream import UpstreamHTTPError, upstream_for
+
+BTC_PRICE_TTL = float(os.environ.get("BTC_PRICE_TTL", "30"))
+BTC_MAX_CONCURRENCY = int(os.environ.get("BTC_MAX_CONCURRENCY", "16"))
+BLOCKSTREAM_URL = os.environ.get("BLOCKSTREAM_URL", "https://blockstream.info/api")
+COINGECKO_URL = os.environ.get("COINGECKO_URL", "https://api.coingecko.com/api/v3")
+
 class BTCClient:
     def __init__(self):
-        self.base_url = "https://blockstream.info/api"
+        self.base_url = BLOCKSTREAM_URL
+        self.cache = get_cache_backend()
+        self.session = requests.Session()
+        self.blockstream = upstream_for(self.base_url)
+        self.coingecko = upstream_for(COINGECKO_URL)
+        self._async_client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """Pooled client for concurrent lookups, created on first use"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=BTC_MAX_CONCURRENCY, max_keepalive_connections=BTC_MAX_CONCURRENCY)
+            )
+        return self._async_client
     
     def get_address_info(self, address: str) -> Dict:
         url = f"{self.base_url}/address/{address}"
-        response = requests.get(url)
+        response = self.blockstream.request(self.session, "GET", url)
         
         if response.status_code != 200:
             raise Exception(f"Error fetching address info: {response.status_code} - {response.text}")
@@ -16,17 +43,62 @@ class BTCClient:
         return response.json()
     
     def get_address_transactions(self, address: str, limit: int = 10) -> List[Dict]:
-        url = f"{self.base_url}/address/{address}/txs"
-        response = requests.get(url)
+        return self.get_address_txs_page(address)[:limit]
+    
+    def get_address_txs_page(self, address: str, last_seen_txid: Optional[str] = None) -> List[Dict]:
+        """Get one page of address history: mempool plus 25 confirmed txs, or the 25 after last_seen_txid"""
+        if last_seen_txid:
+            url = f"{self.base_url}/address/{address}/txs/chain/{last_seen_txid}"
+        else:
+            url = f"{self.base_url}/address/{address}/txs"
+        response = self.blockstream.request(self.session, "GET", url)
         
         if response.status_code != 200:
             raise Exception(f"Error fetching address transactions: {response.status_code} - {response.text}")
         
-        return response.json()[:limit]
+        return response.json()
+    
+    async def _get_async(self, path: str, timeout: float) -> httpx.Response:
+        response = await self.async_client.get(path, timeout=timeout)
+        current_span().set_attribute("http.status_code", response.status_code)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise UpstreamHTTPError(self.blockstream.name, response.status_code, response.text)
+        return response
+    
+    async def get_balances(self, addresses: List[str]) -> List[Dict]:
+        """Get confirmed and pending balances in sats for many addresses concurrently
+        
+        Failures are reported per address instead of failing the whole batch.
+        """
+        semaphore = asyncio.Semaphore(BTC_MAX_CONCURRENCY)
+        
+        async def fetch(address: str) -> Dict:
+            async with semaphore:
+                try:
+                    response = await self.blockstream.call_async(
+                        lambda timeout: self._get_async(f"/address/{address}", timeout),
+                        attributes={"http.method": "GET", "http.url": f"{self.base_url}/address/{address}"}
+                    )
+                    if response.status_code != 200:
+                        raise Exception(f"Error fetching address info: {response.status_code} - {response.text}")
+                    info = response.json()
+                except Exception as e:
+                    return {"address": address, "error": str(e)}
+            
+            chain = info.get("chain_stats", {})
+            mempool = info.get("mempool_stats", {})
+            return {
+                "address": address,
+                "balance_sats": chain.get("funded_txo_sum", 0) - chain.get("spent_txo_sum", 0),
+                "pending_sats": mempool.get("funded_txo_sum", 0) - mempool.get("spent_txo_sum", 0),
+                "tx_count": chain.get("tx_count", 0) + mempool.get("tx_count", 0)
+            }
+        
+        return await asyncio.gather(*[fetch(address) for address in addresses])
     
     def get_transaction(self, tx_id: str) -> Dict:
         url = f"{self.base_url}/tx/{tx_id}"
-        response = requests.get(url)
+        response = self.blockstream.request(self.session, "GET", url)
         
         if response.status_code != 200:
             raise Exception(f"Error fetching transaction: {response.status_code} - {response.text}")
@@ -34,8 +106,12 @@ class BTCClient:
         return response.json()
     
     def get_btc_price(self) -> float:
-        url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"
-        response = requests.get(url)
+        """Get the BTC/USD price, fetched at most once per BTC_PRICE_TTL across all workers"""
+        return self.cache.get_or_compute("btc:price:usd", self._fetch_btc_price, BTC_PRICE_TTL)
+    
+    def _fetch_btc_price(self) -> float:
+        url = f"{COINGECKO_URL}/simple/price?ids=bitcoin&vs_currencies=usd"
+        response = self.coingecko.request(self.session, "GET", url)
         
         if response.status_code != 200:
             raise Exception(f"Error fetching BTC price: {response.status_code} - {response.text}")
@@ -43,4 +119,11 @@ class BTCClient:
         data = response.json()
         return data["bitcoin"]["usd"]
 
-btc_client = BTCClient()
+_btc_client: Optional[BTCClient] = None
+
+def get_btc_client() -> BTCClient:
+    """Dependency provider: build the shared BTCClient on first use"""
+    global _btc_client
+    if _btc_client is None:
+        _btc_client = BTCClient()
+    return _btc_client
@@ -0,0 +1,364 @@
+import os
+import json
+import queue
+import select
+import socket
+import threading
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from services.cache_server import COMPARE_AND_DELETE_SCRIPT
+from services.metrics import record_cache_lookup
+
+class CacheBackend:
+    """Key/value cache, locks and pub/sub shared by every worker of the app
+
+    Values must be JSON-serializable. Subclasses implement the primitives;
+    locking and single-flight computation are built on top of them here.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set key only if it does not exist yet; return whether it was set"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def delete_if_equal(self, key: str, value: Any) -> bool:
+        """Atomically delete key only if it holds `value`; return whether it was deleted"""
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        raise NotImplementedError
+
+    def publish(self, channel: str, message: Any) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, channel: str) -> "Subscription":
+        raise NotImplementedError
+
+    @contextmanager
+    def lock(self, name: str, ttl: float = 10.0, wait: float = 10.0):
+        """Hold a named lock across workers; the ttl frees it if the holder dies"""
+        key = f"lock:{name}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        delay = 0.005
+        while not self.add(key, token, ttl):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for lock {name}")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        try:
+            yield
+        finally:
+            # Compare-and-delete: past the ttl the key may already be another holder's
+            self.delete_if_equal(key, token)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Return the cached value, computing it at most once across workers on a miss"""
+        value = self.get(key)
+        record_cache_lookup(key, value is not None)
+        if value is not None:
+            return value
+
+        with self.lock(key):
+            # Another worker may have filled the key while we waited
+            value = self.get(key)
+            if value is None:
+                value = compute()
+                if value is not None:
+                    self.set(key, value, ttl)
+        return value
+
+class Subscription:
+    """Messages published on one channel, in order"""
+
+    def get_message(self, timeout: Optional[float] = None) -> Optional[Any]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+class InProcessBackend(CacheBackend):
+    """Backend for a single process; values are stored without copying"""
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._subscribers: Dict[str, List["_QueueSubscription"]] = {}
+        self._lock = threading.Lock()
+
+    def _expired(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+            return True
+        return False
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        self._data[key] = value
+        if ttl:
+            self._expires[key] = time.monotonic() + ttl
+        else:
+            self._expires.pop(key, None)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if self._expired(key):
+                return None
+            return self._data.get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if key in self._data and not self._expired(key):
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+
+    def delete_if_equal(self, key: str, value: Any) -> bool:
+        with self._lock:
+            if self._expired(key) or key not in self._data or self._data[key] != value:
+                return False
+            del self._data[key]
+            self._expires.pop(key, None)
+            return True
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            self._expired(key)
+            value = int(self._data.get(key, 0)) + amount
+            self._data[key] = value
+            return value
+
+    def publish(self, channel: str, message: Any) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for subscriber in subscribers:
+            subscriber.queue.put(message)
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = _QueueSubscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: "_QueueSubscription") -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.channel, None)
+
+class _QueueSubscription(Subscription):
+    def __init__(self, backend: InProcessBackend, channel: str):
+        self.backend = backend
+        self.channel = channel
+        self.queue = queue.Queue()
+
+    def get_message(self, timeout: Optional[float] = None) -> Optional[Any]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.backend._unsubscribe(self)
+
+class _RespConnection:
+    """One socket speaking the Redis serialization protocol (RESP2)"""
+
+    def __init__(self, host: str, port: int, db: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray()
+        if db:
+            self.command("SELECT", db)
+
+    def send(self, *args) -> None:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b"".join(parts))
+
+    def _fill(self) -> None:
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("Cache server closed the connection")
+        self.buffer += chunk
+
+    def _readline(self) -> bytes:
+        while True:
+            end = self.buffer.find(b"\r\n")
+            if end != -1:
+                line = bytes(self.buffer[:end])
+                del self.buffer[:end + 2]
+                return line
+            self._fill()
+
+    def _read_exact(self, length: int) -> bytes:
+        while len(self.buffer) < length:
+            self._fill()
+        data = bytes(self.buffer[:length])
+        del self.buffer[:length]
+        return data
+
+    def wait_readable(self, timeout: Optional[float]) -> bool:
+        if self.buffer:
+            return True
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        return bool(readable)
+
+    def read(self) -> Any:
+        line = self._readline()
+        kind, payload = line[:1], line[1:]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RuntimeError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            return self._read_exact(length + 2)[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self.read() for _ in range(length)]
+        raise ConnectionError(f"Unexpected reply from cache server: {line!r}")
+
+    def command(self, *args) -> Any:
+        self.send(*args)
+        return self.read()
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+class RedisBackend(CacheBackend):
+    """Backend for a Redis server, or the bundled stand-in (services/cache_server.py)
+
+    Commands are sent over a small pool of persistent connections; each
+    subscription gets a dedicated connection, as the protocol requires.
+    """
+
+    def __init__(self, url: str, pool_size: int = 8, timeout: float = 5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self) -> _RespConnection:
+        return _RespConnection(self.host, self.port, self.db, self.timeout)
+
+    def _command(self, *args) -> Any:
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            result = conn.command(*args)
+        except (OSError, ConnectionError):
+            conn.close()
+            raise
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        return result
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self._command("GET", key)
+        return None if data is None else json.loads(data)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if ttl:
+            self._command("SET", key, json.dumps(value), "PX", int(ttl * 1000))
+        else:
+            self._command("SET", key, json.dumps(value))
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        if ttl:
+            return self._command("SET", key, json.dumps(value), "NX", "PX", int(ttl * 1000)) is not None
+        return self._command("SET", key, json.dumps(value), "NX") is not None
+
+    def delete(self, key: str) -> None:
+        self._command("DEL", key)
+
+    def delete_if_equal(self, key: str, value: Any) -> bool:
+        return self._command("EVAL", COMPARE_AND_DELETE_SCRIPT, 1, key, json.dumps(value)) == 1
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        return self._command("INCRBY", key, amount)
+
+    def publish(self, channel: str, message: Any) -> None:
+        self._command("PUBLISH", channel, json.dumps(message))
+
+    def subscribe(self, channel: str) -> Subscription:
+        conn = self._connect()
+        conn.command("SUBSCRIBE", channel)
+        return _RespSubscription(conn)
+
+class _RespSubscription(Subscription):
+    def __init__(self, conn: _RespConnection):
+        self.conn = conn
+
+    def get_message(self, timeout: Optional[float] = None) -> Optional[Any]:
+        if not self.conn.wait_readable(timeout):
+            return None
+        reply = self.conn.read()
+        if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+            return json.loads(reply[2])
+        return None
+
+    def close(self) -> None:
+        self.conn.close()
+
+def create_backend(url: Optional[str] = None) -> CacheBackend:
+    """Build a backend from a URL: memory:// or redis://host:port/db"""
+    url = url or os.environ.get("CACHE_URL", "memory://")
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return InProcessBackend()
+    if scheme == "redis":
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported CACHE_URL scheme: {scheme}")
+
+_cache_backend: Optional[CacheBackend] = None
+
+def get_cache_backend() -> CacheBackend:
+    """Dependency provider: build the shared cache backend on first use"""
+    global _cache_backend
+    if _cache_backend is None:
+        _cache_backend = create_backend()
+        logging.info(f"Using {type(_cache_backend).__name__} cache backend")
+    return _cache_backend
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Redis
+------------------------
+A small server speaking the Redis protocol (RESP2) for the commands
+RedisBackend uses: PING, SELECT, GET, SET (PX/EX/NX), DEL, INCRBY,
+PUBLISH, SUBSCRIBE and EVAL of the one script it sends (lock release,
+COMPARE_AND_DELETE_SCRIPT). The multi-worker launcher starts one when
+CACHE_URL is not set, and it is handy for local tests.
+Usage: python services/cache_server.py [--host 127.0.0.1] [--port 6380]
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+# Delete KEYS[1] only if it still holds ARGV[1]; the stand-in runs this script natively
+COMPARE_AND_DELETE_SCRIPT = (
+    'if redis.call("GET", KEYS[1]) == ARGV[1] then return redis.call("DEL", KEYS[1]) else return 0 end'
+)
+
+class _Store:
+    def __init__(self):
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.channels: Dict[bytes, Set["_Handler"]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+        self.subscribed: Set[bytes] = set()
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command, as typed into telnet
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _write(self, data: bytes) -> None:
+        with self.write_lock:
+            self.wfile.write(data)
+            self.wfile.flush()
+
+    @staticmethod
+    def _bulk(value: Optional[bytes]) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _array(self, items: List[bytes]) -> bytes:
+        return b"*%d\r\n" % len(items) + b"".join(self._bulk(item) for item in items)
+
+    def handle(self):
+        store: _Store = self.server.store
+        try:
+            while True:
+                args = self._read_command()
+                if args is None:
+                    break
+                if args:
+                    self._write(self._execute(store, args[0].upper(), args[1:]))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            with store.lock:
+                for channel in self.subscribed:
+                    store.channels.get(channel, set()).discard(self)
+
+    def _execute(self, store: _Store, command: bytes, args: List[bytes]) -> bytes:
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command == b"SELECT":
+            return b"+OK\r\n"
+        if command == b"GET":
+            with store.lock:
+                return self._bulk(store.get(args[0]))
+        if command == b"SET":
+            return self._set(store, args)
+        if command == b"DEL":
+            with store.lock:
+                removed = sum(1 for key in args if store.data.pop(key, None) is not None)
+            return b":%d\r\n" % removed
+        if command in (b"INCR", b"INCRBY"):
+            amount = int(args[1]) if command == b"INCRBY" else 1
+            with store.lock:
+                current = store.get(args[0])
+                expires = store.data[args[0]][1] if current is not None else None
+                value = int(current or 0) + amount
+                store.data[args[0]] = (str(value).encode(), expires)
+            return b":%d\r\n" % value
+        if command == b"EVAL":
+            if args[0].decode() != COMPARE_AND_DELETE_SCRIPT or args[1] != b"1":
+                return b"-ERR only the compare-and-delete script is supported\r\n"
+            with store.lock:
+                if store.get(args[2]) != args[3]:
+                    return b":0\r\n"
+                del store.data[args[2]]
+            return b":1\r\n"
+        if command == b"PUBLISH":
+            with store.lock:
+                subscribers = list(store.channels.get(args[0], ()))
+            message = self._array([b"message", args[0], args[1]])
+            for subscriber in subscribers:
+                try:
+                    subscriber._write(message)
+                except OSError:
+                    pass
+            return b":%d\r\n" % len(subscribers)
+        if command == b"SUBSCRIBE":
+            replies = []
+            with store.lock:
+                for channel in args:
+                    store.channels.setdefault(channel, set()).add(self)
+                    self.subscribed.add(channel)
+                    replies.append(b"*3\r\n" + self._bulk(b"subscribe") + self._bulk(channel) + b":%d\r\n" % len(self.subscribed))
+            return b"".join(replies)
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    def _set(self, store: _Store, args: List[bytes]) -> bytes:
+        key, value = args[0], args[1]
+        expires = None
+        only_new = False
+        options = [arg.upper() for arg in args[2:]]
+        i = 0
+        while i < len(options):
+            if options[i] == b"NX":
+                only_new = True
+            elif options[i] == b"PX":
+                expires = time.monotonic() + int(options[i + 1]) / 1000
+                i += 1
+            elif options[i] == b"EX":
+                expires = time.monotonic() + int(options[i + 1])
+                i += 1
+            i += 1
+
+        with store.lock:
+            if only_new and store.get(key) is not None:
+                return b"$-1\r\n"
+            store.data[key] = (value, expires)
+        return b"+OK\r\n"
+
+class CacheServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.store = _Store()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+def start_in_background(host: str = "127.0.0.1", port: int = 0) -> CacheServer:
+    """Start a stand-in server on a daemon thread and return it"""
+    server = CacheServer(host, port)
+    thread = threading.Thread(target=server.serve_forever, name="cache-server", daemon=True)
+    thread.start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for Redis")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+
+    server = CacheServer(args.host, args.port)
+    print(f"Cache server listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,415 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import requests
+
+from services.cache import CacheBackend, get_cache_backend
+from services.sqlite_store import ConnectionPool
+from services.upstream import upstream_for
+from utils.clarity import decode_repr
+
+CHAIN_INDEXER_ENABLED = os.environ.get("CHAIN_INDEXER_ENABLED", "false").lower() == "true"
+STACKS_API_URL = os.environ.get("STACKS_API_URL", "https://api.testnet.hiro.so")
+CHAIN_INDEX_PATH = os.environ.get("CHAIN_INDEX_PATH", "chain_index.db")
+CHAIN_INDEX_START_HEIGHT = int(os.environ.get("CHAIN_INDEX_START_HEIGHT", "1"))
+CHAIN_INDEX_POLL_SECONDS = float(os.environ.get("CHAIN_INDEX_POLL_SECONDS", "10"))
+CHAIN_INDEX_BATCH_BLOCKS = int(os.environ.get("CHAIN_INDEX_BATCH_BLOCKS", "200"))
+# Blocks kept for reorg detection; a reorg deeper than this triggers a full reindex
+CHAIN_INDEX_REORG_DEPTH = int(os.environ.get("CHAIN_INDEX_REORG_DEPTH", "100"))
+
+CONTRACT_NAME = "bitgenius-agent"
+INDEXED_FUNCTIONS = {
+    "register-agent",
+    "log-agent-action",
+    "update-agent-status",
+    "update-agent-strategy",
+    "update-agent-trigger",
+    "update-agent-privacy",
+    "update-agent-allocation"
+}
+# update-agent-* function -> (agents column, argument name)
+UPDATED_FIELDS = {
+    "update-agent-status": ("status", "new-status"),
+    "update-agent-strategy": ("strategy", "new-strategy"),
+    "update-agent-trigger": ("trigger_condition", "new-trigger"),
+    "update-agent-privacy": ("privacy_enabled", "privacy-enabled"),
+    "update-agent-allocation": ("allocation", "new-allocation")
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chain_blocks (
+    height INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    parent_hash TEXT
+);
+
+CREATE TABLE IF NOT EXISTS chain_calls (
+    tx_id TEXT PRIMARY KEY,
+    block_height INTEGER NOT NULL,
+    tx_index INTEGER NOT NULL,
+    function_name TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    agent_id INTEGER,
+    args TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chain_calls_agent ON chain_calls (agent_id, block_height, tx_index);
+CREATE INDEX IF NOT EXISTS idx_chain_calls_height ON chain_calls (block_height);
+
+CREATE TABLE IF NOT EXISTS chain_agents (
+    agent_id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    name TEXT,
+    agent_type TEXT,
+    strategy TEXT,
+    status TEXT,
+    trigger_condition TEXT,
+    privacy_enabled INTEGER,
+    allocation INTEGER,
+    created_at INTEGER,
+    last_active INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_chain_agents_owner ON chain_agents (owner);
+
+CREATE TABLE IF NOT EXISTS chain_logs (
+    agent_id INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    action TEXT,
+    status TEXT,
+    transaction_id TEXT,
+    amount INTEGER,
+    fee INTEGER,
+    details TEXT,
+    tx_id TEXT NOT NULL,
+    PRIMARY KEY (agent_id, timestamp)
+);
+CREATE INDEX IF NOT EXISTS idx_chain_logs_ts ON chain_logs (timestamp);
+"""
+
+SELECT_CHECKPOINT = "SELECT height, hash FROM chain_blocks ORDER BY height DESC LIMIT 1"
+INSERT_BLOCK = "INSERT OR REPLACE INTO chain_blocks (height, hash, parent_hash) VALUES (?, ?, ?)"
+PRUNE_BLOCKS = "DELETE FROM chain_blocks WHERE height < ?"
+INSERT_CALL = (
+    "INSERT OR IGNORE INTO chain_calls (tx_id, block_height, tx_index, function_name, sender, agent_id, args) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_AGENT_CALLS = (
+    "SELECT tx_id, block_height, function_name, sender, agent_id, args FROM chain_calls "
+    "WHERE agent_id = ? ORDER BY block_height, tx_index"
+)
+INSERT_AGENT = (
+    "INSERT OR REPLACE INTO chain_agents (agent_id, owner, name, agent_type, strategy, status, "
+    "trigger_condition, privacy_enabled, allocation, created_at, last_active) "
+    "VALUES (?, ?, ?, ?, ?, 'online', ?, ?, ?, ?, ?)"
+)
+TOUCH_AGENT = "UPDATE chain_agents SET last_active = ? WHERE agent_id = ?"
+INSERT_LOG = (
+    "INSERT OR REPLACE INTO chain_logs (agent_id, timestamp, action, status, transaction_id, amount, fee, details, tx_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_AGENT = "SELECT * FROM chain_agents WHERE agent_id = ?"
+SELECT_AGENTS_BY_OWNER = "SELECT * FROM chain_agents WHERE owner = ? ORDER BY agent_id"
+SELECT_LOGS = "SELECT * FROM chain_logs WHERE agent_id = ? ORDER BY timestamp DESC LIMIT ?"
+
+class HttpChainSource:
+    """Blocks and their transactions from a Stacks API (Hiro-compatible)"""
+
+    def __init__(self, base_url: str = STACKS_API_URL, page_size: int = 50):
+        self.base_url = base_url.rstrip("/")
+        self.page_size = page_size
+        self.session = requests.Session()
+        self.upstream = upstream_for(self.base_url)
+
+    def _get(self, path: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        response = self.upstream.request(self.session, "GET", f"{self.base_url}{path}", params=params)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def get_tip_height(self) -> int:
+        return self._get("/extended/v2/blocks", {"limit": 1})["results"][0]["height"]
+
+    def get_block(self, height: int) -> Optional[Dict]:
+        block = self._get(f"/extended/v2/blocks/{height}")
+        if block is None:
+            return None
+
+        txs, offset = [], 0
+        while True:
+            page = self._get(
+                f"/extended/v2/blocks/{height}/transactions",
+                {"limit": self.page_size, "offset": offset}
+            )
+            txs.extend(page["results"])
+            offset += len(page["results"])
+            if not page["results"] or offset >= page["total"]:
+                break
+
+        return {
+            "height": block["height"],
+            "hash": block["hash"],
+            "parent_block_hash": block["parent_block_hash"],
+            "txs": txs
+        }
+
+class FixtureChainSource:
+    """Recorded blocks, one JSON file per block, for offline replay"""
+
+    def __init__(self, directory: str):
+        self.blocks: Dict[int, Dict] = {}
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                with open(os.path.join(directory, name)) as f:
+                    block = json.load(f)
+                self.blocks[block["height"]] = block
+
+    def get_tip_height(self) -> int:
+        return max(self.blocks, default=0)
+
+    def get_block(self, height: int) -> Optional[Dict]:
+        return self.blocks.get(height)
+
+class RecordingChainSource:
+    """Pass-through source that saves every block it returns as a fixture"""
+
+    def __init__(self, source, directory: str):
+        self.source = source
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_tip_height(self) -> int:
+        return self.source.get_tip_height()
+
+    def get_block(self, height: int) -> Optional[Dict]:
+        block = self.source.get_block(height)
+        if block is not None:
+            with open(os.path.join(self.directory, f"block_{height:09d}.json"), "w") as f:
+                json.dump(block, f)
+        return block
+
+def _decode_args(tx: Dict) -> Dict:
+    return {
+        arg["name"]: decode_repr(arg["repr"])
+        for arg in tx["contract_call"].get("function_args", [])
+    }
+
+class ChainIndexer:
+    """Follows bitgenius-agent contract calls into local indexed tables
+
+    Each block is applied in one transaction that also moves the checkpoint
+    (the highest stored block), so an interrupted sync resumes where it
+    stopped. A block whose parent hash doesn't match the checkpoint means a
+    reorg: stored blocks are dropped one at a time until the chains agree,
+    and agents touched by the dropped calls are rebuilt from the calls that
+    remain.
+    """
+
+    def __init__(self, source, path: str = CHAIN_INDEX_PATH, contract_address: Optional[str] = None,
+                 start_height: int = CHAIN_INDEX_START_HEIGHT, cache: Optional[CacheBackend] = None):
+        self.source = source
+        self.contract_id = f"{contract_address or os.environ.get('CONTRACT_ADDRESS')}.{CONTRACT_NAME}"
+        self.start_height = start_height
+        self.cache = cache
+        self.pool = ConnectionPool(path)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def checkpoint(self) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_CHECKPOINT).fetchone()
+        return {"height": row[0], "hash": row[1]} if row else None
+
+    def sync(self, max_blocks: Optional[int] = None) -> int:
+        """Index blocks up to the source's tip; returns the number of blocks applied"""
+        tip = self.source.get_tip_height()
+        applied = 0
+        while max_blocks is None or applied < max_blocks:
+            checkpoint = self.checkpoint()
+            height = checkpoint["height"] + 1 if checkpoint else self.start_height
+            if height > tip:
+                break
+            block = self.source.get_block(height)
+            if block is None:
+                break
+            if checkpoint and block["parent_block_hash"] != checkpoint["hash"]:
+                logging.warning(f"Chain reorg at height {checkpoint['height']}, rolling back one block")
+                self.rollback(checkpoint["height"] - 1)
+                continue
+            self._apply_block(block)
+            applied += 1
+        return applied
+
+    def _apply_block(self, block: Dict) -> None:
+        height = block["height"]
+        with self.pool.transaction() as conn:
+            for tx in block.get("txs", []):
+                if (
+                    tx.get("tx_type") != "contract_call"
+                    or tx.get("tx_status") != "success"
+                    or tx["contract_call"].get("contract_id") != self.contract_id
+                    or tx["contract_call"].get("function_name") not in INDEXED_FUNCTIONS
+                ):
+                    continue
+                call = self._call_from_tx(tx, height)
+                conn.execute(INSERT_CALL, (
+                    call["tx_id"], height, tx.get("tx_index", 0), call["function_name"],
+                    call["sender"], call["agent_id"], json.dumps(call["args"])
+                ))
+                self._apply_call(conn, call)
+            conn.execute(INSERT_BLOCK, (height, block["hash"], block.get("parent_block_hash")))
+            conn.execute(PRUNE_BLOCKS, (height - CHAIN_INDEX_REORG_DEPTH,))
+
+    @staticmethod
+    def _call_from_tx(tx: Dict, height: int) -> Dict:
+        function_name = tx["contract_call"]["function_name"]
+        args = _decode_args(tx)
+        if function_name == "register-agent":
+            # The new id is only in the result: (ok uN)
+            agent_id = decode_repr(tx["tx_result"]["repr"])["ok"]
+        else:
+            agent_id = args["agent-id"]
+        return {
+            "tx_id": tx["tx_id"],
+            "block_height": height,
+            "function_name": function_name,
+            "sender": tx["sender_address"],
+            "agent_id": agent_id,
+            "args": args
+        }
+
+    @staticmethod
+    def _apply_call(conn, call: Dict) -> None:
+        """Apply one decoded call the way the contract applies it to its maps"""
+        args, height, agent_id = call["args"], call["block_height"], call["agent_id"]
+        function_name = call["function_name"]
+
+        if function_name == "register-agent":
+            conn.execute(INSERT_AGENT, (
+                agent_id, call["sender"], args["name"], args["agent-type"], args["strategy"],
+                args["trigger-condition"], int(args["privacy-enabled"]), args["allocation"], height, height
+            ))
+        elif function_name == "log-agent-action":
+            conn.execute(INSERT_LOG, (
+                agent_id, height, args["action"], args["status"], args.get("transaction-id"),
+                args.get("amount"), args.get("fee"), args["details"], call["tx_id"]
+            ))
+            conn.execute(TOUCH_AGENT, (height, agent_id))
+        else:
+            column, arg_name = UPDATED_FIELDS[function_name]
+            value = args[arg_name]
+            conn.execute(
+                f"UPDATE chain_agents SET {column} = ? WHERE agent_id = ?",
+                (int(value) if isinstance(value, bool) else value, agent_id)
+            )
+
+    def rollback(self, height: int) -> None:
+        """Forget everything above `height` and rebuild the agents it touched"""
+        with self.pool.transaction() as conn:
+            if conn.execute("SELECT 1 FROM chain_blocks WHERE height = ?", (height,)).fetchone() is None:
+                logging.warning(f"Reorg deeper than stored blocks, reindexing from {self.start_height}")
+                for table in ("chain_blocks", "chain_calls", "chain_agents", "chain_logs"):
+                    conn.execute(f"DELETE FROM {table}")
+                return
+
+            touched = [
+                row[0] for row in conn.execute(
+                    "SELECT DISTINCT agent_id FROM chain_calls WHERE block_height > ?", (height,)
+                )
+            ]
+            conn.execute("DELETE FROM chain_calls WHERE block_height > ?", (height,))
+            conn.execute("DELETE FROM chain_logs WHERE timestamp > ?", (height,))
+            conn.execute("DELETE FROM chain_blocks WHERE height > ?", (height,))
+            for agent_id in touched:
+                conn.execute("DELETE FROM chain_agents WHERE agent_id = ?", (agent_id,))
+                for tx_id, block_height, function_name, sender, call_agent_id, args in conn.execute(
+                    SELECT_AGENT_CALLS, (agent_id,)
+                ).fetchall():
+                    if function_name == "log-agent-action":
+                        conn.execute(TOUCH_AGENT, (block_height, agent_id))
+                        continue  # its log row was kept
+                    self._apply_call(conn, {
+                        "tx_id": tx_id, "block_height": block_height, "function_name": function_name,
+                        "sender": sender, "agent_id": call_agent_id, "args": json.loads(args)
+                    })
+
+    @staticmethod
+    def _rows(cursor) -> List[Dict]:
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_agent(self, agent_id: int) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            rows = self._rows(conn.execute(SELECT_AGENT, (agent_id,)))
+        return rows[0] if rows else None
+
+    def get_agents_by_owner(self, owner: str) -> List[Dict]:
+        with self.pool.connection() as conn:
+            return self._rows(conn.execute(SELECT_AGENTS_BY_OWNER, (owner,)))
+
+    def get_logs(self, agent_id: int, limit: int = 20) -> List[Dict]:
+        with self.pool.connection() as conn:
+            return self._rows(conn.execute(SELECT_LOGS, (agent_id, limit)))
+
+    def start(self) -> None:
+        """Poll the source on a daemon thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="chain-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.cache is None:
+                    self.sync(CHAIN_INDEX_BATCH_BLOCKS)
+                else:
+                    # One worker indexes at a time; the others skip this round
+                    with self.cache.lock("chain-indexer", ttl=CHAIN_INDEX_POLL_SECONDS * 30, wait=0):
+                        self.sync(CHAIN_INDEX_BATCH_BLOCKS)
+            except TimeoutError:
+                pass
+            except Exception as e:
+                logging.error(f"Error indexing chain: {e}")
+            self._stop.wait(CHAIN_INDEX_POLL_SECONDS)
+
+_chain_indexer: Optional[ChainIndexer] = None
+
+def get_chain_indexer() -> ChainIndexer:
+    """Dependency provider: build the shared ChainIndexer on first use
+
+    Replays recorded blocks from CHAIN_INDEX_FIXTURES when it is set,
+    otherwise follows STACKS_API_URL.
+    """
+    global _chain_indexer
+    if _chain_indexer is None:
+        fixtures = os.environ.get("CHAIN_INDEX_FIXTURES")
+        source = FixtureChainSource(fixtures) if fixtures else HttpChainSource()
+        _chain_indexer = ChainIndexer(source, cache=get_cache_backend())
+    return _chain_indexer
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index bitgenius-agent contract calls into SQLite")
+    parser.add_argument("--db", default=CHAIN_INDEX_PATH)
+    parser.add_argument("--replay", metavar="DIR", help="index recorded block fixtures instead of the API")
+    parser.add_argument("--record", metavar="DIR", help="save every fetched block as a fixture")
+    parser.add_argument("--max-blocks", type=int, default=None)
+    args = parser.parse_args()
+
+    source = FixtureChainSource(args.replay) if args.replay else HttpChainSource()
+    if args.record:
+        source = RecordingChainSource(source, args.record)
+    indexer = ChainIndexer(source, path=args.db)
+    started = time.perf_counter()
+    applied = indexer.sync(args.max_blocks)
+    print(f"Applied {applied} blocks in {time.perf_counter() - started:.2f}s, checkpoint {indexer.checkpoint()}")
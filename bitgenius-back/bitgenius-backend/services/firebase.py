@@ -1,106 +1,57 @@
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import logging
 
+from services.cache import get_cache_backend
+from services.memory_firestore import InMemoryFirestore
+from models.records import LogRecord
+from services.storage import InstrumentedBackend, StorageBackend, create_storage_backend
+from services.rollup import EVENTS_CHANNEL
+
 db = None
 
 def initialize_firebase():
     global db
     
-    if firebase_admin._apps:
+    if db is not None:
         return
     
     cred_path = os.environ.get("FIREBASE_CREDENTIALS_PATH", "firebase_admin.json")
     
+    # For test/dev environment, use the in-memory engine if the file doesn't exist
+    if not os.path.exists(cred_path):
+        logging.warning(f"Firebase credentials file {cred_path} not found. Using in-memory Firestore")
+        db = _in_memory_firestore()
+        return
+    
     try:
-        # For test/dev environment, create a mock if file doesn't exist
-        if not os.path.exists(cred_path):
-            logging.warning(f"Firebase credentials file {cred_path} not found. Using mock implementation")
-            db = MockFirestore()
-            return
-            
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred)
+        # Deferred: firebase_admin pulls in the whole Google Cloud client stack
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+        
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(cred_path)
+            firebase_admin.initialize_app(cred)
         db = firestore.client()
         print("Firebase initialized successfully")
     except Exception as e:
         print(f"Error initializing Firebase: {e}")
-        logging.warning(f"Error initializing Firebase: {e}. Using mock implementation")
-        db = MockFirestore()
-
-# Mock implementation for testing
-class MockFirestore:
-    def __init__(self):
-        self.collections = {}
-        
-    def collection(self, name):
-        if name not in self.collections:
-            self.collections[name] = MockCollection(name)
-        return self.collections[name]
+        logging.warning(f"Error initializing Firebase: {e}. Using in-memory Firestore")
+        db = _in_memory_firestore()
 
-class MockCollection:
-    def __init__(self, name):
-        self.name = name
-        self.documents = {}
-        
-    def document(self, doc_id):
-        if doc_id not in self.documents:
-            self.documents[doc_id] = MockDocument(doc_id)
-        return self.documents[doc_id]
-    
-    def where(self, field, op, value):
-        return self
-    
-    def order_by(self, field, direction=None):
-        return self
-    
-    def limit(self, n):
-        return self
-    
-    def stream(self):
-        return self.documents.values()
-
-class MockDocument:
-    def __init__(self, doc_id):
-        self.id = doc_id
-        self.data = {}
-        self.collections = {}
-    
-    def collection(self, name):
-        if name not in self.collections:
-            self.collections[name] = MockCollection(name)
-        return self.collections[name]
-    
-    def set(self, data, merge=False):
-        if merge:
-            self.data.update(data)
-        else:
-            self.data = data
-        return self
-    
-    def update(self, data):
-        self.data.update(data)
-        return self
-    
-    def get(self):
-        return self
-    
-    def to_dict(self):
-        return self.data
-    
-    @property
-    def exists(self):
-        return True
+def _in_memory_firestore() -> InMemoryFirestore:
+    # FIRESTORE_SNAPSHOT_PATH keeps dev data across restarts; logs, by far the largest collection, are held compactly
+    return InMemoryFirestore(
+        snapshot_path=os.environ.get("FIRESTORE_SNAPSHOT_PATH"),
+        record_types={"agent-logs/*/logs": LogRecord}
+    )
 
 class FirestoreClient:
-    def __init__(self):
-        global db
-        if not db:
-            initialize_firebase()
-        self.db = db
+    """Logs, agent status and notifications, stored by the configured StorageBackend"""
+    
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self.backend = InstrumentedBackend(backend or create_storage_backend())
     
     def add_log(self, log_data: Dict) -> str:
         """Add a new log entry to Firebase"""
@@ -113,34 +64,7 @@ class FirestoreClient:
     def get_all_logs(self, limit: int = 50) -> List[Dict]:
         """Get logs from all agents, limited to the specified count"""
         try:
-            # Query for all agent documents
-            agents_ref = self.db.collection("agent-logs").limit(20)
-            
-            all_logs = []
-            
-            # For each agent, get their logs
-            for agent_doc in agents_ref.stream():
-                agent_id = agent_doc.id
-                
-                # Get logs for this agent
-                logs_ref = (
-                    self.db.collection("agent-logs")
-                    .document(agent_id)
-                    .collection("logs")
-                    .order_by("timestamp", direction=firestore.Query.DESCENDING if hasattr(firestore.Query, 'DESCENDING') else None)
-                    .limit(limit // 10)  # Divide limit across agents
-                )
-                
-                for log_doc in logs_ref.stream():
-                    log_data = log_doc.to_dict()
-                    log_data["id"] = log_doc.id
-                    log_data["agent_id"] = agent_id
-                    all_logs.append(log_data)
-            
-            # Sort all logs by timestamp, descending
-            all_logs.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
-            
-            return all_logs[:limit]
+            return self.backend.get_all_logs(limit)
         except Exception as e:
             logging.error(f"Error getting all logs: {e}")
             return []
@@ -151,81 +75,64 @@ class FirestoreClient:
                 log_data["timestamp"] = int(datetime.now().timestamp())
             
             agent_id_str = str(agent_id)
-            
-            doc_ref = self.db.collection("agent-logs").document(agent_id_str).collection("logs").document()
-            doc_ref.set(log_data)
-            
-            return doc_ref.id
+            log_id = self.backend.store_agent_log(agent_id_str, log_data)
+            
+            # Fan out to live consoles streaming this agent, whichever worker serves them
+            cache = get_cache_backend()
+            cache.publish(f"agent-logs:{agent_id_str}", {**log_data, "id": log_id})
+            cache.publish(EVENTS_CHANNEL, {
+                "type": "log",
+                "agent_id": agent_id_str,
+                "status": log_data.get("status"),
+                "amount": log_data.get("amount"),
+                "fee": log_data.get("fee")
+            })
+            
+            return log_id
         except Exception as e:
             logging.error(f"Error storing agent log: {e}")
             return "mock-log-id"
     
     def get_agent_logs(self, agent_id: int, limit: int = 10) -> List[Dict]:
         try:
-            agent_id_str = str(agent_id)
-            
-            logs_ref = (
-                self.db.collection("agent-logs")
-                .document(agent_id_str)
-                .collection("logs")
-                .order_by("timestamp", direction=firestore.Query.DESCENDING if hasattr(firestore.Query, 'DESCENDING') else None)
-                .limit(limit)
-            )
-            
-            logs = []
-            for doc in logs_ref.stream():
-                log_data = doc.to_dict()
-                log_data["id"] = doc.id
-                logs.append(log_data)
-            
-            return logs
+            return self.backend.get_agent_logs(str(agent_id), limit)
         except Exception as e:
             logging.error(f"Error getting agent logs: {e}")
             return []
     
     def get_agent_logs_by_range(self, agent_id: int, start_time: int, end_time: int) -> List[Dict]:
         try:
-            agent_id_str = str(agent_id)
-            
-            logs_ref = (
-                self.db.collection("agent-logs")
-                .document(agent_id_str)
-                .collection("logs")
-                .where("timestamp", ">=", start_time)
-                .where("timestamp", "<=", end_time)
-                .order_by("timestamp", direction=firestore.Query.DESCENDING if hasattr(firestore.Query, 'DESCENDING') else None)
-            )
-            
-            logs = []
-            for doc in logs_ref.stream():
-                log_data = doc.to_dict()
-                log_data["id"] = doc.id
-                logs.append(log_data)
-            
-            return logs
+            return self.backend.get_agent_logs_by_range(str(agent_id), start_time, end_time)
         except Exception as e:
             logging.error(f"Error getting agent logs by range: {e}")
             return []
     
     def update_agent_status(self, agent_id: int, status: str) -> None:
         try:
-            agent_id_str = str(agent_id)
-            
-            self.db.collection("agents").document(agent_id_str).set(
-                {"status": status, "updated_at": int(datetime.now().timestamp())},
-                merge=True
-            )
+            self.backend.update_agent_status(str(agent_id), status, int(datetime.now().timestamp()))
+            get_cache_backend().publish(EVENTS_CHANNEL, {"type": "status", "agent_id": str(agent_id), "status": status})
         except Exception as e:
             logging.error(f"Error updating agent status: {e}")
     
+    def update_agent_statuses(self, statuses: Dict[int, str]) -> bool:
+        """Write many agent statuses in one batch; returns False if the write failed"""
+        try:
+            self.backend.update_agent_statuses(
+                {str(agent_id): status for agent_id, status in statuses.items()},
+                int(datetime.now().timestamp())
+            )
+        except Exception as e:
+            logging.error(f"Error updating agent statuses: {e}")
+            return False
+        
+        cache = get_cache_backend()
+        for agent_id, status in statuses.items():
+            cache.publish(EVENTS_CHANNEL, {"type": "status", "agent_id": str(agent_id), "status": status})
+        return True
+    
     def get_agent_status(self, agent_id: int) -> Dict:
         try:
-            agent_id_str = str(agent_id)
-            
-            doc = self.db.collection("agents").document(agent_id_str).get()
-            if doc.exists:
-                return doc.to_dict()
-            return {"status": "unknown"}
+            return self.backend.get_agent_status(str(agent_id)) or {"status": "unknown"}
         except Exception as e:
             logging.error(f"Error getting agent status: {e}")
             return {"status": "unknown"}
@@ -235,41 +142,29 @@ class FirestoreClient:
             if "timestamp" not in notification:
                 notification["timestamp"] = int(datetime.now().timestamp())
             
-            doc_ref = self.db.collection("notifications").document(user).collection("items").document()
-            doc_ref.set(notification)
-            
-            return doc_ref.id
+            return self.backend.store_notification(user, notification)
         except Exception as e:
             logging.error(f"Error storing notification: {e}")
             return "mock-notification-id"
     
     def get_notifications(self, user: str, limit: int = 10) -> List[Dict]:
         try:
-            notifications_ref = (
-                self.db.collection("notifications")
-                .document(user)
-                .collection("items")
-                .order_by("timestamp", direction=firestore.Query.DESCENDING if hasattr(firestore.Query, 'DESCENDING') else None)
-                .limit(limit)
-            )
-            
-            notifications = []
-            for doc in notifications_ref.stream():
-                notification = doc.to_dict()
-                notification["id"] = doc.id
-                notifications.append(notification)
-            
-            return notifications
+            return self.backend.get_notifications(user, limit)
         except Exception as e:
             logging.error(f"Error getting notifications: {e}")
             return []
     
     def mark_notification_as_read(self, user: str, notification_id: str) -> None:
         try:
-            self.db.collection("notifications").document(user).collection("items").document(notification_id).update(
-                {"read": True}
-            )
+            self.backend.mark_notification_as_read(user, notification_id)
         except Exception as e:
             logging.error(f"Error marking notification as read: {e}")
 
-firestore_client = FirestoreClient()
+_firestore_client: Optional[FirestoreClient] = None
+
+def get_firestore_client() -> FirestoreClient:
+    """Dependency provider: build the shared FirestoreClient on first use"""
+    global _firestore_client
+    if _firestore_client is None:
+        _firestore_client = FirestoreClient()
+    return _firestore_client
@@ -1,6 +1,53 @@
 import os
-import google.generativeai as genai
-from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import logging
+from pydantic import BaseModel, ValidationError
+from typing import Dict, List, Optional, Type
+from urllib.parse import urlparse
+
+from services.cache import get_cache_backend
+from services.upstream import get_upstream
+from services.metrics import record_cache_lookup
+from models.ai import TriggerValidation, LogSummary, AIHelp
+from utils.structured import gemini_schema, parse_structured
+
+# Rough prompt budget per summarization chunk (~4 characters per token)
+LOG_CHUNK_TOKENS = int(os.environ.get("GEMINI_LOG_CHUNK_TOKENS", "3000"))
+MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "4"))
+SUMMARY_CACHE_TTL = float(os.environ.get("GEMINI_SUMMARY_CACHE_TTL", "86400"))
+GEMINI_TIMEOUT = float(os.environ.get("GEMINI_TIMEOUT", "60"))
+# Alternative API endpoint, e.g. a local stub for load tests; served over REST instead of gRPC
+GEMINI_API_ENDPOINT = os.environ.get("GEMINI_API_ENDPOINT", "")
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def _format_log_line(log: Dict) -> str:
+    line = f"[{log.get('timestamp', '?')}] {log.get('action', 'Unknown')} - {log.get('status', 'Unknown')} - {log.get('details', 'No details')}"
+    if log.get("amount") is not None:
+        line += f" (amount: {log['amount']} sats"
+        if log.get("fee") is not None:
+            line += f", fee: {log['fee']} sats"
+        line += ")"
+    return line
+
+def _chunk_lines(lines: List[str], budget: int) -> List[str]:
+    """Greedily pack lines into chunks of at most `budget` estimated tokens"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for line in lines:
+        tokens = _estimate_tokens(line)
+        if current and current_tokens + tokens > budget:
+            chunks.append("\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
 
 class GeminiClient:
     def __init__(self):
@@ -9,14 +56,59 @@ class GeminiClient:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
-        genai.configure(api_key=self.api_key)
+        # Deferred: the SDK takes most of a second to import
+        import google.generativeai as genai
+        
+        if GEMINI_API_ENDPOINT:
+            genai.configure(api_key=self.api_key, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+        else:
+            genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self._schemas = {}
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        self.cache = get_cache_backend()
+        # Generation is too costly to hedge; transient 429/5xx are still retried
+        self.upstream = get_upstream(
+            urlparse(GEMINI_API_ENDPOINT).hostname or "generativelanguage.googleapis.com",
+            timeout=GEMINI_TIMEOUT, deadline=GEMINI_TIMEOUT * 2, hedge_after=0
+        )
+    
+    async def generate(self, prompt: str, **kwargs):
+        """Call the model, holding one of the MAX_CONCURRENCY slots"""
+        async with self._semaphore:
+            return await self.upstream.call_async(
+                lambda timeout: self._generate_once(prompt, timeout, **kwargs),
+                attributes={"model": self.model.model_name, "prompt_chars": len(prompt)}
+            )
+    
+    def _generate_once(self, prompt: str, timeout: float, **kwargs):
+        if GEMINI_API_ENDPOINT:
+            # The SDK's async client only speaks gRPC
+            return asyncio.to_thread(self.model.generate_content, prompt, request_options={"timeout": timeout}, **kwargs)
+        return self.model.generate_content_async(prompt, request_options={"timeout": timeout}, **kwargs)
+    
+    async def _generate_structured(self, prompt: str, schema: Type[BaseModel], fallback: Dict) -> Dict:
+        """Generate a JSON response constrained to `schema` and validate it locally"""
+        if schema not in self._schemas:
+            import google.generativeai as genai
+            self._schemas[schema] = genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=gemini_schema(schema)
+            )
+        
+        response = await self.generate(prompt, generation_config=self._schemas[schema])
+        
+        try:
+            return parse_structured(response.text, schema).model_dump()
+        except (ValueError, ValidationError) as e:
+            logging.warning(f"Could not parse structured {schema.__name__} response: {e}")
+            return fallback
     
     async def generate_agent_names(self, goal: str, count: int = 5) -> List[str]:
         """Generate agent name suggestions based on a goal"""
         prompt = f"Suggest {count} creative and descriptive names for a Bitcoin trading agent with this goal: {goal}. Return only the names as a comma-separated list without numbering or explanations."
         
-        response = await self.model.generate_content_async(prompt)
+        response = await self.generate(prompt)
         
         names_text = response.text.strip()
         names = [name.strip() for name in names_text.split(",")]
@@ -39,50 +131,101 @@ class GeminiClient:
         - suggestions: array of improvement suggestions
         """
         
-        response = await self.model.generate_content_async(prompt)
-        
-        try:
-            import json
-            return json.loads(response.text)
-        except:
-            return {
-                "valid": False,
-                "errors": ["Could not parse AI response"],
-                "suggestions": ["Try simplifying your trigger condition"]
-            }
+        return await self._generate_structured(prompt, TriggerValidation, {
+            "valid": False,
+            "errors": ["Could not parse AI response"],
+            "suggestions": ["Try simplifying your trigger condition"]
+        })
     
-    async def summarize_logs(self, logs: List[Dict]) -> Dict:
-        """Summarize a set of agent logs and add insights"""
-        if not logs:
-            return {"summary": "No logs to summarize", "insights": []}
+    async def _cached_summary(self, kind: str, text: str, prompt: str) -> Dict:
+        """Summarize `text`, reusing a previous result for identical content"""
+        key = f"gemini:{kind}:{hashlib.sha256(text.encode()).hexdigest()}"
+        cached = self.cache.get(key)
+        record_cache_lookup(key, cached is not None)
+        if cached is not None:
+            return cached
         
-        logs_text = "\n".join([
-            f"Log {i+1}: {log.get('action', 'Unknown')} - {log.get('status', 'Unknown')} - {log.get('details', 'No details')}"
-            for i, log in enumerate(logs[:10])  # Limit to 10 logs
-        ])
+        fallback = {
+            "summary": "Log analysis completed",
+            "insights": ["Could not generate detailed insights"],
+            "tags": ["agent-activity"]
+        }
+        result = await self._generate_structured(prompt, LogSummary, fallback)
         
+        # Only cache real completions so a failed chunk is retried next time
+        if result is not fallback:
+            self.cache.set(key, result, SUMMARY_CACHE_TTL)
+        return result
+    
+    async def _summarize_chunk(self, chunk: str) -> Dict:
         prompt = f"""
         Analyze these Bitcoin agent logs and provide a summary and insights:
         
-        {logs_text}
+        {chunk}
         
         Return a JSON with these fields:
         - summary: a concise summary of agent activity
         - insights: array of insights or recommendations
         - tags: array of relevant tags for these logs
         """
+        return await self._cached_summary("chunk", chunk, prompt)
+    
+    async def _merge_summaries(self, partials: List[Dict]) -> Dict:
+        """Reduce partial summaries of consecutive periods into one, level by level"""
+        texts = [
+            f"Period {i+1}: {p.get('summary', '')}\n"
+            f"  Insights: {'; '.join(p.get('insights', []))}\n"
+            f"  Tags: {', '.join(p.get('tags', []))}"
+            for i, p in enumerate(partials)
+        ]
+        groups = _chunk_lines(texts, LOG_CHUNK_TOKENS)
+        if len(groups) >= len(texts) > 1:
+            # Summaries too long to share a chunk would never reduce: cut each to
+            # half the budget and merge them in pairs, so every level halves
+            max_chars = max(LOG_CHUNK_TOKENS // 2 - 1, 1) * 4
+            texts = [text[:max_chars] for text in texts]
+            groups = ["\n".join(texts[i:i + 2]) for i in range(0, len(texts), 2)]
+        
+        if len(groups) > 1:
+            merged = await asyncio.gather(*[self._merge_group(group) for group in groups])
+            return await self._merge_summaries(list(merged))
+        return await self._merge_group(groups[0])
+    
+    async def _merge_group(self, group: str) -> Dict:
+        prompt = f"""
+        These are summaries of consecutive periods of one Bitcoin agent's activity, oldest first:
+        
+        {group}
+        
+        Merge them into a single overview of the whole history.
+        
+        Return a JSON with these fields:
+        - summary: a concise summary of agent activity over all periods
+        - insights: array of the most important insights or recommendations
+        - tags: array of relevant tags for the whole history
+        """
+        return await self._cached_summary("merge", group, prompt)
+    
+    async def summarize_logs(self, logs: List[Dict]) -> Dict:
+        """Summarize a set of agent logs and add insights
         
-        response = await self.model.generate_content_async(prompt)
+        Logs are ordered by timestamp and packed into chunks of LOG_CHUNK_TOKENS.
+        Chunks are summarized concurrently and the partial summaries merged, so
+        any number of logs can be summarized. Chunk summaries are kept in the
+        shared cache keyed by content hash, so an appended history only pays
+        for its new tail.
+        """
+        if not logs:
+            return {"summary": "No logs to summarize", "insights": []}
         
-        try:
-            import json
-            return json.loads(response.text)
-        except:
-            return {
-                "summary": "Log analysis completed",
-                "insights": ["Could not generate detailed insights"],
-                "tags": ["agent-activity"]
-            }
+        ordered = sorted(logs, key=lambda log: log.get("timestamp") or 0)
+        chunks = _chunk_lines([_format_log_line(log) for log in ordered], LOG_CHUNK_TOKENS)
+        
+        partials = await asyncio.gather(*[self._summarize_chunk(chunk) for chunk in chunks])
+        if len(partials) == 1:
+            return partials[0]
+        
+        return await self._merge_summaries(list(partials))
     
     async def get_ai_help(self, context: str) -> Dict:
         """Get AI help and tips based on context"""
@@ -97,16 +240,17 @@ class GeminiClient:
         - example: a relevant example if applicable
         """
         
-        response = await self.model.generate_content_async(prompt)
-        
-        try:
-            import json
-            return json.loads(response.text)
-        except:
-            return {
-                "title": "Tips for Bitcoin Agents",
-                "tips": ["Start with small allocations", "Test your strategy thoroughly", "Monitor performance regularly"],
-                "example": "Example: A DCA strategy that buys $10 of BTC weekly"
-            }
+        return await self._generate_structured(prompt, AIHelp, {
+            "title": "Tips for Bitcoin Agents",
+            "tips": ["Start with small allocations", "Test your strategy thoroughly", "Monitor performance regularly"],
+            "example": "Example: A DCA strategy that buys $10 of BTC weekly"
+        })
+
+_gemini_client: Optional[GeminiClient] = None
 
-gemini_client = GeminiClient()
+def get_gemini_client() -> GeminiClient:
+    """Dependency provider: build the shared GeminiClient on first use"""
+    global _gemini_client
+    if _gemini_client is None:
+        _gemini_client = GeminiClient()
+    return _gemini_client
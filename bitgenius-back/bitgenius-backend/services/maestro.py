@@ -1,14 +1,33 @@
 import os
+import logging
 import requests
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Mapping, Optional, Any, Sequence, Tuple
 import json
 
+from models.records import AgentRecord
+from services.cache import get_cache_backend
+from services.tracing import in_current_context
+from services.upstream import upstream_for
+from utils.clarity import encode_function_args, validate_principal
+
+TEMPLATES_TTL = float(os.environ.get("TEMPLATES_TTL", "300"))
+# Read-only calls in flight at once for batch reads, and pooled connections to Maestro
+MAESTRO_BATCH_CONCURRENCY = int(os.environ.get("MAESTRO_BATCH_CONCURRENCY", "16"))
+
+READ_ONLY_ENDPOINT = "/stacks/v1/read-only-call"
+TX_BUILD_ENDPOINT = "/stacks/v1/transactions/build"
+# Answer known read-only calls with canned data when Maestro is unreachable (local development only)
+MAESTRO_MOCK_FALLBACK = os.environ.get("MAESTRO_MOCK_FALLBACK", "false").lower() == "true"
+
 class MaestroClient:
     def __init__(self):
         self.api_key = os.environ.get("MAESTRO_API_KEY")
         self.base_url = os.environ.get("MAESTRO_URL", "https://xbt-testnet.gomaestro-api.org/v0")
         self.contract_address = os.environ.get("CONTRACT_ADDRESS")
         self.contract_name = "bitgenius-agent"
+        self.cache = get_cache_backend()
         
         if not self.api_key:
             raise ValueError("MAESTRO_API_KEY environment variable not set")
@@ -18,15 +37,31 @@ class MaestroClient:
             "Content-Type": "application/json",
             "x-api-key": self.api_key
         }
+        
+        # Keep-alive connections shared by all calls, sized for a full batch in flight
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAESTRO_BATCH_CONCURRENCY)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=MAESTRO_BATCH_CONCURRENCY, thread_name_prefix="maestro")
+        self.upstream = upstream_for(self.base_url)
+        self._tx_templates: Dict[str, Dict] = {}
     
     def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict:
         url = f"{self.base_url}{endpoint}"
+        # Read-only calls are POSTs but safe to retry; building a transaction is not
+        idempotent = method == "GET" or endpoint == READ_ONLY_ENDPOINT
+        attributes = self._span_attributes(data)
         
         try:
             if method == "GET":
-                response = requests.get(url, headers=self.headers, params=data)
+                response = self.upstream.request(self.session, "GET", url, idempotent, attributes,
+                                                 headers=self.headers, params=data)
             elif method == "POST":
-                response = requests.post(url, headers=self.headers, json=data)
+                # Compact separators: the default ", " and ": " add two bytes per field
+                body = json.dumps(data, separators=(",", ":"))
+                response = self.upstream.request(self.session, "POST", url, idempotent, attributes,
+                                                 headers=self.headers, data=body)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
             
@@ -35,19 +70,87 @@ class MaestroClient:
             
             return response.json()
         except Exception as e:
+            if not MAESTRO_MOCK_FALLBACK:
+                raise
+            
             # For testing purposes, if real API call fails, return mock data
-            if "get-agent-count" in endpoint or "function_name" in data and data["function_name"] == "get-agent-count":
+            function_name = (data or {}).get("function_name", "")
+            if "get-agent-count" in endpoint or function_name == "get-agent-count":
                 return {"value": {"value": "5"}}
-            elif "get-all-templates" in endpoint or "function_name" in data and data["function_name"] == "get-all-templates":
+            elif "get-all-templates" in endpoint or function_name == "get-all-templates":
                 return {"value": {"value": ["auto_dca", "privacy_mixer", "arbitrage_hunter", "treasury_tracker"]}}
-            elif "get-agent-template" in endpoint or "function_name" in data and data["function_name"] == "get-agent-template":
+            elif "get-agent-template" in endpoint or function_name == "get-agent-template":
                 return {"value": {"value": {"description": "Template description", "default-strategy": "Default strategy"}}}
-            elif "get-agent-by-id" in endpoint or "function_name" in data and data["function_name"] == "get-agent-by-id":
+            elif "get-agent-by-id" in endpoint or function_name == "get-agent-by-id":
                 return {"owner": "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM", "name": "Test Agent", "agent-type": "auto_dca", "strategy": "hodl", "status": "online", "trigger-condition": "price_threshold", "privacy-enabled": True, "allocation": 10000, "created-at": 100000, "last-active": 100010}
             
             # If not a known mock endpoint, re-raise the exception
             raise
     
+    @staticmethod
+    def _span_attributes(data: Optional[Dict]) -> Dict:
+        """Trace attributes for a contract call: its function and, when it takes one first, the agent id"""
+        if not data or "function_name" not in data:
+            return {}
+        attributes = {"function_name": data["function_name"]}
+        function_args = data.get("function_args") or []
+        if function_args and function_args[0].get("type") == "uint":
+            attributes["agent_id"] = int(function_args[0]["value"])
+        return attributes
+    
+    def _read_only_payload(self, function_name: str, function_args: List[Dict]) -> Dict:
+        return {
+            "contract_address": self.contract_address,
+            "contract_name": self.contract_name,
+            "function_name": function_name,
+            "function_args": function_args
+        }
+    
+    def batch_read_only(self, calls: Sequence[Tuple[str, List[Dict]]]) -> List[Dict]:
+        """Run many read-only calls concurrently over pooled connections
+        
+        Takes (function_name, function_args) pairs and returns responses in
+        the same order. A failed call yields {"error": "..."} in its slot
+        instead of failing the batch.
+        """
+        def call(function_name: str, function_args: List[Dict]) -> Dict:
+            try:
+                return self._make_request("POST", READ_ONLY_ENDPOINT, self._read_only_payload(function_name, function_args))
+            except Exception as e:
+                return {"error": str(e)}
+        
+        if len(calls) == 1:
+            return [call(*calls[0])]
+        call = in_current_context(call)
+        return list(self._executor.map(lambda c: call(*c), calls))
+    
+    def get_agents_by_ids(self, agent_ids: Sequence[int]) -> List[Optional[Mapping]]:
+        """Get several agents in one batch
+        
+        Each slot holds the AgentRecord, None if the agent doesn't exist, or
+        {"error": "..."} if its lookup failed, so callers can tell a missing
+        agent from an upstream failure (see raise_for_failed_lookups).
+        """
+        responses = self.batch_read_only([
+            ("get-agent-by-id", [{"type": "uint", "value": str(agent_id)}]) for agent_id in agent_ids
+        ])
+        agents = []
+        for agent_id, response in zip(agent_ids, responses):
+            if "error" in response:
+                logging.error(f"Error fetching agent {agent_id}: {response['error']}")
+                agents.append(response)
+            else:
+                # Full scans hold every agent at once, so keep them compact
+                agents.append(AgentRecord.from_dict(response) if response else None)
+        return agents
+    
+    def get_all_agents(self) -> List[AgentRecord]:
+        """Get every registered agent; raises rather than return a partial list"""
+        agent_ids = range(1, self.get_agent_count() + 1)
+        agents = self.get_agents_by_ids(agent_ids)
+        raise_for_failed_lookups(agent_ids, agents)
+        return [agent for agent in agents if agent]
+    
     def get_agent_by_id(self, agent_id: int) -> Dict:
         """Get agent details by ID using the get-agent-by-id read-only function"""
         endpoint = f"/stacks/v1/read-only-call"
@@ -59,19 +162,11 @@ class MaestroClient:
         }
         return self._make_request("POST", endpoint, payload)
     
-    def get_agents_by_owner(self, owner: str) -> List[Dict]:
+    def get_agents_by_owner(self, owner: str) -> List[AgentRecord]:
         """Get all agents owned by a specific principal"""
         # Since there's no direct function for this in the contract,
-        # we need to get the agent count and then check each agent
-        agent_count = self.get_agent_count()
-        agents = []
-        
-        for i in range(1, agent_count + 1):
-            agent = self.get_agent_by_id(i)
-            if agent and agent.get("owner") == owner:
-                agents.append(agent)
-        
-        return agents
+        # we need to get every agent and check its owner
+        return [agent for agent in self.get_all_agents() if agent.get("owner") == owner]
     
     def get_agent_status(self, agent_id: int) -> str:
         """Get the current status of an agent"""
@@ -98,7 +193,10 @@ class MaestroClient:
         return int(response.get("value", {}).get("value", "0"))
     
     def get_agent_templates(self) -> List[Dict]:
-        """Get all available agent templates"""
+        """Get all available agent templates, shared across workers for TEMPLATES_TTL"""
+        return self.cache.get_or_compute("maestro:templates", self._fetch_agent_templates, TEMPLATES_TTL)
+    
+    def _fetch_agent_templates(self) -> List[Dict]:
         endpoint = f"/stacks/v1/read-only-call"
         payload = {
             "contract_address": self.contract_address,
@@ -108,10 +206,16 @@ class MaestroClient:
         }
         response = self._make_request("POST", endpoint, payload)
         template_ids = response.get("value", {}).get("value", [])
+        responses = self.batch_read_only([
+            ("get-agent-template", [{"type": "string-ascii", "value": template_id}]) for template_id in template_ids
+        ])
         
         templates = []
-        for template_id in template_ids:
-            template = self.get_agent_template(template_id)
+        for template_id, template_response in zip(template_ids, responses):
+            if "error" in template_response:
+                logging.error(f"Error fetching template {template_id}: {template_response['error']}")
+                continue
+            template = template_response.get("value", {}).get("value", {})
             if template:
                 templates.append({
                     "template_id": template_id,
@@ -170,84 +274,94 @@ class MaestroClient:
         }
         return self._make_request("POST", endpoint, payload)
     
-    def prepare_register_agent_tx(self, agent_data: Dict) -> Dict:
-        """Prepare a transaction payload for registering a new agent"""
-        endpoint = "/stacks/v1/transactions/build"
+    def _build_tx(self, function_name: str, values: List[Any], sender: str) -> Dict:
+        """Validate and encode arguments locally, then build the transaction upstream
         
-        payload = {
-            "contract_address": self.contract_address,
-            "contract_name": self.contract_name,
-            "function_name": "register-agent",
-            "function_args": [
-                {"type": "string-ascii", "value": agent_data["name"]},
-                {"type": "string-ascii", "value": agent_data["agent_type"]},
-                {"type": "string-ascii", "value": agent_data["strategy"]},
-                {"type": "string-ascii", "value": agent_data["trigger_condition"]},
-                {"type": "bool", "value": str(agent_data["privacy_enabled"]).lower()},
-                {"type": "uint", "value": str(agent_data["allocation"])}
-            ],
-            "sender_address": agent_data["sender"]
-        }
+        Raises ClarityArgError before any request when an argument doesn't fit.
+        """
+        function_args = encode_function_args(function_name, values)
+        validate_principal(sender)
         
-        return self._make_request("POST", endpoint, payload)
+        template = self._tx_templates.get(function_name)
+        if template is None:
+            template = self._tx_templates[function_name] = {
+                "contract_address": self.contract_address,
+                "contract_name": self.contract_name,
+                "function_name": function_name
+            }
+        
+        return self._make_request("POST", TX_BUILD_ENDPOINT, {
+            **template,
+            "function_args": function_args,
+            "sender_address": sender
+        })
+    
+    def prepare_register_agent_tx(self, agent_data: Dict) -> Dict:
+        """Prepare a transaction payload for registering a new agent"""
+        return self._build_tx("register-agent", [
+            agent_data["name"],
+            agent_data["agent_type"],
+            agent_data["strategy"],
+            agent_data["trigger_condition"],
+            agent_data["privacy_enabled"],
+            agent_data["allocation"]
+        ], agent_data["sender"])
     
     def prepare_update_agent_status_tx(self, agent_id: int, new_status: str, sender: str) -> Dict:
         """Prepare a transaction payload for updating agent status"""
-        endpoint = "/stacks/v1/transactions/build"
+        return self._build_tx("update-agent-status", [agent_id, new_status], sender)
+    
+    def prepare_update_agent_status_txs(self, agent_ids: Sequence[int], new_status: str, sender: str) -> List[Dict]:
+        """Prepare status transactions for many agents concurrently
         
-        payload = {
-            "contract_address": self.contract_address,
-            "contract_name": self.contract_name,
-            "function_name": "update-agent-status",
-            "function_args": [
-                {"type": "uint", "value": str(agent_id)},
-                {"type": "string-ascii", "value": new_status}
-            ],
-            "sender_address": sender
-        }
+        Results are in `agent_ids` order; a failed build yields {"error": "..."} in its slot.
+        """
+        def build(agent_id: int) -> Dict:
+            try:
+                return self.prepare_update_agent_status_tx(agent_id, new_status, sender)
+            except Exception as e:
+                return {"error": str(e)}
         
-        return self._make_request("POST", endpoint, payload)
+        return list(self._executor.map(in_current_context(build), agent_ids))
+    
+    @staticmethod
+    def _log_agent_action_args(log_data: Dict) -> List[Any]:
+        return [
+            log_data["agent_id"],
+            log_data["action"],
+            log_data["status"],
+            log_data.get("transaction_id") or None,
+            log_data.get("amount"),
+            log_data.get("fee"),
+            log_data["details"]
+        ]
+    
+    def validate_log_agent_action(self, log_data: Dict, sender: str) -> None:
+        """Raise ClarityArgError if the log can't be sent on-chain, without any request"""
+        encode_function_args("log-agent-action", self._log_agent_action_args(log_data))
+        validate_principal(sender)
     
     def prepare_log_agent_action_tx(self, log_data: Dict, sender: str) -> Dict:
         """Prepare a transaction payload for logging an agent action"""
-        endpoint = "/stacks/v1/transactions/build"
-        
-        # Prepare optional arguments
-        tx_id = log_data.get("transaction_id")
-        if tx_id:
-            tx_id_arg = {"type": "optional", "value": {"type": "buff", "value": tx_id}}
-        else:
-            tx_id_arg = {"type": "optional", "value": None}
-            
-        amount = log_data.get("amount")
-        if amount is not None:
-            amount_arg = {"type": "optional", "value": {"type": "uint", "value": str(amount)}}
-        else:
-            amount_arg = {"type": "optional", "value": None}
-            
-        fee = log_data.get("fee")
-        if fee is not None:
-            fee_arg = {"type": "optional", "value": {"type": "uint", "value": str(fee)}}
-        else:
-            fee_arg = {"type": "optional", "value": None}
-        
-        payload = {
-            "contract_address": self.contract_address,
-            "contract_name": self.contract_name,
-            "function_name": "log-agent-action",
-            "function_args": [
-                {"type": "uint", "value": str(log_data["agent_id"])},
-                {"type": "string-ascii", "value": log_data["action"]},
-                {"type": "string-ascii", "value": log_data["status"]},
-                tx_id_arg,
-                amount_arg,
-                fee_arg,
-                {"type": "string-ascii", "value": log_data["details"]}
-            ],
-            "sender_address": sender
-        }
-        
-        return self._make_request("POST", endpoint, payload)
+        return self._build_tx("log-agent-action", self._log_agent_action_args(log_data), sender)
+
+def raise_for_failed_lookups(agent_ids: Sequence[int], agents: Sequence[Optional[Mapping]]) -> None:
+    """Raise if any slot of a get_agents_by_ids result is an error
+    
+    Scans that count or list every agent must not pass off a partial result
+    as complete.
+    """
+    failed = [(agent_id, agent["error"]) for agent_id, agent in zip(agent_ids, agents)
+              if agent is not None and not isinstance(agent, AgentRecord)]
+    if failed:
+        agent_id, error = failed[0]
+        raise Exception(f"{len(failed)} of {len(agents)} agent lookups failed, first agent {agent_id}: {error}")
+
+_maestro_client: Optional[MaestroClient] = None
 
-# Create a singleton instance
-maestro_client = MaestroClient()
+def get_maestro_client() -> MaestroClient:
+    """Dependency provider: build the shared MaestroClient on first use"""
+    global _maestro_client
+    if _maestro_client is None:
+        _maestro_client = MaestroClient()
+    return _maestro_client
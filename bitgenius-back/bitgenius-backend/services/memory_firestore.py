@@ -0,0 +1,472 @@
+import os
+import json
+import atexit
+import bisect
+import fnmatch
+import random
+import string
+import threading
+import logging
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+# Same values as google.cloud.firestore.Query.ASCENDING / DESCENDING
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+MAX_BATCH_SIZE = 500
+
+_RANGE_OPS = {"<", "<=", ">", ">="}
+_AUTO_ID_CHARS = string.ascii_letters + string.digits
+
+class _Top:
+    """Sorts after every doc id, to bound index scans on equal field values"""
+    def __lt__(self, other):
+        return False
+    def __gt__(self, other):
+        return True
+
+_TOP = _Top()
+
+class NotFound(Exception):
+    """Raised by update() on a missing document, like google.api_core NotFound"""
+
+def _auto_id() -> str:
+    return "".join(random.choice(_AUTO_ID_CHARS) for _ in range(20))
+
+def _sort_key(value: Any) -> Tuple:
+    """Order values across types the way Firestore does: null < bool < number < string < others"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4, json.dumps(value, sort_keys=True, default=str))
+
+def _matches(doc: Dict, field: str, op: str, value: Any) -> bool:
+    if field not in doc:
+        return False
+    actual = doc[field]
+    if op == "==":
+        return actual == value
+    if op == "!=":
+        return actual != value
+    if op == "in":
+        return actual in value
+    if op == "not-in":
+        return actual not in value
+    if op == "array-contains":
+        return isinstance(actual, list) and value in actual
+    if op == "array-contains-any":
+        return isinstance(actual, list) and any(v in actual for v in value)
+    # Range comparisons only match values of the same type, as in Firestore
+    if _sort_key(actual)[0] != _sort_key(value)[0]:
+        return False
+    if op == "<":
+        return actual < value
+    if op == "<=":
+        return actual <= value
+    if op == ">":
+        return actual > value
+    if op == ">=":
+        return actual >= value
+    raise ValueError(f"Unsupported operator: {op}")
+
+class _SortedIndex:
+    """Entries (sort key of field value, doc id), kept sorted for range scans"""
+
+    def __init__(self, field: str, docs: Dict[str, Dict]):
+        self.field = field
+        self.entries = sorted(
+            (_sort_key(data[field]), doc_id) for doc_id, data in docs.items() if field in data
+        )
+
+    def insert(self, doc_id: str, data: Dict) -> None:
+        if self.field in data:
+            bisect.insort(self.entries, (_sort_key(data[self.field]), doc_id))
+
+    def remove(self, doc_id: str, data: Dict) -> None:
+        if self.field in data:
+            entry = (_sort_key(data[self.field]), doc_id)
+            i = bisect.bisect_left(self.entries, entry)
+            if i < len(self.entries) and self.entries[i] == entry:
+                del self.entries[i]
+
+    def scan(self, lower=None, lower_inclusive=True, upper=None, upper_inclusive=True, reverse=False) -> Iterator[str]:
+        """Yield doc ids whose value lies within the bounds, in index order"""
+        if lower is None:
+            start = 0
+        elif lower_inclusive:
+            start = bisect.bisect_left(self.entries, (lower,))
+        else:
+            start = bisect.bisect_right(self.entries, (lower, _TOP))
+        if upper is None:
+            end = len(self.entries)
+        elif upper_inclusive:
+            end = bisect.bisect_right(self.entries, (upper, _TOP))
+        else:
+            end = bisect.bisect_left(self.entries, (upper,))
+
+        positions = range(end - 1, start - 1, -1) if reverse else range(start, end)
+        for i in positions:
+            yield self.entries[i][1]
+
+def _snapshot_default(value: Any) -> Any:
+    # Documents held as compact records are written out as plain objects
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class _CollectionData:
+    def __init__(self, record_type: Optional[type] = None):
+        self.docs: Dict[str, Dict] = {}
+        self.indexes: Dict[str, _SortedIndex] = {}
+        self.record_type = record_type
+
+    def make(self, data: Mapping) -> Mapping:
+        """The stored form of a document: a copy, compacted into a record when the collection has a type"""
+        return self.record_type.from_dict(data) if self.record_type is not None else dict(data)
+
+    def index(self, field: str) -> _SortedIndex:
+        # Indexes are built the first time a field is queried, then maintained on write
+        if field not in self.indexes:
+            self.indexes[field] = _SortedIndex(field, self.docs)
+        return self.indexes[field]
+
+    def put(self, doc_id: str, data: Dict) -> None:
+        old = self.docs.get(doc_id)
+        for index in self.indexes.values():
+            if old is not None:
+                index.remove(doc_id, old)
+            index.insert(doc_id, data)
+        self.docs[doc_id] = data
+
+    def remove(self, doc_id: str) -> None:
+        old = self.docs.pop(doc_id, None)
+        if old is not None:
+            for index in self.indexes.values():
+                index.remove(doc_id, old)
+
+class QueryStats:
+    """Counters mirroring what Firestore bills: documents read and written"""
+
+    def __init__(self):
+        self.queries = 0
+        self.documents_read = 0
+        self.documents_scanned = 0
+        self.writes = 0
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+class InMemoryFirestore:
+    """In-memory document engine with the subset of the Firestore client API this app uses
+
+    Collections keep ordered secondary indexes on queried fields, so range
+    filters, ordering, limits and start_after cursors touch only matching
+    documents. With snapshot_path set, data is loaded from and periodically
+    saved to a JSON snapshot.
+
+    record_types maps collection path patterns ("agent-logs/*/logs") to a
+    models.records type; documents there are held as those compact records
+    and still come out of snapshots and queries as dicts.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, snapshot_every: int = 1000,
+                 record_types: Optional[Dict[str, type]] = None):
+        self._collections: Dict[str, _CollectionData] = {}
+        self.record_types = record_types or {}
+        self._lock = threading.RLock()
+        self.stats = QueryStats()
+        self.snapshot_path = snapshot_path
+        self.snapshot_every = snapshot_every
+        self._unsaved_writes = 0
+
+        if snapshot_path:
+            if os.path.exists(snapshot_path):
+                self.load(snapshot_path)
+            atexit.register(self.save)
+
+    def collection(self, name: str) -> "CollectionReference":
+        return CollectionReference(self, name)
+
+    def batch(self) -> "WriteBatch":
+        return WriteBatch(self)
+
+    def _data(self, path: str) -> _CollectionData:
+        if path not in self._collections:
+            record_type = next(
+                (kind for pattern, kind in self.record_types.items() if fnmatch.fnmatchcase(path, pattern)), None
+            )
+            self._collections[path] = _CollectionData(record_type)
+        return self._collections[path]
+
+    def _write(self, path: str, doc_id: str, data: Optional[Dict], merge: bool = False) -> None:
+        collection = self._data(path)
+        if data is None:
+            collection.remove(doc_id)
+        else:
+            if merge and doc_id in collection.docs:
+                data = {**collection.docs[doc_id], **data}
+            collection.put(doc_id, collection.make(data))
+        self.stats.writes += 1
+        self._unsaved_writes += 1
+
+    def _after_write(self) -> None:
+        if self.snapshot_path and self._unsaved_writes >= self.snapshot_every:
+            self.save()
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write every collection to a JSON snapshot"""
+        path = path or self.snapshot_path
+        if not path:
+            return
+        with self._lock:
+            snapshot = {name: data.docs for name, data in self._collections.items() if data.docs}
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"collections": snapshot}, f, default=_snapshot_default)
+            os.replace(tmp_path, path)
+            self._unsaved_writes = 0
+
+    def load(self, path: str) -> None:
+        """Replace all data with the contents of a JSON snapshot"""
+        with open(path) as f:
+            snapshot = json.load(f)
+        with self._lock:
+            self._collections = {}
+            for name, docs in snapshot.get("collections", {}).items():
+                collection = self._data(name)
+                collection.docs.update((doc_id, collection.make(data)) for doc_id, data in docs.items())
+        logging.info(f"Loaded Firestore snapshot {path}")
+
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[Dict]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict]:
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+class DocumentReference:
+    def __init__(self, db: InMemoryFirestore, collection_path: str, doc_id: str):
+        self._db = db
+        self._collection_path = collection_path
+        self.id = doc_id
+        self.path = f"{collection_path}/{doc_id}"
+
+    def collection(self, name: str) -> "CollectionReference":
+        # Subcollections exist independently of whether this document does
+        return CollectionReference(self._db, f"{self.path}/{name}")
+
+    def set(self, data: Dict, merge: bool = False) -> None:
+        with self._db._lock:
+            self._db._write(self._collection_path, self.id, data, merge)
+        self._db._after_write()
+
+    def update(self, data: Dict) -> None:
+        with self._db._lock:
+            if self.id not in self._db._data(self._collection_path).docs:
+                raise NotFound(f"No document to update: {self.path}")
+            self._db._write(self._collection_path, self.id, data, merge=True)
+        self._db._after_write()
+
+    def delete(self) -> None:
+        with self._db._lock:
+            self._db._write(self._collection_path, self.id, None)
+        self._db._after_write()
+
+    def get(self) -> DocumentSnapshot:
+        with self._db._lock:
+            data = self._db._data(self._collection_path).docs.get(self.id)
+            self._db.stats.documents_read += 1
+            return DocumentSnapshot(self, dict(data) if data is not None else None)
+
+class Query:
+    def __init__(self, db: InMemoryFirestore, path: str, filters=(), orders=(), limit_count=None, cursor=None):
+        self._db = db
+        self._path = path
+        self._filters: Tuple = tuple(filters)
+        self._orders: Tuple = tuple(orders)
+        self._limit = limit_count
+        self._cursor = cursor
+
+    def _copy(self, **changes) -> "Query":
+        fields = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit_count": self._limit,
+            "cursor": self._cursor
+        }
+        fields.update(changes)
+        return Query(self._db, self._path, **fields)
+
+    def where(self, field: str, op: str, value: Any) -> "Query":
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field: str, direction: Optional[str] = None) -> "Query":
+        return self._copy(orders=self._orders + ((field, direction or ASCENDING),))
+
+    def limit(self, count: int) -> "Query":
+        return self._copy(limit_count=count)
+
+    def start_after(self, cursor) -> "Query":
+        """Resume after a DocumentSnapshot, or after a dict of order-by field values"""
+        return self._copy(cursor=cursor)
+
+    def get(self) -> List[DocumentSnapshot]:
+        return list(self.stream())
+
+    def _bounds(self, field: str) -> Dict:
+        bounds = {}
+        for f, op, value in self._filters:
+            if f != field:
+                continue
+            if op == "==":
+                bounds["lower"] = bounds["upper"] = _sort_key(value)
+            elif op in (">", ">="):
+                bounds["lower"] = _sort_key(value)
+                bounds["lower_inclusive"] = op == ">="
+            elif op in ("<", "<="):
+                bounds["upper"] = _sort_key(value)
+                bounds["upper_inclusive"] = op == "<="
+        return bounds
+
+    def _index_field(self) -> Optional[str]:
+        if self._orders:
+            return self._orders[0][0]
+        for field, op, _ in self._filters:
+            if op == "==" or op in _RANGE_OPS:
+                return field
+        return None
+
+    def _cursor_values(self) -> Optional[Tuple]:
+        if self._cursor is None:
+            return None
+        if isinstance(self._cursor, DocumentSnapshot):
+            data = self._cursor.to_dict() or {}
+            return tuple(_sort_key(data.get(f)) for f, _ in self._orders) + (self._cursor.id,)
+        return tuple(_sort_key(self._cursor.get(f)) for f, _ in self._orders) + (None,)
+
+    def stream(self) -> Iterator[DocumentSnapshot]:
+        with self._db._lock:
+            results = self._execute()
+        return iter(results)
+
+    def _execute(self) -> List[DocumentSnapshot]:
+        collection = self._db._data(self._path)
+        stats = self._db.stats
+        stats.queries += 1
+
+        index_field = self._index_field()
+        single_order = len(self._orders) <= 1
+        if index_field is not None and single_order:
+            reverse = bool(self._orders) and self._orders[0][1] == DESCENDING
+            candidates = collection.index(index_field).scan(reverse=reverse, **self._bounds(index_field))
+        else:
+            candidates = iter(sorted(collection.docs))
+
+        cursor = self._cursor_values()
+        use_index = index_field is not None and single_order
+        rows = []
+        for doc_id in candidates:
+            data = collection.docs[doc_id]
+            stats.documents_scanned += 1
+            if not all(_matches(data, f, op, v) for f, op, v in self._filters):
+                continue
+            if any(f not in data for f, _ in self._orders):
+                continue  # Firestore omits documents missing an order-by field
+            if use_index and cursor is not None and not self._past_cursor(data, doc_id, cursor):
+                continue
+            rows.append((doc_id, data))
+            # Index order already satisfies the query, so stop as soon as the page is full
+            if use_index and self._limit is not None and len(rows) >= self._limit:
+                break
+
+        if not use_index:
+            for field, direction in reversed(self._orders):
+                rows.sort(key=lambda row: _sort_key(row[1][field]), reverse=direction == DESCENDING)
+            if cursor is not None:
+                rows = [(doc_id, data) for doc_id, data in rows if self._past_cursor(data, doc_id, cursor)]
+
+        if self._limit is not None:
+            rows = rows[:self._limit]
+
+        stats.documents_read += len(rows)
+        return [
+            DocumentSnapshot(DocumentReference(self._db, self._path, doc_id), dict(data))
+            for doc_id, data in rows
+        ]
+
+    def _past_cursor(self, data: Dict, doc_id: str, cursor: Tuple) -> bool:
+        """Whether a result sorts strictly after the start_after cursor"""
+        cursor_values, cursor_doc_id = cursor[:-1], cursor[-1]
+        for (field, direction), cursor_value in zip(self._orders, cursor_values):
+            value = _sort_key(data[field])
+            if value != cursor_value:
+                return value < cursor_value if direction == DESCENDING else value > cursor_value
+        if cursor_doc_id is None:
+            return False
+        # Ties are ordered by document id, in the direction of the first ordering
+        if self._orders and self._orders[0][1] == DESCENDING:
+            return doc_id < cursor_doc_id
+        return doc_id > cursor_doc_id
+
+class CollectionReference(Query):
+    def __init__(self, db: InMemoryFirestore, path: str):
+        super().__init__(db, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, doc_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._db, self._path, doc_id or _auto_id())
+
+    def add(self, data: Dict) -> Tuple[None, DocumentReference]:
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+class WriteBatch:
+    """Writes applied together under one lock acquisition, like a Firestore batch commit"""
+
+    def __init__(self, db: InMemoryFirestore):
+        self._db = db
+        self._writes: List[Tuple] = []
+
+    def _add(self, write: Tuple) -> None:
+        if len(self._writes) >= MAX_BATCH_SIZE:
+            raise ValueError(f"A batch can contain at most {MAX_BATCH_SIZE} writes")
+        self._writes.append(write)
+
+    def set(self, reference: DocumentReference, data: Dict, merge: bool = False) -> "WriteBatch":
+        self._add(("set", reference, data, merge))
+        return self
+
+    def update(self, reference: DocumentReference, data: Dict) -> "WriteBatch":
+        self._add(("update", reference, data, True))
+        return self
+
+    def delete(self, reference: DocumentReference) -> "WriteBatch":
+        self._add(("delete", reference, None, False))
+        return self
+
+    def commit(self) -> List:
+        with self._db._lock:
+            for kind, reference, _, _ in self._writes:
+                if kind == "update" and reference.id not in self._db._data(reference._collection_path).docs:
+                    raise NotFound(f"No document to update: {reference.path}")
+            for kind, reference, data, merge in self._writes:
+                self._db._write(reference._collection_path, reference.id, data, merge)
+        self._db._after_write()
+        results = [None] * len(self._writes)
+        self._writes = []
+        return results
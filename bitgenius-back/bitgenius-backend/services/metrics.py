@@ -0,0 +1,184 @@
+import time
+import asyncio
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in values
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        lines = self._header()
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class Registry:
+    """Metrics of this worker process, rendered in the Prometheus text format
+
+    Each worker keeps its own registry; scrape every worker (or run one)
+    to see the whole deployment.
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Run `collector` before each render, e.g. to refresh gauges read from elsewhere"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route template, method and status code", ("route", "method", "status")
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("route", "method")
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+))
+UPSTREAM_EVENTS = REGISTRY.register(Counter(
+    "upstream_events_total",
+    "Upstream calls, successes, failures, retries, hedges, hedge wins and short circuits by host",
+    ("upstream", "event")
+))
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    "upstream_attempt_duration_seconds", "Latency of individual upstream attempts by host and outcome",
+    ("upstream", "outcome")
+))
+UPSTREAM_BREAKER_OPEN = REGISTRY.register(Gauge(
+    "upstream_circuit_open", "1 while the upstream's circuit breaker is open or half-open", ("upstream",)
+))
+STORAGE_LATENCY = REGISTRY.register(Histogram(
+    "storage_operation_duration_seconds", "Storage backend call latency by operation", ("operation",)
+))
+STORAGE_ERRORS = REGISTRY.register(Counter(
+    "storage_errors_total", "Storage backend calls that raised, by operation", ("operation",)
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result")
+))
+HTTP_COMPRESSION_BYTES = REGISTRY.register(Counter(
+    "http_compression_bytes_total", "Response body bytes before and after compression by route and encoding",
+    ("route", "encoding", "size")
+))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "rate_limited_requests_total", "Requests rejected with 429 by route class", ("route_class",)
+))
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    "event_loop_lag_seconds", "How late the event loop woke a periodic timer",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+))
+
+def record_cache_lookup(key: str, hit: bool) -> None:
+    """Count a lookup against the cache named by the key's prefix (e.g. btc, maestro, gemini)"""
+    CACHE_REQUESTS.inc(key.split(":", 1)[0], "hit" if hit else "miss")
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Sleep `interval` repeatedly and record how much later than asked the loop resumed"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(time.perf_counter() - started - interval, 0.0))
+
+_lag_task: Optional[asyncio.Task] = None
+
+def start_event_loop_monitor() -> None:
+    global _lag_task
+    loop = asyncio.get_running_loop()
+    if _lag_task is None or _lag_task.get_loop() is not loop:
+        _lag_task = loop.create_task(monitor_event_loop_lag())
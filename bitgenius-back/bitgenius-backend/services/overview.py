@@ -0,0 +1,146 @@
+import os
+from typing import Dict, Mapping, Optional
+
+from models.records import AgentRecord
+from services.cache import CacheBackend, get_cache_backend
+from services.maestro import MaestroClient, get_maestro_client, raise_for_failed_lookups
+
+OVERVIEW_RESEED_SECONDS = float(os.environ.get("OVERVIEW_RESEED_SECONDS", "3600"))
+WALLET_BALANCE_TTL = float(os.environ.get("WALLET_BALANCE_TTL", "60"))
+
+STATUS_COUNTERS = {
+    "online": "active_agents",
+    "idle": "idle_agents",
+    "stopped": "stopped_agents"
+}
+
+def _empty_overview() -> Dict:
+    return {
+        "agent_count": 0,
+        "active_agents": 0,
+        "idle_agents": 0,
+        "stopped_agents": 0,
+        "total_allocation": 0
+    }
+
+def _apply(overview: Dict, agent: Dict, sign: int) -> None:
+    overview["agent_count"] += sign
+    overview["total_allocation"] += sign * int(agent.get("allocation") or 0)
+    counter = STATUS_COUNTERS.get((agent.get("status") or "").lower())
+    if counter:
+        overview[counter] += sign
+
+class OverviewStore:
+    """Materialized per-principal dashboard overview
+
+    One scan of the contract seeds status counters and summed allocation for
+    every owner. Status changes then adjust the counters in place, so an
+    overview read is a single cache lookup. Lives in the shared cache
+    backend, so all workers see the same numbers.
+    """
+
+    def __init__(self, cache: CacheBackend, maestro_client: MaestroClient):
+        self.cache = cache
+        self.maestro_client = maestro_client
+
+    @property
+    def seeded(self) -> bool:
+        return self.cache.get("overview:seeded") is not None
+
+    def ensure_seeded(self) -> None:
+        """Seed from the contract unless already done; blocks, so run it off the event loop"""
+        if self.seeded:
+            return
+        with self.cache.lock("overview", ttl=120, wait=120):
+            if self.cache.get("overview:seeded") is None:
+                self.rebuild()
+
+    def rebuild(self) -> None:
+        """Recompute every overview from the contract; caller holds the overview lock"""
+        overviews: Dict[str, Dict] = {}
+        agent_count = self.maestro_client.get_agent_count()
+        agent_ids = range(1, agent_count + 1)
+        agents = self.maestro_client.get_agents_by_ids(agent_ids)
+        # Undercounted overviews would be served until the next reseed: fail now, retry on the next read
+        raise_for_failed_lookups(agent_ids, agents)
+        for agent_id, agent in zip(agent_ids, agents):
+            if not agent or not agent.get("owner"):
+                continue
+            record = {
+                "owner": agent["owner"],
+                "status": (agent.get("status") or "").lower(),
+                "allocation": int(agent.get("allocation") or 0)
+            }
+            self.cache.set(f"overview:agent:{agent_id}", record)
+            _apply(overviews.setdefault(record["owner"], _empty_overview()), record, 1)
+
+        for principal, overview in overviews.items():
+            self.cache.set(f"overview:principal:{principal}", overview)
+        self.cache.set("overview:seeded", agent_count, OVERVIEW_RESEED_SECONDS)
+
+    def get_overview(self, principal: str) -> Dict:
+        """The principal's overview; call ensure_seeded first"""
+        return self.cache.get(f"overview:principal:{principal}") or _empty_overview()
+
+    def apply_status_change(self, agent_id: int, status: str) -> None:
+        """Move one agent between status counters of its owner's overview"""
+        self.apply_status_changes({agent_id: status})
+
+    def apply_status_changes(self, statuses: Dict[int, str]) -> None:
+        """Apply several status changes under one acquisition of the overview lock
+
+        Agents registered after the last seed are looked up in one batch
+        before the lock is taken, so the lock covers only cache updates and
+        can't outlive its ttl on a slow upstream.
+        """
+        if self.cache.get("overview:seeded") is None:
+            return  # The next read reseeds from the contract anyway
+
+        missing = [agent_id for agent_id in statuses if self.cache.get(f"overview:agent:{agent_id}") is None]
+        fetched = dict(zip(missing, self.maestro_client.get_agents_by_ids(missing))) if missing else {}
+        if any(agent is not None and not isinstance(agent, AgentRecord) for agent in fetched.values()):
+            # An agent we can't count leaves the overview wrong: drop the seed so the next read rebuilds
+            self.cache.delete("overview:seeded")
+            return
+
+        with self.cache.lock("overview"):
+            for agent_id, status in statuses.items():
+                self._move_agent(agent_id, status, fetched.get(agent_id))
+
+    def _move_agent(self, agent_id: int, status: str, agent: Optional[Mapping] = None) -> None:
+        key = f"overview:agent:{agent_id}"
+        record = self.cache.get(key)
+        if record is None:
+            # Registered after the last seed: counted from the prefetched agent
+            if not agent or not agent.get("owner"):
+                return
+            record = {"owner": agent["owner"], "status": None, "allocation": int(agent.get("allocation") or 0)}
+            overview = self.cache.get(f"overview:principal:{record['owner']}") or _empty_overview()
+            overview["agent_count"] += 1
+            overview["total_allocation"] += record["allocation"]
+        else:
+            overview = self.cache.get(f"overview:principal:{record['owner']}") or _empty_overview()
+            counter = STATUS_COUNTERS.get(record["status"] or "")
+            if counter:
+                overview[counter] -= 1
+
+        record["status"] = status.lower()
+        counter = STATUS_COUNTERS.get(record["status"])
+        if counter:
+            overview[counter] += 1
+
+        self.cache.set(key, record)
+        self.cache.set(f"overview:principal:{record['owner']}", overview)
+
+    def get_wallet_balance(self, btc_address: str, compute) -> float:
+        """Wallet balance in BTC, recomputed at most once per WALLET_BALANCE_TTL"""
+        return self.cache.get_or_compute(f"overview:wallet:{btc_address}", compute, WALLET_BALANCE_TTL)
+
+_overview_store: Optional[OverviewStore] = None
+
+def get_overview_store() -> OverviewStore:
+    """Dependency provider: build the shared OverviewStore on first use"""
+    global _overview_store
+    if _overview_store is None:
+        _overview_store = OverviewStore(get_cache_backend(), get_maestro_client())
+    return _overview_store
@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+# Requests slower than this are kept with their span breakdown; 0 disables the slow-request log
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))
+SLOW_REQUEST_BUFFER = int(os.environ.get("SLOW_REQUEST_BUFFER", "100"))
+# How often the watchdog samples the stack of an overdue request's thread
+SLOW_REQUEST_SAMPLE_MS = float(os.environ.get("SLOW_REQUEST_SAMPLE_MS", "5"))
+PROFILE_MAX_SECONDS = 60
+
+def collapse_stack(frame, thread_name: str = "") -> str:
+    """Render a frame and its callers root-first as `thread;module:function;...`"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+        names.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    if thread_name:
+        names.append(thread_name)
+    return ";".join(reversed(names))
+
+def render_collapsed(stacks: Dict[str, int]) -> str:
+    """Collapsed stack format (`stack count` per line), as read by flamegraph.pl and speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed interval for a bounded time
+
+    Runs in the calling thread, which it leaves out of the samples, so call
+    it off the event loop (asyncio.to_thread) to see what the loop is doing.
+    One profile runs at a time; overlapping requests get busy() == True.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, seconds: float, interval: float = 0.005) -> Optional[Dict]:
+        """Sample for `seconds`; None if another profile is already running"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            seconds = min(seconds, PROFILE_MAX_SECONDS)
+            me = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != me:
+                        stacks[collapse_stack(frame, names.get(thread_id, str(thread_id)))] += 1
+                samples += 1
+                time.sleep(interval)
+            return {"seconds": seconds, "interval": interval, "samples": samples, "stacks": stacks}
+        finally:
+            self._lock.release()
+
+class _WatchedRequest:
+    __slots__ = ("thread_id", "overdue_at", "stacks")
+
+    def __init__(self, thread_id: int, overdue_at: float):
+        self.thread_id = thread_id
+        self.overdue_at = overdue_at
+        self.stacks: Counter = Counter()
+
+class SlowRequestLog:
+    """Ring buffer of requests that went over SLOW_REQUEST_MS
+
+    While a request is overdue, a watchdog thread samples the stack of the
+    thread serving it: the event loop, for every route here. An entry then
+    shows not just its upstream/storage spans but what held the loop while
+    it waited, e.g. JSON encoding, Pydantic validation or a blocking call.
+    The loop is shared, so those stacks may belong to a concurrent request.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_REQUEST_MS, size: int = SLOW_REQUEST_BUFFER,
+                 sample_interval_ms: float = SLOW_REQUEST_SAMPLE_MS):
+        self.threshold = threshold_ms / 1000
+        self.sample_interval = sample_interval_ms / 1000
+        self.entries = deque(maxlen=size)
+        self._watched: Dict[int, _WatchedRequest] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def watch(self) -> int:
+        """Start watching the current request; returns a handle for `finish`"""
+        request = _WatchedRequest(threading.get_ident(), time.monotonic() + self.threshold)
+        handle = id(request)
+        with self._lock:
+            self._watched[handle] = request
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-request-watchdog", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return handle
+
+    def finish(self, handle: int, entry: Optional[Dict] = None) -> None:
+        """Stop watching; `entry` is stored with the sampled stacks if the request was slow"""
+        with self._lock:
+            request = self._watched.pop(handle, None)
+        if entry is not None and request is not None:
+            entry["stacks"] = render_collapsed(request.stacks)
+            self.entries.append(entry)
+
+    def recent(self, limit: int) -> List[Dict]:
+        return list(self.entries)[-limit:][::-1]
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                watched = list(self._watched.values())
+                if not watched:
+                    self._wake.clear()
+            if not watched:
+                self._wake.wait()
+                continue
+            now = time.monotonic()
+            overdue = [request for request in watched if request.overdue_at <= now]
+            if overdue:
+                frames = sys._current_frames()
+                for request in overdue:
+                    frame = frames.get(request.thread_id)
+                    if frame is not None:
+                        request.stacks[collapse_stack(frame)] += 1
+            time.sleep(self.sample_interval)
+
+profiler = SamplingProfiler()
+slow_requests = SlowRequestLog()
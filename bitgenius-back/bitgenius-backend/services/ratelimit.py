@@ -0,0 +1,248 @@
+import contextvars
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, QueryParams
+
+from services.cache import CacheBackend, get_cache_backend
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "false").lower() == "true"
+# local: exact buckets per worker; shared: one bucket per key across workers, through CACHE_URL
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "local")
+# route class=requests per second:burst
+RATE_LIMITS = os.environ.get("RATE_LIMITS", "ai=0.5:10,agents=5:30,default=10:50")
+# Bucket and usage entries kept per worker; the least recently seen keys go first
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "10000"))
+
+# Path prefix -> route class, first match wins; anything else is "default"
+ROUTE_CLASSES = (("/ai/", "ai"), ("/agents", "agents"))
+# Operator endpoints and docs are never limited
+EXEMPT_PREFIXES = ("/metrics", "/admin/", "/docs", "/redoc", "/openapi.json")
+# Stacks principal as a path segment, e.g. /dashboard/overview/ST1PQ...
+PRINCIPAL_IN_PATH = re.compile(r"/(S[PTMN][0-9A-Z]{37,39})(?=/|$)")
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """"ai=0.5:10,default=10:50" -> {"ai": (0.5, 10.0), "default": (10.0, 50.0)}"""
+    limits = {}
+    for item in spec.split(","):
+        name, _, value = item.strip().partition("=")
+        if not name:
+            continue
+        rate, _, burst = value.partition(":")
+        limits[name] = (float(rate), float(burst or rate))
+    return limits
+
+def route_class(path: str) -> Optional[str]:
+    """Limit class of a request path, or None if it is exempt"""
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    for prefix, name in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return name
+    return "default"
+
+def client_address(scope) -> str:
+    """Bucket key of a request: the client address, the only part a client can't pick freely"""
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+def client_key(scope) -> str:
+    """Who to report usage for: the address plus the API key or principal the client claims
+
+    Neither claim is authenticated yet, so they label usage but never pick
+    the bucket (see client_address): a client rotating them would otherwise
+    get a fresh bucket on every request. API keys are hashed so they never
+    show up in usage reports.
+    """
+    address = client_address(scope)
+    headers = Headers(scope=scope)
+    api_key = headers.get("x-api-key")
+    if api_key:
+        return f"{address}|key:" + hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+    principal = QueryParams(scope.get("query_string", b"")).get("principal")
+    if not principal:
+        match = PRINCIPAL_IN_PATH.search(scope["path"])
+        principal = match.group(1) if match else None
+    if principal:
+        return f"{address}|principal:{principal}"
+    return address
+
+class RateLimitStore:
+    """Token buckets keyed by route class and client"""
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1) -> Tuple[bool, float, float]:
+        """Spend `cost` tokens; return (allowed, tokens left, seconds until `cost` tokens are available)"""
+        raise NotImplementedError
+
+class LocalRateLimitStore(RateLimitStore):
+    """Exact token buckets for one process
+
+    A bucket is just (tokens, last update, time it is full again). Buckets are
+    kept in LRU order; an idle one is dropped once it would have refilled,
+    since a full bucket is what a new key starts with, and max_keys caps
+    memory when keys are spread wide.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1) -> Tuple[bool, float, float]:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            self._expire(now)
+        return allowed, tokens, 0.0 if allowed else (cost - tokens) / rate
+
+    def _expire(self, now: float) -> None:
+        # Oldest first, stopping at the first bucket still refilling: amortized O(1)
+        while self._buckets:
+            key, (_, _, full_at) = next(iter(self._buckets.items()))
+            if full_at > now and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+class SharedRateLimitStore(RateLimitStore):
+    """Buckets shared by every worker through the cache backend
+
+    The cache only has atomic increments, so a bucket is approximated by a
+    sliding window of burst/rate seconds that admits `burst` requests: the
+    current window's count plus the previous window's, weighted by how much
+    of it still overlaps. That allows the same long-run rate and burst. In
+    steady state a request costs one INCRBY. The previous count is read once
+    per window, and a key that was just rejected is refused locally until its
+    retry time, so a flood doesn't turn into cache traffic. If the cache is
+    unreachable, requests are let through.
+    """
+
+    def __init__(self, cache: CacheBackend, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.cache = cache
+        self.max_keys = max_keys
+        # key -> (window number, previous window's count, refused until)
+        self._windows: "OrderedDict[str, Tuple[int, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1) -> Tuple[bool, float, float]:
+        period = burst / rate
+        now = time.time()  # wall clock, so every worker agrees on window boundaries
+        window = int(now // period)
+        overlap = 1 - (now / period - window)
+        with self._lock:
+            state = self._windows.get(key)
+            if state is not None:
+                self._windows.move_to_end(key)
+        if state is not None and state[2] > now:
+            return False, 0.0, state[2] - now
+
+        current_key = f"ratelimit:{key}:{window}"
+        try:
+            if state is None or state[0] != window:
+                previous = self.cache.get(f"ratelimit:{key}:{window - 1}") or 0
+                self.cache.add(current_key, 0, ttl=2 * period)
+                state = (window, previous, 0.0)
+            count = self.cache.incr(current_key, int(cost))
+        except (OSError, ConnectionError) as e:
+            logging.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return True, burst, 0.0
+
+        used = state[1] * overlap + count
+        allowed = used <= burst
+        retry_after = 0.0
+        if not allowed:
+            # Rejected requests don't spend tokens
+            try:
+                self.cache.incr(current_key, -int(cost))
+            except (OSError, ConnectionError):
+                pass
+            used -= cost
+            retry_after = max((used + cost - burst) / rate, 0.001)
+            state = (state[0], state[1], now + retry_after)
+        with self._lock:
+            self._windows[key] = state
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        return allowed, max(burst - used, 0.0), retry_after
+
+_rate_limit_store: Optional[RateLimitStore] = None
+
+def get_rate_limit_store() -> RateLimitStore:
+    """Build the configured store on first use: RATE_LIMIT_STORE=local or shared"""
+    global _rate_limit_store
+    if _rate_limit_store is None:
+        if RATE_LIMIT_STORE == "shared":
+            _rate_limit_store = SharedRateLimitStore(get_cache_backend())
+        elif RATE_LIMIT_STORE == "local":
+            _rate_limit_store = LocalRateLimitStore()
+        else:
+            raise ValueError(f"Unsupported RATE_LIMIT_STORE: {RATE_LIMIT_STORE}")
+    return _rate_limit_store
+
+# Usage counters of the client whose request is being served
+_current_usage: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("usage", default=None)
+
+class UsageTracker:
+    """Per-client request, rejection and upstream attempt counts, for cost attribution
+
+    Counts are kept per worker and bounded like the buckets: past max_keys
+    the least recently seen client is dropped.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._clients: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, client: str, route_class: str, allowed: bool) -> Dict:
+        """Count a request and return the client's counters"""
+        with self._lock:
+            usage = self._clients.get(client)
+            if usage is None:
+                usage = self._clients[client] = {"requests": {}, "rejected": {}, "upstream": {}}
+                while len(self._clients) > self.max_keys:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(client)
+            counts = usage["requests"] if allowed else usage["rejected"]
+            counts[route_class] = counts.get(route_class, 0) + 1
+        return usage
+
+    def charge_upstream(self, upstream: str) -> None:
+        """Count one upstream attempt against the client being served, if any"""
+        usage = _current_usage.get()
+        if usage is not None:
+            with self._lock:
+                usage["upstream"][upstream] = usage["upstream"].get(upstream, 0) + 1
+
+    def top(self, limit: int) -> List[Dict]:
+        """Clients with the most upstream attempts, then the most requests"""
+        with self._lock:
+            clients = [
+                {"client": client, **{name: dict(counts) for name, counts in usage.items()}}
+                for client, usage in self._clients.items()
+            ]
+        clients.sort(key=lambda c: (sum(c["upstream"].values()), sum(c["requests"].values())), reverse=True)
+        return clients[:limit]
+
+def bind_usage(usage: Dict) -> contextvars.Token:
+    return _current_usage.set(usage)
+
+def unbind_usage(token: contextvars.Token) -> None:
+    _current_usage.reset(token)
+
+usage = UsageTracker()
@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import threading
+import logging
+from typing import Dict, List, Optional
+
+from services.cache import CacheBackend, get_cache_backend
+
+# Channel on which FirestoreClient announces stored logs and status changes
+EVENTS_CHANNEL = "agent-events"
+
+ROLLUP_SNAPSHOT_PATH = os.environ.get("ROLLUP_SNAPSHOT_PATH", "rollup_snapshot.json")
+ROLLUP_SNAPSHOT_SECONDS = float(os.environ.get("ROLLUP_SNAPSHOT_SECONDS", "60"))
+# Statuses are re-read from the contract this often, correcting changes no event reported
+ROLLUP_RESEED_SECONDS = float(os.environ.get("ROLLUP_RESEED_SECONDS", "3600"))
+# Longest wait between attempts to resubscribe after the event subscription fails
+ROLLUP_RESUBSCRIBE_MAX_SECONDS = 60.0
+
+WINDOW_SECONDS = 60
+
+def _as_int(value) -> int:
+    """Amounts and fees arrive as the client sent them; anything not numeric counts as 0"""
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+class MetricsRollup:
+    """Platform-wide counters maintained incrementally from agent events
+
+    Every worker subscribes to EVENTS_CHANNEL and applies all events, so
+    each one can answer summary requests from memory. State is snapshotted
+    to ROLLUP_SNAPSHOT_PATH periodically and on shutdown, and reloaded on
+    start.
+    """
+
+    def __init__(self, cache: CacheBackend, snapshot_path: Optional[str] = ROLLUP_SNAPSHOT_PATH):
+        self.cache = cache
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.agent_status: Dict[str, str] = {}
+        self.actions = 0
+        self.successes = 0
+        self.total_fees = 0
+        self.total_volume = 0
+        # Set once agent statuses have been read from the contract
+        self.seeded_at: Optional[int] = None
+        # Per-second action counts for the last minute, indexed by second % WINDOW_SECONDS
+        self._window = [0] * WINDOW_SECONDS
+        self._window_stamps = [0] * WINDOW_SECONDS
+
+        if snapshot_path and os.path.exists(snapshot_path):
+            self._load(snapshot_path)
+
+    def record_log(self, log_data: Dict) -> None:
+        now = int(time.time())
+        slot = now % WINDOW_SECONDS
+        with self._lock:
+            self.actions += 1
+            if log_data.get("status") == "success":
+                self.successes += 1
+            self.total_fees += _as_int(log_data.get("fee"))
+            self.total_volume += _as_int(log_data.get("amount"))
+            if self._window_stamps[slot] != now:
+                self._window_stamps[slot] = now
+                self._window[slot] = 0
+            self._window[slot] += 1
+
+    def record_status(self, agent_id, status: str) -> None:
+        with self._lock:
+            self.agent_status[str(agent_id)] = status.lower()
+
+    def apply_event(self, event: Dict) -> None:
+        if event.get("type") == "log":
+            self.record_log(event)
+        elif event.get("type") == "status":
+            self.record_status(event["agent_id"], event["status"])
+
+    def seed_agent_statuses(self, statuses: Dict[str, str], replace: bool = False) -> None:
+        """Fill statuses for agents that have not reported a change yet
+
+        A full reseed passes `replace` so the contract's statuses win over
+        what events reported; filling in new agents leaves known ones alone.
+        """
+        with self._lock:
+            for agent_id, status in statuses.items():
+                if replace:
+                    self.agent_status[str(agent_id)] = (status or "").lower()
+                else:
+                    self.agent_status.setdefault(str(agent_id), (status or "").lower())
+            if replace or self.seeded_at is None:
+                self.seeded_at = int(time.time())
+
+    def unknown_agents(self, agent_count: int) -> List[int]:
+        """Ids up to `agent_count` with no status yet, i.e. registered since the last seed"""
+        with self._lock:
+            return [agent_id for agent_id in range(1, agent_count + 1) if str(agent_id) not in self.agent_status]
+
+    def summary(self) -> Dict:
+        now = int(time.time())
+        with self._lock:
+            agents_by_status: Dict[str, int] = {}
+            for status in self.agent_status.values():
+                agents_by_status[status] = agents_by_status.get(status, 0) + 1
+            actions_per_minute = sum(
+                count for count, stamp in zip(self._window, self._window_stamps)
+                if now - stamp < WINDOW_SECONDS
+            )
+            return {
+                "agents_by_status": agents_by_status,
+                "actions_per_minute": actions_per_minute,
+                "total_actions": self.actions,
+                "success_rate": (self.successes / self.actions * 100.0) if self.actions else 0.0,
+                "total_fees": self.total_fees,
+                "total_volume": self.total_volume
+            }
+
+    @property
+    def seeded(self) -> bool:
+        return self.seeded_at is not None
+
+    @property
+    def needs_reseed(self) -> bool:
+        return self.seeded_at is None or time.time() - self.seeded_at >= ROLLUP_RESEED_SECONDS
+
+    def start(self) -> None:
+        """Subscribe to agent events and snapshot periodically, on a daemon thread"""
+        if self._thread is not None:
+            return
+        subscription = self.cache.subscribe(EVENTS_CHANNEL)
+        self._thread = threading.Thread(target=self._run, args=(subscription,), name="metrics-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.save()
+
+    def _run(self, subscription) -> None:
+        last_snapshot = time.monotonic()
+        delay = 1.0
+        while not self._stop.is_set():
+            if subscription is None:
+                try:
+                    subscription = self.cache.subscribe(EVENTS_CHANNEL)
+                except Exception as e:
+                    logging.error(f"Metrics rollup can't subscribe, retrying in {delay:.0f}s: {e}")
+                    self._stop.wait(delay)
+                    delay = min(delay * 2, ROLLUP_RESUBSCRIBE_MAX_SECONDS)
+                    continue
+            try:
+                event = subscription.get_message(timeout=1.0)
+                delay = 1.0
+            except Exception as e:
+                # Events missed until we resubscribe are corrected by the next reseed
+                logging.error(f"Metrics rollup subscription failed, resubscribing in {delay:.0f}s: {e}")
+                self._close(subscription)
+                subscription = None
+                self._stop.wait(delay)
+                delay = min(delay * 2, ROLLUP_RESUBSCRIBE_MAX_SECONDS)
+                continue
+            if event is not None:
+                # One bad event must not stop the rollup for the life of the process
+                try:
+                    self.apply_event(event)
+                except Exception as e:
+                    logging.error(f"Skipping metrics rollup event {event!r}: {e}")
+            if time.monotonic() - last_snapshot >= ROLLUP_SNAPSHOT_SECONDS:
+                self.save()
+                last_snapshot = time.monotonic()
+        if subscription is not None:
+            self._close(subscription)
+
+    @staticmethod
+    def _close(subscription) -> None:
+        try:
+            subscription.close()
+        except Exception as e:
+            logging.warning(f"Error closing metrics rollup subscription: {e}")
+
+    def save(self) -> None:
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            state = {
+                "agent_status": dict(self.agent_status),
+                "actions": self.actions,
+                "successes": self.successes,
+                "total_fees": self.total_fees,
+                "total_volume": self.total_volume,
+                "seeded_at": self.seeded_at,
+                "saved_at": int(time.time())
+            }
+        try:
+            tmp_path = f"{self.snapshot_path}.tmp.{os.getpid()}"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logging.error(f"Error saving metrics rollup snapshot: {e}")
+
+    def _load(self, path: str) -> None:
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            self.agent_status = state.get("agent_status", {})
+            self.actions = state.get("actions", 0)
+            self.successes = state.get("successes", 0)
+            self.total_fees = state.get("total_fees", 0)
+            self.total_volume = state.get("total_volume", 0)
+            self.seeded_at = state.get("seeded_at")
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable metrics rollup snapshot {path}: {e}")
+
+_metrics_rollup: Optional[MetricsRollup] = None
+
+def get_metrics_rollup() -> MetricsRollup:
+    """Dependency provider: build the shared MetricsRollup on first use"""
+    global _metrics_rollup
+    if _metrics_rollup is None:
+        _metrics_rollup = MetricsRollup(get_cache_backend())
+    return _metrics_rollup
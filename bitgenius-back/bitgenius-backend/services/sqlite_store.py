@@ -0,0 +1,177 @@
+import os
+import json
+import queue
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from services.storage import StorageBackend
+
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "4"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_logs (
+    id TEXT PRIMARY KEY,
+    agent_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_agent_logs_agent_ts ON agent_logs (agent_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_agent_logs_ts ON agent_logs (timestamp);
+
+CREATE TABLE IF NOT EXISTS agent_status (
+    agent_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    read INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_ts ON notifications (user, timestamp);
+"""
+
+# Statements are kept as constants so each pooled connection compiles them
+# once and reuses them from its statement cache
+INSERT_LOG = "INSERT INTO agent_logs (id, agent_id, timestamp, data) VALUES (?, ?, ?, ?)"
+SELECT_AGENT_LOGS = "SELECT id, data FROM agent_logs WHERE agent_id = ? ORDER BY timestamp DESC LIMIT ?"
+SELECT_AGENT_LOGS_RANGE = (
+    "SELECT id, data FROM agent_logs WHERE agent_id = ? AND timestamp >= ? AND timestamp <= ? "
+    "ORDER BY timestamp DESC"
+)
+SELECT_ALL_LOGS = "SELECT id, agent_id, data FROM agent_logs ORDER BY timestamp DESC LIMIT ?"
+UPSERT_STATUS = (
+    "INSERT INTO agent_status (agent_id, status, updated_at) VALUES (?, ?, ?) "
+    "ON CONFLICT (agent_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at"
+)
+SELECT_STATUS = "SELECT status, updated_at FROM agent_status WHERE agent_id = ?"
+INSERT_NOTIFICATION = "INSERT INTO notifications (id, user, timestamp, read, data) VALUES (?, ?, ?, ?, ?)"
+SELECT_NOTIFICATIONS = "SELECT id, read, data FROM notifications WHERE user = ? ORDER BY timestamp DESC LIMIT ?"
+MARK_NOTIFICATION_READ = "UPDATE notifications SET read = 1 WHERE user = ? AND id = ?"
+
+class ConnectionPool:
+    """Fixed set of SQLite connections in WAL mode, shared between threads"""
+
+    def __init__(self, path: str, size: int = SQLITE_POOL_SIZE):
+        self.path = path
+        self._pool = queue.Queue()
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+class SQLiteBackend(StorageBackend):
+    """Embedded local-first storage: every read is an indexed local query"""
+
+    def __init__(self, path: str):
+        self.pool = ConnectionPool(path)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _new_id() -> str:
+        return uuid.uuid4().hex[:20]
+
+    @staticmethod
+    def _rows_with_ids(rows) -> List[Dict]:
+        results = []
+        for row_id, data in rows:
+            item = json.loads(data)
+            item["id"] = row_id
+            results.append(item)
+        return results
+
+    def store_agent_log(self, agent_id: str, log_data: Dict) -> str:
+        log_id = self._new_id()
+        with self.pool.connection() as conn:
+            conn.execute(INSERT_LOG, (log_id, agent_id, log_data["timestamp"], json.dumps(log_data)))
+        return log_id
+
+    def get_agent_logs(self, agent_id: str, limit: int) -> List[Dict]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(SELECT_AGENT_LOGS, (agent_id, limit)).fetchall()
+        return self._rows_with_ids(rows)
+
+    def get_agent_logs_by_range(self, agent_id: str, start_time: int, end_time: int) -> List[Dict]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(SELECT_AGENT_LOGS_RANGE, (agent_id, start_time, end_time)).fetchall()
+        return self._rows_with_ids(rows)
+
+    def get_all_logs(self, limit: int) -> List[Dict]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(SELECT_ALL_LOGS, (limit,)).fetchall()
+        logs = []
+        for row_id, agent_id, data in rows:
+            log_data = json.loads(data)
+            log_data["id"] = row_id
+            log_data["agent_id"] = agent_id
+            logs.append(log_data)
+        return logs
+
+    def update_agent_status(self, agent_id: str, status: str, updated_at: int) -> None:
+        with self.pool.connection() as conn:
+            conn.execute(UPSERT_STATUS, (agent_id, status, updated_at))
+
+    def update_agent_statuses(self, statuses: Dict[str, str], updated_at: int) -> None:
+        with self.pool.transaction() as conn:
+            conn.executemany(UPSERT_STATUS, [(agent_id, status, updated_at) for agent_id, status in statuses.items()])
+
+    def get_agent_status(self, agent_id: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_STATUS, (agent_id,)).fetchone()
+        if row is None:
+            return None
+        return {"status": row[0], "updated_at": row[1]}
+
+    def store_notification(self, user: str, notification: Dict) -> str:
+        notification_id = self._new_id()
+        with self.pool.connection() as conn:
+            conn.execute(INSERT_NOTIFICATION, (
+                notification_id, user, notification["timestamp"],
+                int(bool(notification.get("read", False))), json.dumps(notification)
+            ))
+        return notification_id
+
+    def get_notifications(self, user: str, limit: int) -> List[Dict]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(SELECT_NOTIFICATIONS, (user, limit)).fetchall()
+        notifications = []
+        for row_id, read, data in rows:
+            notification = json.loads(data)
+            notification["id"] = row_id
+            notification["read"] = bool(read)
+            notifications.append(notification)
+        return notifications
+
+    def mark_notification_as_read(self, user: str, notification_id: str) -> None:
+        with self.pool.connection() as conn:
+            conn.execute(MARK_NOTIFICATION_READ, (user, notification_id))
@@ -0,0 +1,185 @@
+import os
+import time
+from typing import Dict, List, Optional
+
+from services.memory_firestore import DESCENDING
+from services.metrics import STORAGE_ERRORS, STORAGE_LATENCY
+from services.tracing import start_span
+
+class StorageBackend:
+    """Persistence for agent logs, agent status and notifications
+
+    FirestoreClient handles defaults, fan-out and error reporting and
+    delegates storage to one of these. Agent ids are passed as strings.
+    """
+
+    def store_agent_log(self, agent_id: str, log_data: Dict) -> str:
+        raise NotImplementedError
+
+    def get_agent_logs(self, agent_id: str, limit: int) -> List[Dict]:
+        raise NotImplementedError
+
+    def get_agent_logs_by_range(self, agent_id: str, start_time: int, end_time: int) -> List[Dict]:
+        raise NotImplementedError
+
+    def get_all_logs(self, limit: int) -> List[Dict]:
+        raise NotImplementedError
+
+    def update_agent_status(self, agent_id: str, status: str, updated_at: int) -> None:
+        raise NotImplementedError
+
+    def update_agent_statuses(self, statuses: Dict[str, str], updated_at: int) -> None:
+        """Write several agent statuses at once"""
+        for agent_id, status in statuses.items():
+            self.update_agent_status(agent_id, status, updated_at)
+
+    def get_agent_status(self, agent_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def store_notification(self, user: str, notification: Dict) -> str:
+        raise NotImplementedError
+
+    def get_notifications(self, user: str, limit: int) -> List[Dict]:
+        raise NotImplementedError
+
+    def mark_notification_as_read(self, user: str, notification_id: str) -> None:
+        raise NotImplementedError
+
+class FirestoreBackend(StorageBackend):
+    """Documents in Firestore, or in the in-memory engine that mirrors it"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _logs(self, agent_id: str):
+        return self.db.collection("agent-logs").document(agent_id).collection("logs")
+
+    @staticmethod
+    def _with_ids(query) -> List[Dict]:
+        results = []
+        for doc in query.stream():
+            data = doc.to_dict()
+            data["id"] = doc.id
+            results.append(data)
+        return results
+
+    def store_agent_log(self, agent_id: str, log_data: Dict) -> str:
+        # Write the parent document too: Firestore doesn't list documents that only hold subcollections
+        agent_ref = self.db.collection("agent-logs").document(agent_id)
+        doc_ref = agent_ref.collection("logs").document()
+        batch = self.db.batch()
+        batch.set(agent_ref, {"last_log_at": log_data["timestamp"]}, merge=True)
+        batch.set(doc_ref, log_data)
+        batch.commit()
+        return doc_ref.id
+
+    def get_agent_logs(self, agent_id: str, limit: int) -> List[Dict]:
+        return self._with_ids(self._logs(agent_id).order_by("timestamp", direction=DESCENDING).limit(limit))
+
+    def get_agent_logs_by_range(self, agent_id: str, start_time: int, end_time: int) -> List[Dict]:
+        return self._with_ids(
+            self._logs(agent_id)
+            .where("timestamp", ">=", start_time)
+            .where("timestamp", "<=", end_time)
+            .order_by("timestamp", direction=DESCENDING)
+        )
+
+    def get_all_logs(self, limit: int) -> List[Dict]:
+        # Query the most recently active agents
+        agents_ref = self.db.collection("agent-logs").order_by("last_log_at", direction=DESCENDING).limit(20)
+
+        all_logs = []
+        for agent_doc in agents_ref.stream():
+            # Divide limit across agents
+            for log_data in self.get_agent_logs(agent_doc.id, limit // 10):
+                log_data["agent_id"] = agent_doc.id
+                all_logs.append(log_data)
+
+        all_logs.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
+        return all_logs[:limit]
+
+    def update_agent_status(self, agent_id: str, status: str, updated_at: int) -> None:
+        self.db.collection("agents").document(agent_id).set(
+            {"status": status, "updated_at": updated_at},
+            merge=True
+        )
+
+    def update_agent_statuses(self, statuses: Dict[str, str], updated_at: int) -> None:
+        items = list(statuses.items())
+        # Firestore caps a batch at 500 writes
+        for start in range(0, len(items), 500):
+            batch = self.db.batch()
+            for agent_id, status in items[start:start + 500]:
+                batch.set(
+                    self.db.collection("agents").document(agent_id),
+                    {"status": status, "updated_at": updated_at},
+                    merge=True
+                )
+            batch.commit()
+
+    def get_agent_status(self, agent_id: str) -> Optional[Dict]:
+        doc = self.db.collection("agents").document(agent_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def store_notification(self, user: str, notification: Dict) -> str:
+        doc_ref = self.db.collection("notifications").document(user).collection("items").document()
+        doc_ref.set(notification)
+        return doc_ref.id
+
+    def get_notifications(self, user: str, limit: int) -> List[Dict]:
+        return self._with_ids(
+            self.db.collection("notifications")
+            .document(user)
+            .collection("items")
+            .order_by("timestamp", direction=DESCENDING)
+            .limit(limit)
+        )
+
+    def mark_notification_as_read(self, user: str, notification_id: str) -> None:
+        self.db.collection("notifications").document(user).collection("items").document(notification_id).update(
+            {"read": True}
+        )
+
+# Operations whose first argument is an agent id; their spans carry it as `agent_id`
+AGENT_OPERATIONS = frozenset({
+    "store_agent_log", "get_agent_logs", "get_agent_logs_by_range", "update_agent_status", "get_agent_status"
+})
+
+class InstrumentedBackend:
+    """Times and traces every call on a wrapped StorageBackend and counts the ones that raise"""
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+
+    def __getattr__(self, operation: str):
+        method = getattr(self.backend, operation)
+        if not callable(method):
+            return method
+
+        def timed(*args, **kwargs):
+            attributes = {"backend": type(self.backend).__name__}
+            if operation in AGENT_OPERATIONS and args and str(args[0]).isdigit():
+                attributes["agent_id"] = int(args[0])
+            start = time.perf_counter()
+            try:
+                with start_span(f"storage {operation}", **attributes):
+                    return method(*args, **kwargs)
+            except Exception:
+                STORAGE_ERRORS.inc(operation)
+                raise
+            finally:
+                STORAGE_LATENCY.observe(time.perf_counter() - start, operation)
+        return timed
+
+def create_storage_backend() -> StorageBackend:
+    """Build the backend named by STORAGE_BACKEND: firestore (default) or sqlite"""
+    kind = os.environ.get("STORAGE_BACKEND", "firestore").lower()
+    if kind == "sqlite":
+        from services.sqlite_store import SQLiteBackend
+        return SQLiteBackend(os.environ.get("SQLITE_PATH", "bitgenius.db"))
+    if kind == "firestore":
+        from services.firebase import initialize_firebase
+        import services.firebase as firebase
+        initialize_firebase()
+        return FirestoreBackend(firebase.db)
+    raise ValueError(f"Unsupported STORAGE_BACKEND: {kind}")
@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import time
+import queue
+import re
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# none, stdout or file
+TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+# Fraction of requests whose traces are recorded, decided once at the root span
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0.1"))
+
+class Span:
+    """One timed operation in a trace, OpenTelemetry-style"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "status", "start_ns", "end_ns",
+                 "sampled", "recorded")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, attributes: Dict[str, Any],
+                 sampled: bool = True, recorded: Optional[List["Span"]] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        # Sampled spans go to the exporter; `recorded` collects every finished span of the trace
+        self.sampled = sampled
+        self.recorded = recorded
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def update_name(self, name: str) -> None:
+        self.name = name
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": self.status
+        }
+
+class _NoopSpan:
+    """Stands in for spans of unsampled traces so callers never need to check"""
+
+    trace_id = None
+    span_id = None
+    sampled = False
+    recorded = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+    def set_status(self, status: str) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class SpanExporter:
+    """Writes finished spans as JSON lines from a background thread"""
+
+    def __init__(self, stream_factory: Callable[[], Any]):
+        self._queue: "queue.SimpleQueue[Optional[Dict]]" = queue.SimpleQueue()
+        self._stream_factory = stream_factory
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        self._queue.put(span.to_dict())
+
+    def _run(self) -> None:
+        stream = self._stream_factory()
+        while True:
+            record = self._queue.get()
+            try:
+                stream.write(json.dumps(record, default=str) + "\n")
+                if self._queue.empty():
+                    stream.flush()
+            except Exception as e:
+                logging.error(f"Error exporting span: {e}")
+
+def _create_exporter() -> Optional[SpanExporter]:
+    if TRACE_EXPORTER == "stdout":
+        return SpanExporter(lambda: sys.stdout)
+    if TRACE_EXPORTER == "file":
+        return SpanExporter(lambda: open(TRACE_FILE, "a", buffering=1 << 16))
+    if TRACE_EXPORTER != "none":
+        logging.warning(f"Unknown TRACE_EXPORTER {TRACE_EXPORTER}, tracing disabled")
+    return None
+
+_exporter = _create_exporter()
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+# version-trace id-parent span id-flags, lowercase hex; later versions may append fields
+_TRACEPARENT = re.compile(r"([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?")
+
+def _parse_traceparent(header: Optional[str]):
+    """W3C traceparent: 00-<trace id>-<parent span id>-<flags>
+
+    Returns None for a missing or invalid header, and the request starts a
+    new trace, as the spec requires.
+    """
+    if not header:
+        return None
+    match = _TRACEPARENT.fullmatch(header.strip())
+    if not match:
+        return None
+    version, trace_id, parent_id, flags, rest = match.groups()
+    if version == "ff" or (version == "00" and rest is not None):
+        return None
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, int(flags, 16) & 1 == 1
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, record: bool = False, **attributes):
+    """Open the root span of a request, continuing the caller's trace if it sent one
+
+    The sampling decision is made here: an incoming sampled flag is honoured,
+    otherwise TRACE_SAMPLE_RATE applies. With `record`, spans of the trace are
+    also kept on the root's `recorded` list whether or not they are exported.
+    Unsampled, unrecorded traces cost a contextvar lookup per child span.
+    """
+    parent = _parse_traceparent(traceparent)
+    if parent:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+        sampled = random.random() < TRACE_SAMPLE_RATE
+    sampled = sampled and _exporter is not None
+
+    if not sampled and not record:
+        yield NOOP_SPAN
+        return
+
+    root = Span(trace_id, parent_id, name, attributes, sampled, [] if record else None)
+    with _span(root):
+        yield root
+
+@contextmanager
+def start_span(name: str, **attributes):
+    """Open a child of the current span; a no-op outside a sampled or recorded trace"""
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+
+    with _span(Span(parent.trace_id, parent.span_id, name, attributes, parent.sampled, parent.recorded)) as span:
+        yield span
+
+@contextmanager
+def _span(span: Span):
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.attributes.setdefault("error", f"{type(e).__name__}: {str(e)[:200]}")
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_ns = time.time_ns()
+        if span.sampled:
+            _exporter.export(span)
+        if span.recorded is not None:
+            span.recorded.append(span)
+
+def in_current_context(fn: Callable) -> Callable:
+    """Wrap `fn` so thread-pool workers run it inside the caller's trace"""
+    context = contextvars.copy_context()
+    # Each call gets its own copy: one Context can't be entered by two threads at once
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
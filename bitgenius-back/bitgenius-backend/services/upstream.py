@@ -0,0 +1,332 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+import requests
+
+from services.metrics import REGISTRY, UPSTREAM_BREAKER_OPEN, UPSTREAM_EVENTS, UPSTREAM_LATENCY
+from services.ratelimit import usage
+from services.tracing import start_span
+
+UPSTREAM_TIMEOUT = float(os.environ.get("UPSTREAM_TIMEOUT", "10"))
+UPSTREAM_DEADLINE = float(os.environ.get("UPSTREAM_DEADLINE", "20"))
+UPSTREAM_RETRIES = int(os.environ.get("UPSTREAM_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE = float(os.environ.get("UPSTREAM_BACKOFF_BASE", "0.1"))
+UPSTREAM_BACKOFF_MAX = float(os.environ.get("UPSTREAM_BACKOFF_MAX", "2"))
+# Send a second copy of an idempotent read if the first is slower than this; 0 disables hedging
+UPSTREAM_HEDGE_AFTER = float(os.environ.get("UPSTREAM_HEDGE_AFTER", "0"))
+UPSTREAM_BREAKER_FAILURES = int(os.environ.get("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_RESET_SECONDS = float(os.environ.get("UPSTREAM_BREAKER_RESET_SECONDS", "30"))
+
+class UpstreamError(Exception):
+    """An upstream call failed after retries, or was refused by its breaker"""
+
+class UpstreamHTTPError(UpstreamError):
+    def __init__(self, name: str, status: int, text: str):
+        super().__init__(f"{name} returned {status} - {text[:200]}")
+        self.status = status
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+def _is_retryable(error: Exception) -> bool:
+    """Transport failures, timeouts, 429 and 5xx are worth another try; other errors are final"""
+    if isinstance(error, UpstreamHTTPError):
+        return error.status == 429 or error.status >= 500
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError,
+                          requests.ConnectionError, requests.Timeout, httpx.TransportError)):
+        return True
+    # Google API errors carry the HTTP status as `code`
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and (code == 429 or code >= 500)
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one probe through per reset interval"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = UPSTREAM_BREAKER_FAILURES,
+                 reset_seconds: float = UPSTREAM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                # Half-open: this caller is the probe, everyone else still fails fast
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+class Upstream:
+    """Deadlines, jittered retries, hedging and a circuit breaker for one upstream host
+
+    `call` and `call_async` take a function of the per-attempt timeout.
+    Retries and hedging apply only to idempotent calls. Each call is one
+    trace span carrying `attributes`, however many attempts it took.
+    """
+
+    _hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="upstream-hedge")
+
+    def __init__(self, name: str, timeout: float = UPSTREAM_TIMEOUT, deadline: float = UPSTREAM_DEADLINE,
+                 retries: int = UPSTREAM_RETRIES, hedge_after: float = UPSTREAM_HEDGE_AFTER):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker()
+        self.stats = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "short_circuits": 0
+        }
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.stats[stat] += 1
+        UPSTREAM_EVENTS.inc(self.name, stat)
+
+    def _timed(self, fn: Callable[[float], Any]) -> Callable[[float], Any]:
+        def attempt(timeout: float) -> Any:
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = fn(timeout)
+                outcome = "success"
+                return result
+            finally:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - start, self.name, outcome)
+        return attempt
+
+    def _timed_async(self, fn: Callable[[float], Awaitable[Any]]) -> Callable[[float], Awaitable[Any]]:
+        async def attempt(timeout: float) -> Any:
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await fn(timeout)
+                outcome = "success"
+                return result
+            finally:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - start, self.name, outcome)
+        return attempt
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying clients from synchronizing
+        return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** attempt))
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            self._count("short_circuits")
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        usage.charge_upstream(self.name)
+
+    def _on_failure(self, error: Exception, attempt: int, attempts: int, deadline_at: float) -> Optional[float]:
+        """Record a failed attempt; return the delay before retrying, or None to give up"""
+        if not _is_retryable(error):
+            # The upstream answered; a bad request says nothing about its health
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if attempt + 1 >= attempts:
+            return None
+        delay = self._backoff(attempt)
+        if time.monotonic() + delay >= deadline_at:
+            return None
+        self._count("retries")
+        return delay
+
+    def _span(self, attributes: Optional[Dict]):
+        return start_span(f"upstream {self.name}", upstream=self.name, **(attributes or {}))
+
+    def call(self, fn: Callable[[float], Any], idempotent: bool = True, attributes: Optional[Dict] = None) -> Any:
+        with self._span(attributes) as span:
+            return self._call(fn, idempotent, span)
+
+    def _call(self, fn: Callable[[float], Any], idempotent: bool, span) -> Any:
+        fn = self._timed(fn)
+        self._count("calls")
+        deadline_at = time.monotonic() + self.deadline
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            span.set_attribute("attempts", attempt + 1)
+            self._admit()
+            timeout = min(self.timeout, deadline_at - time.monotonic())
+            try:
+                if idempotent and self.hedge_after > 0:
+                    result = self._hedged(fn, timeout)
+                else:
+                    result = fn(timeout)
+            except Exception as e:
+                delay = self._on_failure(e, attempt, attempts, deadline_at)
+                if delay is None:
+                    self._count("failures")
+                    raise
+                logging.warning(f"Retrying {self.name} in {delay:.2f}s after: {e}")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self._count("successes")
+            return result
+
+    def _hedged(self, fn: Callable[[float], Any], timeout: float) -> Any:
+        primary = self._hedge_pool.submit(fn, timeout)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        usage.charge_upstream(self.name)
+        hedge = self._hedge_pool.submit(fn, max(timeout - self.hedge_after, 0.001))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def call_async(self, fn: Callable[[float], Awaitable[Any]], idempotent: bool = True,
+                         attributes: Optional[Dict] = None) -> Any:
+        with self._span(attributes) as span:
+            return await self._call_async(fn, idempotent, span)
+
+    async def _call_async(self, fn: Callable[[float], Awaitable[Any]], idempotent: bool, span) -> Any:
+        fn = self._timed_async(fn)
+        self._count("calls")
+        deadline_at = time.monotonic() + self.deadline
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            span.set_attribute("attempts", attempt + 1)
+            self._admit()
+            timeout = min(self.timeout, deadline_at - time.monotonic())
+            try:
+                if idempotent and self.hedge_after > 0:
+                    result = await self._hedged_async(fn, timeout)
+                else:
+                    result = await asyncio.wait_for(fn(timeout), timeout)
+            except Exception as e:
+                delay = self._on_failure(e, attempt, attempts, deadline_at)
+                if delay is None:
+                    self._count("failures")
+                    raise
+                logging.warning(f"Retrying {self.name} in {delay:.2f}s after: {e}")
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self._count("successes")
+            return result
+
+    async def _hedged_async(self, fn: Callable[[float], Awaitable[Any]], timeout: float) -> Any:
+        primary = asyncio.ensure_future(asyncio.wait_for(fn(timeout), timeout))
+        done, _ = await asyncio.wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        usage.charge_upstream(self.name)
+        remaining = max(timeout - self.hedge_after, 0.001)
+        hedge = asyncio.ensure_future(asyncio.wait_for(fn(remaining), remaining))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def request(self, session: requests.Session, method: str, url: str, idempotent: Optional[bool] = None,
+                attributes: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """Make an HTTP request through this upstream; 429 and 5xx raise UpstreamHTTPError"""
+        def attempt(timeout: float) -> requests.Response:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise UpstreamHTTPError(self.name, response.status_code, response.text)
+            return response
+
+        if idempotent is None:
+            idempotent = method in ("GET", "HEAD")
+        attributes = {"http.method": method, "http.url": url.split("?", 1)[0], **(attributes or {})}
+        with self._span(attributes) as span:
+            try:
+                response = self._call(attempt, idempotent, span)
+            except UpstreamHTTPError as e:
+                span.set_attribute("http.status_code", e.status)
+                raise
+            span.set_attribute("http.status_code", response.status_code)
+            return response
+
+    def snapshot(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {"state": self.breaker.state, "consecutive_failures": self.breaker.failures, **stats}
+
+_upstreams: Dict[str, Upstream] = {}
+_upstreams_lock = threading.Lock()
+
+def get_upstream(name: str, **options) -> Upstream:
+    """Shared Upstream for a host; options apply when it is first created"""
+    with _upstreams_lock:
+        upstream = _upstreams.get(name)
+        if upstream is None:
+            upstream = _upstreams[name] = Upstream(name, **options)
+        return upstream
+
+def upstream_for(url: str, **options) -> Upstream:
+    return get_upstream(urlparse(url).hostname or url, **options)
+
+def _collect_breaker_states() -> None:
+    with _upstreams_lock:
+        upstreams = list(_upstreams.values())
+    for upstream in upstreams:
+        UPSTREAM_BREAKER_OPEN.set(0 if upstream.breaker.state == CircuitBreaker.CLOSED else 1, upstream.name)
+
+REGISTRY.add_collector(_collect_breaker_states)
+
+def upstream_stats() -> Dict[str, Dict]:
+    """Breaker state and retry/hedge counters for every upstream used so far"""
+    with _upstreams_lock:
+        upstreams = list(_upstreams.values())
+    return {upstream.name: upstream.snapshot() for upstream in upstreams}
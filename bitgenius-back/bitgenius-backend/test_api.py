@@ -122,6 +122,10 @@ def test_dashboard():
     
     print_test("Get Market Data")
     make_request("GET", "/dashboard/market")
+    
+    print_test("Get Batch Wallet Balances")
+    wallets = {"addresses": ["bc1qxy2kgdygjrsqtzq2n0yrf2493p83kkfjhx0wlh", "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"]}
+    make_request("POST", "/dashboard/wallets", data=wallets)
 
 def test_agents():
     """Test agents endpoints"""
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+BitGenius Chain Indexer Replay Test
+-----------------------------------
+Replays recorded blocks through ChainIndexer and checks the indexed tables.
+fixtures/chain_reorg/main and fixtures/chain_reorg/fork share blocks 1-2;
+main then has blocks 3-4 and the fork replaces them with its own 3-5, so
+following main and then the fork exercises reorg rollback and agent rebuild.
+Usage: python -m pytest test_chain_indexer.py
+"""
+
+import os
+import tempfile
+
+from services.chain_indexer import ChainIndexer, FixtureChainSource
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "chain_reorg")
+CONTRACT_ADDRESS = "ST1PQHQKV0RJXZFY1DGX8MNSNYVE3VGZJSRTPGZGM"
+
+def make_indexer(directory, chain):
+    return ChainIndexer(FixtureChainSource(os.path.join(FIXTURES, chain)),
+                        path=os.path.join(directory, "chain_index.db"), contract_address=CONTRACT_ADDRESS)
+
+def tables(indexer):
+    with indexer.pool.connection() as conn:
+        return {
+            table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+            for table in ("chain_blocks", "chain_calls", "chain_agents", "chain_logs")
+        }
+
+def test_replay_main_chain():
+    with tempfile.TemporaryDirectory() as directory:
+        indexer = make_indexer(directory, "main")
+        assert indexer.sync() == 4
+        assert indexer.checkpoint()["height"] == 4
+
+        alpha = indexer.get_agent(1)
+        assert alpha["status"] == "idle"
+        assert alpha["allocation"] == 5000
+        assert alpha["last_active"] == 4
+        # The aborted status update in block 4 is not applied
+        assert indexer.get_agent(2)["status"] == "online"
+        assert [log["details"] for log in indexer.get_logs(1)] == ["main-chain rebalance", "first buy"]
+        assert [log["details"] for log in indexer.get_logs(2)] == ["main-chain sell"]
+
+def test_reorg_rolls_back_to_fork():
+    with tempfile.TemporaryDirectory() as directory:
+        indexer = make_indexer(directory, "main")
+        indexer.sync()
+
+        indexer.source = FixtureChainSource(os.path.join(FIXTURES, "fork"))
+        assert indexer.sync() == 3
+        assert indexer.checkpoint()["height"] == 5
+
+        alpha = indexer.get_agent(1)
+        assert alpha["status"] == "online"
+        assert alpha["allocation"] == 1000
+        assert alpha["strategy"] == "dca-weekly"
+        assert alpha["last_active"] == 4
+        beta = indexer.get_agent(2)
+        assert beta["status"] == "stopped"
+        assert beta["last_active"] == 2
+
+        logs = indexer.get_logs(1)
+        assert [(log["timestamp"], log["details"]) for log in logs] == [(4, "fork buy"), (2, "first buy")]
+        assert logs[0]["amount"] == 300
+        assert indexer.get_logs(2) == []
+
+        # Rolling back and replaying the fork leaves exactly what indexing the fork alone does
+        with tempfile.TemporaryDirectory() as fresh_directory:
+            fresh = make_indexer(fresh_directory, "fork")
+            fresh.sync()
+            assert tables(indexer) == tables(fresh)
@@ -0,0 +1,214 @@
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+def decode_repr(text: str) -> Any:
+    """Decode the `repr` the Stacks API gives for a Clarity value
+
+    uint/int become ints, strings stay strings, buffers stay 0x-prefixed hex,
+    principals lose their leading quote, none/some become None/the value and
+    (ok ...)/(err ...) become {"ok": ...}/{"err": ...}.
+    """
+    return _decode(text.strip(), 0)[0]
+
+def _skip_spaces(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos].isspace():
+        pos += 1
+    return pos
+
+def _decode(text: str, pos: int) -> Tuple[Any, int]:
+    pos = _skip_spaces(text, pos)
+    char = text[pos]
+
+    if char == '"' or text.startswith('u"', pos):
+        # string-ascii "...", string-utf8 u"..."
+        pos += 1 if char == '"' else 2
+        chars = []
+        while text[pos] != '"':
+            if text[pos] == "\\":
+                pos += 1
+            chars.append(text[pos])
+            pos += 1
+        return "".join(chars), pos + 1
+
+    if char == "(":
+        pos = _skip_spaces(text, pos + 1)
+        end = pos
+        while end < len(text) and not text[end].isspace() and text[end] != ")":
+            end += 1
+        head = text[pos:end]
+        if head in ("some", "ok", "err"):
+            inner, pos = _decode(text, end)
+            pos = _skip_spaces(text, pos) + 1  # closing paren
+            return (inner if head == "some" else {head: inner}), pos
+        if head == "list":
+            items, pos = _decode_sequence(text, end)
+            return items, pos
+        if head == "tuple":
+            fields, pos = _decode_sequence(text, end)
+            return dict(fields), pos
+        # A tuple field: (name value)
+        inner, pos = _decode(text, end)
+        pos = _skip_spaces(text, pos) + 1
+        return (head, inner), pos
+
+    end = pos
+    while end < len(text) and not text[end].isspace() and text[end] != ")":
+        end += 1
+    token = text[pos:end]
+    if token == "none":
+        return None, end
+    if token in ("true", "false"):
+        return token == "true", end
+    if token.startswith("'"):
+        return token[1:], end
+    if token.startswith("0x"):
+        return token, end
+    if token.startswith("u") and token[1:].isdigit():
+        return int(token[1:]), end
+    if token.lstrip("-").isdigit():
+        return int(token), end
+    raise ValueError(f"Cannot decode Clarity value: {text[pos:]}")
+
+def _decode_sequence(text: str, pos: int) -> Tuple[list, int]:
+    items = []
+    pos = _skip_spaces(text, pos)
+    while text[pos] != ")":
+        item, pos = _decode(text, pos)
+        items.append(item)
+        pos = _skip_spaces(text, pos)
+    return items, pos + 1
+
+class ClarityArgError(ValueError):
+    """An argument doesn't fit the Clarity type of the contract function it is for"""
+
+# Public functions of bitgenius-agent: (argument name, Clarity type) in call order.
+# Types are ("uint",), ("bool",), ("string-ascii", max_len), ("buff", max_len) or ("optional", inner).
+CONTRACT_FUNCTIONS = {
+    "register-agent": [
+        ("name", ("string-ascii", 50)),
+        ("agent-type", ("string-ascii", 20)),
+        ("strategy", ("string-ascii", 100)),
+        ("trigger-condition", ("string-ascii", 100)),
+        ("privacy-enabled", ("bool",)),
+        ("allocation", ("uint",))
+    ],
+    "log-agent-action": [
+        ("agent-id", ("uint",)),
+        ("action", ("string-ascii", 50)),
+        ("status", ("string-ascii", 20)),
+        ("transaction-id", ("optional", ("buff", 32))),
+        ("amount", ("optional", ("uint",))),
+        ("fee", ("optional", ("uint",))),
+        ("details", ("string-ascii", 200))
+    ],
+    "update-agent-status": [("agent-id", ("uint",)), ("new-status", ("string-ascii", 20))],
+    "update-agent-strategy": [("agent-id", ("uint",)), ("new-strategy", ("string-ascii", 100))],
+    "update-agent-trigger": [("agent-id", ("uint",)), ("new-trigger", ("string-ascii", 100))],
+    "update-agent-privacy": [("agent-id", ("uint",)), ("privacy-enabled", ("bool",))],
+    "update-agent-allocation": [("agent-id", ("uint",)), ("new-allocation", ("uint",))],
+    "save-user-settings": [
+        ("default-agent-type", ("string-ascii", 20)),
+        ("privacy-default", ("bool",)),
+        ("notification-level", ("string-ascii", 20)),
+        ("execution-mode", ("string-ascii", 20)),
+        ("runtime-cap", ("uint",))
+    ]
+}
+
+UINT_MAX = 2 ** 128 - 1
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+_C32_ALPHABET = frozenset("0123456789ABCDEFGHJKMNPQRSTVWXYZ")
+
+def _encode_uint(name: str, value: Any) -> Dict:
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ClarityArgError(f"{name} must be an unsigned integer")
+    if isinstance(value, str):
+        if not value.isdigit():
+            raise ClarityArgError(f"{name} must be an unsigned integer")
+        value = int(value)
+    if not 0 <= value <= UINT_MAX:
+        raise ClarityArgError(f"{name} must be between 0 and 2^128 - 1")
+    return {"type": "uint", "value": str(value)}
+
+def _encode_bool(name: str, value: Any) -> Dict:
+    if isinstance(value, str) and value.lower() in ("true", "false"):
+        value = value.lower() == "true"
+    if not isinstance(value, bool):
+        raise ClarityArgError(f"{name} must be a boolean")
+    return {"type": "bool", "value": str(value).lower()}
+
+def _string_ascii_encoder(max_len: int) -> Callable[[str, Any], Dict]:
+    def encode(name: str, value: Any) -> Dict:
+        if not isinstance(value, str):
+            raise ClarityArgError(f"{name} must be a string")
+        if len(value) > max_len:
+            raise ClarityArgError(f"{name} must be at most {max_len} characters")
+        if not value.isascii():
+            raise ClarityArgError(f"{name} must contain only ASCII characters")
+        return {"type": "string-ascii", "value": value}
+    return encode
+
+def _buff_encoder(max_len: int) -> Callable[[str, Any], Dict]:
+    def encode(name: str, value: Any) -> Dict:
+        if isinstance(value, (bytes, bytearray)):
+            value = value.hex()
+        if not isinstance(value, str):
+            raise ClarityArgError(f"{name} must be a hex string")
+        digits = value[2:] if value.startswith("0x") else value
+        if len(digits) % 2 or not _HEX_DIGITS.issuperset(digits):
+            raise ClarityArgError(f"{name} must be a hex string")
+        if len(digits) // 2 > max_len:
+            raise ClarityArgError(f"{name} must be at most {max_len} bytes")
+        return {"type": "buff", "value": digits}
+    return encode
+
+def _optional_encoder(inner: Callable[[str, Any], Dict]) -> Callable[[str, Any], Dict]:
+    def encode(name: str, value: Any) -> Dict:
+        if value is None:
+            return {"type": "optional", "value": None}
+        return {"type": "optional", "value": inner(name, value)}
+    return encode
+
+def _encoder(clarity_type: Tuple) -> Callable[[str, Any], Dict]:
+    kind = clarity_type[0]
+    if kind == "uint":
+        return _encode_uint
+    if kind == "bool":
+        return _encode_bool
+    if kind == "string-ascii":
+        return _string_ascii_encoder(clarity_type[1])
+    if kind == "buff":
+        return _buff_encoder(clarity_type[1])
+    if kind == "optional":
+        return _optional_encoder(_encoder(clarity_type[1]))
+    raise ValueError(f"Unsupported Clarity type: {kind}")
+
+# Encoders are composed once per function and reused for every call
+_FUNCTION_ENCODERS = {
+    function_name: [(arg_name, _encoder(clarity_type)) for arg_name, clarity_type in signature]
+    for function_name, signature in CONTRACT_FUNCTIONS.items()
+}
+
+def encode_function_args(function_name: str, values: Sequence[Any]) -> List[Dict]:
+    """Validate positional arguments for a contract function and encode them as Clarity args
+
+    Raises ClarityArgError naming the first argument that doesn't fit.
+    """
+    encoders = _FUNCTION_ENCODERS[function_name]
+    if len(values) != len(encoders):
+        raise ClarityArgError(f"{function_name} takes {len(encoders)} arguments, got {len(values)}")
+    return [encode(arg_name, value) for (arg_name, encode), value in zip(encoders, values)]
+
+def validate_principal(value: Any) -> str:
+    """Check the shape of a standard or contract principal (c32 characters, no checksum check)"""
+    if not isinstance(value, str):
+        raise ClarityArgError("sender must be a Stacks principal")
+    address, dot, contract_name = value.partition(".")
+    if (
+        not 39 <= len(address) <= 41
+        or address[0] != "S"
+        or address[1] not in "PMTN"
+        or not _C32_ALPHABET.issuperset(address[2:])
+        or (dot and not 1 <= len(contract_name) <= 40)
+    ):
+        raise ClarityArgError(f"Invalid Stacks principal: {value}")
+    return value
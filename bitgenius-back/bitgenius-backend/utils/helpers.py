@@ -1,6 +1,8 @@
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import json
+import csv
+import io
 
 def format_timestamp(timestamp: int) -> str:
     dt = datetime.fromtimestamp(timestamp)
@@ -18,12 +20,40 @@ def format_btc_amount(sats: int, include_unit: bool = True) -> str:
         return f"{btc:.8f} BTC"
     return f"{btc:.8f}"
 
+# Status aliases accepted from clients, mapped to the contract's statuses
+STATUS_MAPPING = {
+    "active": "online",
+    "running": "online",
+    "paused": "idle",
+    "suspended": "idle",
+    "inactive": "stopped",
+    "disabled": "stopped"
+}
+VALID_STATUSES = ("online", "idle", "stopped")
+
+def normalize_status(status: Optional[str]) -> Optional[str]:
+    """Map a client status or alias to online/idle/stopped; None if it isn't one"""
+    if not status:
+        return None
+    status = STATUS_MAPPING.get(status.lower(), status.lower())
+    return status if status in VALID_STATUSES else None
+
 def filter_logs_by_action(logs: List[Dict], action: str) -> List[Dict]:
     return [log for log in logs if log.get("action") == action]
 
 def filter_logs_by_status(logs: List[Dict], status: str) -> List[Dict]:
     return [log for log in logs if log.get("status") == status]
 
+LOG_CSV_FIELDS = ("timestamp", "action", "status", "transaction_id", "amount", "fee", "details")
+
+def logs_to_csv(logs: List[Dict]) -> str:
+    """Render logs as CSV with a header row, blank cells for missing fields"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(LOG_CSV_FIELDS)
+    writer.writerows([log.get(field, "") for field in LOG_CSV_FIELDS] for log in logs)
+    return output.getvalue()
+
 def calculate_success_rate(logs: List[Dict]) -> float:
     if not logs:
         return 0.0
@@ -0,0 +1,45 @@
+import hashlib
+from typing import Any, Callable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from utils.responses import FastJSONResponse, orjson
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag from version parts, e.g. ("agent", 7, block_height)"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def content_etag(data: Any) -> str:
+    """Weak ETag from a hash of plain JSON data, for when there is no version to go by"""
+    if orjson is not None:
+        encoded = orjson.dumps(data, default=jsonable_encoder, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    else:
+        encoded = FastJSONResponse(data).body
+    return f'W/"{hashlib.blake2b(encoded, digest_size=12).hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check with weak comparison, as RFC 9110 requires for GET"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+def conditional_response(request: Request, etag: str, build: Callable[[], Any], max_age: int,
+                         private: bool = False) -> Response:
+    """304 if the client already has `etag`; otherwise render what `build` returns
+
+    `build` only runs on a miss, so an unchanged resource costs no fetch,
+    validation or serialization beyond what went into the ETag.
+    """
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"{'private' if private else 'public'}, max-age={max_age}"
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(build(), headers=headers)
@@ -0,0 +1,32 @@
+import json
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from models.records import Record
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+def _default(value: Any) -> Any:
+    # Internal records become dicts only here, at the response boundary
+    if isinstance(value, Record):
+        return value.to_dict()
+    # Anything else orjson can't encode natively (Firestore timestamps, models, sets)
+    return jsonable_encoder(value)
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed
+
+    Routes that return one directly skip FastAPI's response_model validation
+    and jsonable_encoder pass, so use it only for data that is already plain
+    JSON types (storage rows, contract reads) - large lists especially.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,118 @@
+import json
+import re
+from typing import Any, Dict, Type, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+
+# Keys the Gemini Schema proto understands; everything else pydantic emits is dropped
+_SCHEMA_KEYS = {"type", "format", "description", "nullable", "enum", "properties", "required", "items"}
+
+def gemini_schema(model: Type[BaseModel]) -> Dict:
+    """Build a Gemini response_schema from a pydantic model"""
+    schema = model.model_json_schema()
+    defs = schema.get("$defs", {})
+
+    def convert(node: Dict) -> Dict:
+        if "$ref" in node:
+            node = defs[node["$ref"].split("/")[-1]]
+        result = {}
+        for key, value in node.items():
+            if key not in _SCHEMA_KEYS:
+                continue
+            if key == "properties":
+                value = {name: convert(prop) for name, prop in value.items()}
+            elif key == "items":
+                value = convert(value)
+            result[key] = value
+        return result
+
+    return convert(schema)
+
+def _balanced_json(text: str) -> str:
+    """Cut the first JSON object/array out of text, closing it if the output was truncated"""
+    start = min((i for i in (text.find("{"), text.find("[")) if i != -1), default=-1)
+    if start == -1:
+        raise ValueError("No JSON object found in model output")
+
+    stack = []
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return text[start:i + 1]
+
+    # Truncated output: close the open string and every open container
+    fragment = text[start:].rstrip()
+    if in_string:
+        fragment += '"'
+    fragment = fragment.rstrip().rstrip(",:")
+    return fragment + "".join(reversed(stack))
+
+def _strip_trailing_commas(text: str) -> str:
+    """Drop commas that directly precede a closing bracket, leaving string contents alone"""
+    result = []
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ",":
+            j = i + 1
+            while j < len(text) and text[j].isspace():
+                j += 1
+            if j < len(text) and text[j] in "}]":
+                continue
+        result.append(char)
+    return "".join(result)
+
+def extract_json(text: str) -> Any:
+    """Parse JSON from model output, tolerating markdown fences, prose and truncation"""
+    if text is None:
+        raise ValueError("Empty model output")
+
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+
+    candidate = _strip_trailing_commas(_balanced_json(text))
+    return json.loads(candidate)
+
+def parse_structured(text: str, model: Type[T]) -> T:
+    """Extract JSON from model output and validate it into `model`"""
+    data = extract_json(text)
+    # A schema-less answer sometimes wraps the object in a one-element array
+    if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict):
+        data = data[0]
+    return model.model_validate(data)